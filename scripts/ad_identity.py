@@ -0,0 +1,157 @@
+"""
+Módulo de identidad de anuncios V4.
+Asigna a cada anuncio una clave entera estable y compartida entre los
+archivos de un cliente (30d, 7d e histórico), para que todos los cruces
+del pipeline se hagan sobre enteros en lugar de strings.
+
+Clave usada (el primer nivel que tengan todos los archivos del cliente):
+    - 'ad_id' si el export trae el identificador del anuncio
+    - 'adset_id' + nombre normalizado si solo trae el del conjunto
+    - 'adset_name' + nombre normalizado si trae el nombre del conjunto
+    - Nombre normalizado del anuncio en cualquier otro caso
+"""
+import numpy as np
+import pandas as pd
+
+COLUMNA_CLAVE = "_ad_key"
+
+
+def normalizar_nombre_anuncio(serie):
+    """
+    Normaliza nombres de anuncio para compararlos entre archivos.
+    Quita espacios sobrantes y diferencias de mayúsculas/Unicode.
+
+    Args:
+        serie: Serie con nombres de anuncio
+
+    Returns:
+        Serie de strings normalizados
+    """
+    return (
+        serie.fillna("")
+        .astype(str)
+        .str.normalize("NFKC")
+        .str.strip()
+        .str.lower()
+        .str.replace(r"\s+", " ", regex=True)
+    )
+
+
+def _texto_id(serie):
+    """Convierte una columna de IDs (a veces leída como float) a texto."""
+    numerico = pd.to_numeric(serie, errors="coerce")
+    texto = serie.astype(str).str.strip()
+    return texto.where(numerico.isna(), numerico.astype("Int64").astype(str))
+
+
+# Niveles de identidad, del más confiable al menos confiable
+NIVELES_CLAVE = ["ad_id", "adset_id", "adset_name", "nombre"]
+
+
+def nivel_clave(frames):
+    """
+    Elige el nivel de identidad que soportan TODOS los DataFrames, para que
+    las claves sean comparables entre archivos.
+
+    Returns:
+        str: 'ad_id', 'adset_id', 'adset_name' o 'nombre'
+    """
+    frames = [df for df in frames if df is not None and not df.empty]
+    for nivel in NIVELES_CLAVE[:-1]:
+        if frames and all(nivel in df.columns for df in frames):
+            return nivel
+    return "nombre"
+
+
+def clave_texto_anuncio(df, nivel="nombre"):
+    """
+    Devuelve la clave de identidad (texto) de cada fila de un DataFrame.
+    Filas sin ID caen al nombre normalizado.
+
+    Args:
+        df: DataFrame de anuncios
+        nivel: Nivel de identidad (ver nivel_clave)
+
+    Returns:
+        Serie de strings con la clave de cada anuncio
+    """
+    nombres = (
+        normalizar_nombre_anuncio(df["ad_name"]) if "ad_name" in df.columns
+        else pd.Series([""] * len(df), index=df.index)
+    )
+    clave_nombre = "nombre:" + nombres
+
+    if nivel == "ad_id":
+        ids = _texto_id(df["ad_id"])
+        return ("id:" + ids).where(df["ad_id"].notna() & (ids != ""), clave_nombre)
+
+    if nivel == "adset_id":
+        ids = _texto_id(df["adset_id"])
+        return ("set:" + ids + "|" + nombres).where(df["adset_id"].notna() & (ids != ""), clave_nombre)
+
+    if nivel == "adset_name":
+        conjuntos = normalizar_nombre_anuncio(df["adset_name"])
+        return ("conj:" + conjuntos + "|" + nombres).where(conjuntos != "", clave_nombre)
+
+    return clave_nombre
+
+
+def asignar_claves_anuncio(frames):
+    """
+    Codifica la identidad de los anuncios de varios DataFrames a enteros
+    con un único diccionario compartido (factorize sobre todas las claves).
+
+    Args:
+        frames: dict {nombre: DataFrame o None}. Se modifica cada DataFrame
+                agregando la columna '_ad_key'.
+
+    Returns:
+        np.ndarray con las claves de texto (el código entero es la posición)
+    """
+    presentes = {k: df for k, df in frames.items() if df is not None and not df.empty}
+    if not presentes:
+        return np.array([], dtype=object)
+
+    nivel = nivel_clave(presentes.values())
+    claves = pd.concat(
+        [clave_texto_anuncio(df, nivel) for df in presentes.values()], ignore_index=True
+    )
+    codigos, uniques = pd.factorize(claves)
+
+    inicio = 0
+    for df in presentes.values():
+        df[COLUMNA_CLAVE] = codigos[inicio:inicio + len(df)]
+        inicio += len(df)
+
+    return np.asarray(uniques, dtype=object)
+
+
+def agregar_por_clave(claves, valores, n_claves):
+    """
+    Suma valores por clave entera con bincount (pre-agregación densa).
+
+    Args:
+        claves: Array de claves enteras (0..n_claves-1)
+        valores: Array de valores a sumar
+        n_claves: Cantidad total de claves
+
+    Returns:
+        np.ndarray de largo n_claves con la suma por clave
+    """
+    valores = np.nan_to_num(np.asarray(valores, dtype=float))
+    return np.bincount(np.asarray(claves, dtype=np.int64), weights=valores, minlength=n_claves)
+
+
+def asegurar_claves(df, *otros):
+    """
+    Garantiza que df y los demás DataFrames tengan '_ad_key' compartida.
+    Si alguno no la tiene, se recodifican todos juntos.
+
+    Returns:
+        int: cantidad de claves (para dimensionar arrays por clave)
+    """
+    frames = [f for f in (df, *otros) if f is not None and not f.empty]
+    if not all(COLUMNA_CLAVE in f.columns for f in frames):
+        asignar_claves_anuncio({i: f for i, f in enumerate(frames)})
+
+    return int(max((f[COLUMNA_CLAVE].max() for f in frames), default=-1)) + 1
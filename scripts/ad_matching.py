@@ -0,0 +1,353 @@
+"""
+Emparejamiento de anuncios entre períodos V4.
+La clave de ad_identity.py es exacta: si el nombre cambió un poco entre el
+mes pasado y hoy ("Promo verano - Copia", un emoji nuevo, una coma), el
+anuncio del 7d o del histórico no encuentra su par del 30d y la actividad
+y el histórico por anuncio pierden el cruce sin avisar.
+
+Este módulo enlaza esas claves huérfanas con su par del 30d:
+
+    1. Normaliza los nombres (sin acentos, emojis, signos ni "copia")
+    2. Los que quedan iguales tras normalizar se enlazan con un merge
+    3. Bloqueo por n-gramas de caracteres para el resto: un índice invertido
+       n-grama -> nombres del 30d genera como candidatos solo los pares que
+       comparten n-gramas (merge + groupby sobre códigos enteros, no una
+       comparación de todos contra todos); los n-gramas muy comunes no
+       bloquean
+    4. Similitud de Dice sobre los n-gramas completos de los mejores
+       candidatos, mismos números en ambos nombres ("Anuncio 1" no es
+       "Anuncio 2") y asignación uno a uno de mayor a menor similitud
+
+Los pares aceptados reciben la clave entera del 30d y se guardan por
+cliente en una base SQLite (EMPAREJAMIENTO['RUTA']) para reusarlos en las
+corridas siguientes sin recalcular.
+"""
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from ad_identity import COLUMNA_CLAVE
+from config import EMPAREJAMIENTO
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS emparejamientos (
+    cliente     TEXT NOT NULL,
+    origen      TEXT NOT NULL,
+    destino     TEXT NOT NULL,
+    similitud   REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    PRIMARY KEY (cliente, origen, destino)
+);
+"""
+
+_RE_COPIA = r"[\s\-_–—]*[\(\[]?\s*\b(?:copia|copy)\b(?:\s*\d+)?\s*[\)\]]?"
+
+
+def normalizar_para_emparejar(nombres):
+    """
+    Nombres comparables aunque difieran en acentos, emojis, signos,
+    mayúsculas o sufijos de copia ("- Copia", "copy 2", "(1)").
+
+    Args:
+        nombres: Serie o lista de nombres
+
+    Returns:
+        Serie de strings normalizados
+    """
+    serie = pd.Series(nombres, dtype=object).fillna("").astype(str)
+    return (
+        serie.str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore").str.decode("ascii")
+        .str.lower()
+        .str.replace(_RE_COPIA, " ", regex=True)
+        .str.replace(r"\(\d+\)\s*$", " ", regex=True)
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def _ngramas(nombre, n):
+    if not nombre:
+        return frozenset()
+    texto = f" {nombre} "
+    return frozenset(texto[i:i + n] for i in range(max(len(texto) - n + 1, 1)))
+
+
+def _indice_ngramas(gramas, bloques):
+    """
+    Formato largo: una fila por (posición del nombre, bloque + n-grama).
+
+    Returns:
+        tuple (posiciones, n-gramas con el bloque adelante)
+    """
+    largos = [len(g) for g in gramas]
+    posiciones = np.repeat(np.arange(len(gramas)), largos)
+    ngramas = (np.repeat(np.asarray(bloques, dtype=object), largos) + "\x00"
+               + np.array([g for grupo in gramas for g in grupo], dtype=object))
+    return posiciones, ngramas
+
+
+def _candidatos(gramas_origen, gramas_destino, bloque_origen, bloque_destino, pendientes):
+    """
+    Pares (origen, destino, n-gramas en común) que comparten algún n-grama
+    poco frecuente: los CANDIDATOS con más n-gramas en común por origen.
+    """
+    pos_origen, ngramas_origen = _indice_ngramas([gramas_origen[i] for i in pendientes],
+                                                 [bloque_origen[i] for i in pendientes])
+    pos_destino, ngramas_destino = _indice_ngramas(gramas_destino, bloque_destino)
+    pos_origen = np.asarray(pendientes, dtype=np.int64)[pos_origen]
+
+    # Códigos enteros compartidos: el cruce se hace sobre enteros
+    codigos, _ = pd.factorize(np.concatenate([ngramas_origen, ngramas_destino]))
+    codigo_origen, codigo_destino = codigos[:len(ngramas_origen)], codigos[len(ngramas_origen):]
+
+    # Índice invertido n-grama -> nombres del destino, sin los muy comunes
+    frecuencia = np.bincount(codigo_destino, minlength=codigos.max() + 1)
+    util = frecuencia[codigo_destino] <= EMPAREJAMIENTO["MAX_BLOQUE"]
+    indice = pd.DataFrame({"ngrama": codigo_destino[util], "destino": pos_destino[util]})
+
+    largo = pd.DataFrame({"origen": pos_origen, "ngrama": codigo_origen})
+    partes = []
+    # Por tandas de orígenes: la memoria del cruce queda acotada
+    for inicio in range(0, len(pendientes), EMPAREJAMIENTO["TANDA"]):
+        tanda = largo[largo["origen"].isin(pendientes[inicio:inicio + EMPAREJAMIENTO["TANDA"]])]
+        pares = tanda.merge(indice, on="ngrama").groupby(["origen", "destino"]).size()
+        if pares.empty:
+            continue
+        partes.append(
+            pares.rename("comunes").reset_index()
+            .sort_values(["origen", "comunes"], ascending=[True, False], kind="stable")
+            .groupby("origen").head(EMPAREJAMIENTO["CANDIDATOS"])
+        )
+    return pd.concat(partes, ignore_index=True) if partes else None
+
+
+def emparejar(origen, destino, bloque_origen=None, bloque_destino=None):
+    """
+    Empareja nombres de origen con nombres de destino (uno a uno).
+
+    Args:
+        origen, destino: Listas de nombres ya normalizados
+        bloque_origen, bloque_destino: Clave de bloque de cada nombre (solo
+                                       se comparan nombres del mismo bloque,
+                                       p. ej. el mismo conjunto de anuncios)
+
+    Returns:
+        DataFrame [origen, destino, similitud] con posiciones en las listas
+    """
+    vacio = pd.DataFrame({"origen": [], "destino": [], "similitud": []})
+    if not len(origen) or not len(destino):
+        return vacio
+
+    n = EMPAREJAMIENTO["NGRAMA"]
+    bloque_origen = [""] * len(origen) if bloque_origen is None else list(bloque_origen)
+    bloque_destino = [""] * len(destino) if bloque_destino is None else list(bloque_destino)
+
+    # Iguales una vez normalizados ("Promo 🎉 - Copia" == "Promo"): un solo merge
+    exactos = (
+        pd.DataFrame({"bloque": bloque_origen, "nombre": origen}).reset_index(names="origen")
+        .merge(pd.DataFrame({"bloque": bloque_destino, "nombre": destino}).reset_index(names="destino"),
+               on=["bloque", "nombre"])
+    )
+    exactos = exactos[exactos["nombre"] != ""].assign(similitud=1.0)
+    pares = [exactos[["origen", "destino", "similitud"]]]
+
+    pendientes = np.setdiff1d(np.arange(len(origen)), exactos["origen"].to_numpy())
+    if len(pendientes):
+        gramas_origen = [_ngramas(nombre, n) for nombre in origen]
+        gramas_destino = [_ngramas(nombre, n) for nombre in destino]
+        candidatos = _candidatos(gramas_origen, gramas_destino, bloque_origen, bloque_destino, pendientes)
+
+        if candidatos is not None:
+            # Dice completo y mismos números solo sobre los candidatos
+            numeros_origen = [tuple(re.findall(r"\d+", nombre)) for nombre in origen]
+            numeros_destino = [tuple(re.findall(r"\d+", nombre)) for nombre in destino]
+            similitud = np.array([
+                2 * len(gramas_origen[o] & gramas_destino[d]) / (len(gramas_origen[o]) + len(gramas_destino[d]))
+                if numeros_origen[o] == numeros_destino[d] else 0.0
+                for o, d in zip(candidatos["origen"].to_numpy(), candidatos["destino"].to_numpy())
+            ])
+            candidatos = candidatos.assign(similitud=similitud)
+            pares.append(candidatos.loc[candidatos["similitud"] >= EMPAREJAMIENTO["UMBRAL"],
+                                        ["origen", "destino", "similitud"]])
+
+    # Uno a uno, de mayor a menor similitud
+    pares = pd.concat(pares, ignore_index=True).sort_values("similitud", ascending=False, kind="stable")
+    pares = pares.drop_duplicates("origen").drop_duplicates("destino")
+    return pares.astype({"origen": np.int64, "destino": np.int64}).reset_index(drop=True)
+
+
+def _partir_claves(claves):
+    """
+    Bloque y nombre de cada clave de texto de ad_identity ('nombre:x',
+    'conj:c|x', 'set:123|x'); las claves 'id:' no se emparejan (bloque None).
+    """
+    serie = pd.Series(claves, dtype=object).astype(str)
+    con_conjunto = serie.str.contains("|", regex=False) & ~serie.str.startswith("nombre:")
+    partes = serie.str.split("|", n=1, expand=True).reindex(columns=[0, 1])
+    bloque = partes[0].where(con_conjunto, "nombre")
+    nombre = partes[1].where(con_conjunto, serie.str.removeprefix("nombre:"))
+    bloque = bloque.where(~serie.str.startswith("id:"), None)
+    return bloque.to_numpy(dtype=object), nombre.fillna("").to_numpy(dtype=object)
+
+
+def _con_nombre(codigos, claves):
+    """Códigos, bloques y nombres de las claves que se pueden emparejar."""
+    codigos = np.asarray(codigos, dtype=np.int64)
+    bloque, nombre = _partir_claves(claves[codigos])
+    valido = pd.notna(bloque)
+    return codigos[valido], bloque[valido], nombre[valido]
+
+
+def conectar(ruta=None):
+    conn = sqlite3.connect(ruta or EMPAREJAMIENTO["RUTA"], timeout=30, isolation_level="IMMEDIATE")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(ESQUEMA)
+    return conn
+
+
+def cargar_tabla(cliente, ruta=None):
+    """
+    Returns:
+        dict {clave origen: [(clave destino, similitud), ...]} del cliente,
+        vacío si la base todavía no existe
+    """
+    ruta = ruta or EMPAREJAMIENTO["RUTA"]
+    if not os.path.exists(ruta):
+        return {}
+    tabla = {}
+    with closing(conectar(ruta)) as conn:
+        for origen, destino, similitud in conn.execute(
+            "SELECT origen, destino, similitud FROM emparejamientos WHERE cliente = ? ORDER BY similitud DESC",
+            (cliente,),
+        ):
+            tabla.setdefault(origen, []).append((destino, similitud))
+    return tabla
+
+
+def guardar_tabla(cliente, pares, ruta=None):
+    """Guarda pares (clave origen, clave destino, similitud) del cliente."""
+    if not pares:
+        return
+    ahora = time.time()
+    with closing(conectar(ruta)) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO emparejamientos (cliente, origen, destino, similitud, actualizado) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(cliente, origen, destino, float(similitud), ahora) for origen, destino, similitud in pares],
+        )
+
+
+def _emparejar_codigos(huerfanos, libres, claves, guardados):
+    """
+    Pares (código origen, código destino, similitud) entre claves huérfanas
+    y claves libres del 30d: primero los guardados, después el bloqueo.
+    """
+    pares = []
+    if guardados:
+        posicion = {claves[c]: c for c in libres}
+        pendientes = []
+        for codigo in huerfanos:
+            destino = next(
+                ((posicion[d], s) for d, s in guardados.get(claves[codigo], ())
+                 if d in posicion and s >= EMPAREJAMIENTO["UMBRAL"]),
+                None,
+            )
+            if destino is None:
+                pendientes.append(codigo)
+                continue
+            pares.append((codigo, *destino))
+            del posicion[claves[destino[0]]]
+        huerfanos, libres = pendientes, list(posicion.values())
+
+    # Las claves por ID no se comparan por nombre
+    huerfanos, bloque_h, nombre_h = _con_nombre(huerfanos, claves)
+    libres, bloque_l, nombre_l = _con_nombre(libres, claves)
+
+    encontrados = emparejar(
+        normalizar_para_emparejar(nombre_h).tolist(), normalizar_para_emparejar(nombre_l).tolist(),
+        bloque_h.tolist(), bloque_l.tolist(),
+    )
+    pares.extend(
+        (int(huerfanos[o]), int(libres[d]), float(s))
+        for o, d, s in encontrados[["origen", "destino", "similitud"]].itertuples(index=False)
+    )
+    return pares
+
+
+def emparejar_anuncios(data, claves, persistir=True, cliente=None):
+    """
+    Reasigna a la clave del 30d los anuncios del 7d y del histórico cuya
+    clave no está en el 30d pero tienen un nombre casi igual. Un anuncio del
+    30d recibe a lo sumo un par por archivo (por mes en el histórico) y
+    nunca si ya tiene uno exacto.
+
+    Args:
+        data: dict {"30d", "7d", "historico"} con '_ad_key' (se modifica)
+        claves: Claves de texto de asignar_claves_anuncio (código = posición)
+        persistir: Leer y guardar la tabla en EMPAREJAMIENTO['RUTA']
+        cliente: Cliente dueño de los pares en la tabla (sin cliente no se
+                 usa la tabla: las claves de texto se repiten entre cuentas)
+
+    Returns:
+        DataFrame [archivo, anuncio, anuncio_30d, similitud] con los pares
+        aplicados, o None si no hubo ninguno
+    """
+    if not EMPAREJAMIENTO["HABILITADO"] or data.get("30d") is None or not len(claves):
+        return None
+
+    claves = np.asarray(claves, dtype=object)
+    en_30d = np.zeros(len(claves), dtype=bool)
+    en_30d[data["30d"][COLUMNA_CLAVE].to_numpy()] = True
+
+    tareas = []
+    if data.get("7d") is not None:
+        tareas.append(("7d", data["7d"], np.ones(len(data["7d"]), dtype=bool)))
+    hist = data.get("historico")
+    if hist is not None and "periodo" in hist.columns:
+        for periodo in pd.unique(hist["periodo"]):
+            tareas.append((periodo, hist, (hist["periodo"] == periodo).to_numpy()))
+
+    persistir = persistir and cliente is not None
+    guardados = cargar_tabla(cliente) if persistir else {}
+    aplicados = []
+    for archivo, df, mascara in tareas:
+        codigos = df[COLUMNA_CLAVE].to_numpy()
+        presentes = np.zeros(len(claves), dtype=bool)
+        presentes[codigos[mascara]] = True
+        huerfanos = np.flatnonzero(presentes & ~en_30d).tolist()
+        libres = np.flatnonzero(en_30d & ~presentes).tolist()
+        if not huerfanos or not libres:
+            continue
+
+        pares = _emparejar_codigos(huerfanos, libres, claves, guardados)
+        if not pares:
+            continue
+
+        reasignar = np.arange(len(claves))
+        for origen, destino, _ in pares:
+            reasignar[origen] = destino
+        df.loc[mascara, COLUMNA_CLAVE] = reasignar[codigos[mascara]]
+        aplicados.extend((archivo, origen, destino, similitud) for origen, destino, similitud in pares)
+
+    if not aplicados:
+        return None
+
+    if persistir:
+        guardar_tabla(cliente, {(claves[o], claves[d], s) for _, o, d, s in aplicados})
+
+    _, nombre = _partir_claves(claves)
+    tabla = pd.DataFrame({
+        "archivo": [a for a, _, _, _ in aplicados],
+        "anuncio": [nombre[o] for _, o, _, _ in aplicados],
+        "anuncio_30d": [nombre[d] for _, _, d, _ in aplicados],
+        "similitud": [round(s, 3) for _, _, _, s in aplicados],
+    })
+    for archivo, cantidad in tabla["archivo"].value_counts(sort=False).items():
+        print(f"     [EMPAREJADOS] {archivo}: {cantidad} anuncio(s) con nombre similar al 30d")
+    return tabla
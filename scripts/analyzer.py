@@ -158,8 +158,8 @@ def detectar_anomalias(df):
     """
     anomalias = []
     
-    # Frecuencia muy alta
-    if 'frequency' in df.columns:
+    # Frecuencia muy alta (sin alcance, p. ej. ventanas del export diario, no hay frecuencia)
+    if 'frequency' in df.columns and df['frequency'].notna().any():
         freq_alta = df[df['frequency'] > ANOMALIAS['FRECUENCIA_MUY_ALTA']]
         for _, row in freq_alta.iterrows():
             anomalias.append({
@@ -212,10 +212,14 @@ def detectar_anomalias(df):
     return anomalias
 
 
-def generar_historico(df_hist):
+def generar_historico(df_hist, pesos=None):
     """
     Genera resumen histórico por período con análisis de tendencia.
     
+    Args:
+        df_hist: DataFrame con los meses históricos concatenados
+        pesos: Pesos de conversiones (opcional, ver obtener_pesos_conversiones)
+    
     Returns:
         list de dicts con score y métricas por período
     """
@@ -223,7 +227,7 @@ def generar_historico(df_hist):
         return []
     
     # from metrics import calcular_score_basico # Se asume importada arriba o en main
-    df_hist = calcular_score_basico(df_hist)
+    df_hist = calcular_score_basico(df_hist, pesos)
     
     # Agrupar por período
     resumen = df_hist.groupby('periodo').agg({
@@ -0,0 +1,330 @@
+"""
+Benchmark entre clientes V4.
+calcular_mediana_cpa y la eficiencia comparan cada anuncio solo con su
+propia cuenta. Este módulo mantiene un índice de todo el portafolio: por
+objetivo y métrica (CPA, CTR, score), el arreglo ordenado de los valores de
+todos los clientes procesados, persistido en una base SQLite local
+(BENCHMARK['RUTA']) entre corridas.
+
+Al procesar un cliente se reemplazan sus valores en el índice (solo si
+cambiaron) y cada anuncio recibe su percentil frente al resto del
+portafolio, sin los valores de su propia cuenta, con un solo
+np.searchsorted por objetivo:
+
+    percentil_cpa    % del portafolio con CPA <= al del anuncio (bajo = barato)
+    percentil_ctr    % del portafolio con CTR <= al del anuncio (alto = mejor)
+    percentil_score  % del portafolio con score <= al del anuncio (alto = mejor)
+
+Un objetivo con menos de BENCHMARK['MIN_PARES'] valores se compara contra
+todo el portafolio. Sin otros clientes no hay percentiles (NaN) ni resumen.
+
+Además se guarda un sketch de cuantiles (cuantiles.py) del CPA de cada
+cliente: fusionarlos da p10/p50/p90 del portafolio en memoria acotada sin
+leer los arreglos completos.
+"""
+import os
+import pathlib
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from config import BENCHMARK
+from cuantiles import SketchCuantiles
+
+# Índice de todo el portafolio (todos los objetivos juntos)
+TODOS = "_todos"
+
+# métrica -> (columna del DataFrame, filtro de valores válidos)
+METRICAS = {
+    "cpa": ("cpa", lambda v: v > 0),
+    "ctr": ("ctr", lambda v: v > 0),
+    "score": ("score", lambda v: v >= 0),
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS valores (
+    cliente     TEXT NOT NULL,
+    objetivo    TEXT NOT NULL,
+    metrica     TEXT NOT NULL,
+    valores     BLOB NOT NULL,
+    actualizado REAL NOT NULL,
+    PRIMARY KEY (cliente, objetivo, metrica)
+);
+CREATE TABLE IF NOT EXISTS indice (
+    objetivo    TEXT NOT NULL,
+    metrica     TEXT NOT NULL,
+    valores     BLOB NOT NULL,
+    clientes    INTEGER NOT NULL,
+    PRIMARY KEY (objetivo, metrica)
+);
+CREATE TABLE IF NOT EXISTS sketches (
+    cliente     TEXT NOT NULL,
+    metrica     TEXT NOT NULL,
+    sketch      BLOB NOT NULL,
+    PRIMARY KEY (cliente, metrica)
+);
+"""
+
+
+def conectar(ruta=None):
+    """
+    Abre (y crea si hace falta) la base del benchmark para escribir. Las
+    escrituras toman el lock al empezar (IMMEDIATE), así varios workers de
+    la cola pueden actualizar el índice a la vez sin pisarse.
+    """
+    conn = sqlite3.connect(ruta or BENCHMARK["RUTA"], timeout=30, isolation_level="IMMEDIATE")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(ESQUEMA)
+    return conn
+
+
+def _conectar_lectura(ruta):
+    """Conexión de solo lectura: no crea tablas ni toma el lock de escritura."""
+    uri = pathlib.Path(ruta).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=30)
+
+
+def _a_blob(valores):
+    return np.asarray(valores, dtype="<f8").tobytes()
+
+
+def _de_blob(blob):
+    return np.frombuffer(blob, dtype="<f8")
+
+
+def _quitar(ordenado, propios):
+    """
+    Saca de ordenado los valores de propios (ordenado y contenido en él)
+    sin volver a ordenar: cada repetido de un valor ocupa la posición
+    siguiente a la del anterior.
+    """
+    if not len(propios):
+        return ordenado
+    repeticion = np.arange(len(propios)) - np.searchsorted(propios, propios, side="left")
+    return np.delete(ordenado, np.searchsorted(ordenado, propios, side="left") + repeticion)
+
+
+def _sumar(ordenado, nuevos):
+    """Inserta nuevos (ordenado) en ordenado manteniendo el orden."""
+    return np.insert(ordenado, np.searchsorted(ordenado, nuevos, side="right"), nuevos)
+
+
+def _objetivos(df):
+    if "objetivo_detectado" not in df.columns:
+        return np.full(len(df), "general", dtype=object)
+    return df["objetivo_detectado"].fillna("general").astype(str).to_numpy(dtype=object)
+
+
+def _metrica(df, metrica):
+    """Valores de la métrica como float, NaN donde no son válidos."""
+    columna, es_valido = METRICAS[metrica]
+    if columna not in df.columns:
+        return np.full(len(df), np.nan)
+    valores = pd.to_numeric(df[columna], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid="ignore"):
+        valido = np.isfinite(valores) & es_valido(valores)
+    return np.where(valido, valores, np.nan)
+
+
+def valores_cliente(df):
+    """
+    Valores válidos del cliente por objetivo y métrica (más TODOS).
+
+    Returns:
+        dict {(objetivo, metrica): np.ndarray ordenado}
+    """
+    objetivos = _objetivos(df)
+    resultado = {}
+    for metrica in METRICAS:
+        valores = _metrica(df, metrica)
+        valido = ~np.isnan(valores)
+        resultado[(TODOS, metrica)] = np.sort(valores[valido])
+        for objetivo in pd.unique(objetivos):
+            resultado[(objetivo, metrica)] = np.sort(valores[valido & (objetivos == objetivo)])
+    return {clave: v for clave, v in resultado.items() if len(v)}
+
+
+def actualizar_indice(cliente, df, ruta=None):
+    """
+    Reemplaza los valores del cliente en el índice: a los arreglos
+    ordenados de los objetivos afectados se les quitan sus valores
+    anteriores y se les insertan los nuevos.
+
+    Returns:
+        int: valores del cliente registrados
+    """
+    nuevos = valores_cliente(df)
+    registrados = sum(len(v) for (objetivo, _), v in nuevos.items() if objetivo == TODOS)
+    ahora = time.time()
+
+    with closing(conectar(ruta)) as conn, conn:
+        anteriores = {
+            (objetivo, metrica): blob
+            for objetivo, metrica, blob in conn.execute(
+                "SELECT objetivo, metrica, valores FROM valores WHERE cliente = ?", (cliente,)
+            )
+        }
+        # Misma corrida sobre los mismos exports: no hay nada que reescribir
+        if anteriores == {clave: _a_blob(v) for clave, v in nuevos.items()}:
+            return registrados
+
+        sketch = SketchCuantiles().agregar(_metrica(df, "cpa"))
+        conn.execute("DELETE FROM valores WHERE cliente = ?", (cliente,))
+        conn.executemany(
+            "INSERT INTO valores (cliente, objetivo, metrica, valores, actualizado) VALUES (?, ?, ?, ?, ?)",
+            [(cliente, objetivo, metrica, _a_blob(v), ahora) for (objetivo, metrica), v in nuevos.items()],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO sketches (cliente, metrica, sketch) VALUES (?, ?, ?)",
+            (cliente, "cpa", sketch.a_bytes()),
+        )
+
+        # El índice se corrige con la diferencia del cliente, sin releer al resto
+        for clave in set(anteriores) | set(nuevos):
+            fila = conn.execute(
+                "SELECT valores, clientes FROM indice WHERE objetivo = ? AND metrica = ?", clave
+            ).fetchone()
+            ordenado, clientes = (_de_blob(fila[0]), fila[1]) if fila else (np.empty(0), 0)
+            if clave in anteriores:
+                ordenado = _quitar(ordenado, _de_blob(anteriores[clave]))
+                clientes -= 1
+            if clave in nuevos:
+                ordenado = _sumar(ordenado, nuevos[clave])
+                clientes += 1
+            if not len(ordenado):
+                conn.execute("DELETE FROM indice WHERE objetivo = ? AND metrica = ?", clave)
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO indice (objetivo, metrica, valores, clientes) VALUES (?, ?, ?, ?)",
+                (*clave, _a_blob(ordenado), clientes),
+            )
+
+    return registrados
+
+
+def cargar_indice(excluir=None, ruta=None):
+    """
+    Args:
+        excluir: Cliente cuyos valores no entran en la referencia (el que se
+                 está comparando); None usa el índice completo ya armado
+
+    Returns:
+        dict {(objetivo, metrica): (np.ndarray ordenado, clientes)}, vacío
+        si todavía no hay índice (no crea la base: sirve en modo solo lectura)
+    """
+    ruta = ruta or BENCHMARK["RUTA"]
+    if not os.path.exists(ruta):
+        return {}
+    with closing(_conectar_lectura(ruta)) as conn:
+        indice = {
+            (objetivo, metrica): (_de_blob(blob), clientes)
+            for objetivo, metrica, blob, clientes in conn.execute(
+                "SELECT objetivo, metrica, valores, clientes FROM indice"
+            )
+        }
+        propios = []
+        if excluir is not None:
+            propios = conn.execute(
+                "SELECT objetivo, metrica, valores FROM valores WHERE cliente = ?", (excluir,)
+            ).fetchall()
+
+    # Se resta la parte del cliente al índice ya ordenado, sin volver a ordenar
+    for objetivo, metrica, blob in propios:
+        ordenado, clientes = indice.pop((objetivo, metrica), (np.empty(0), 1))
+        ordenado = _quitar(ordenado, _de_blob(blob))
+        if len(ordenado):
+            indice[(objetivo, metrica)] = (ordenado, clientes - 1)
+    return indice
+
+
+def cargar_sketch(metrica="cpa", excluir=None, ruta=None):
+    """
+    Fusiona los sketches de todos los clientes (menos excluir).
+
+    Returns:
+        SketchCuantiles (vacío si no hay índice)
+    """
+    sketch = SketchCuantiles()
+    ruta = ruta or BENCHMARK["RUTA"]
+    if not os.path.exists(ruta):
+        return sketch
+    with closing(_conectar_lectura(ruta)) as conn:
+        for (blob,) in conn.execute(
+            "SELECT sketch FROM sketches WHERE metrica = ? AND cliente IS NOT ?", (metrica, excluir)
+        ):
+            sketch.fusionar(SketchCuantiles.desde_bytes(blob))
+    return sketch
+
+
+def _referencia(indice, objetivo, metrica):
+    """Arreglo del objetivo, o el de todo el portafolio si tiene pocos valores."""
+    ordenado, _ = indice.get((objetivo, metrica), (None, 0))
+    if ordenado is None or len(ordenado) < BENCHMARK["MIN_PARES"]:
+        ordenado, _ = indice.get((TODOS, metrica), (None, 0))
+    return ordenado
+
+
+def percentil(ordenado, valores):
+    """% de ordenado que es <= a cada valor (NaN queda NaN)."""
+    valores = np.asarray(valores, dtype=float)
+    resultado = np.searchsorted(ordenado, valores, side="right") / len(ordenado) * 100
+    return np.where(np.isnan(valores), np.nan, resultado)
+
+
+def agregar_percentiles(df, indice):
+    """
+    Agrega percentil_cpa, percentil_ctr y percentil_score a df comparando
+    cada anuncio con su objetivo en el portafolio.
+    """
+    objetivos = _objetivos(df)
+    for metrica in METRICAS:
+        valores = _metrica(df, metrica)
+        resultado = np.full(len(df), np.nan)
+        for objetivo in pd.unique(objetivos):
+            ordenado = _referencia(indice, objetivo, metrica)
+            if ordenado is None or not len(ordenado):
+                continue
+            mascara = objetivos == objetivo
+            resultado[mascara] = percentil(ordenado, valores[mascara])
+        df[f"percentil_{metrica}"] = np.round(resultado, 1)
+    return df
+
+
+def resumen_benchmark(df, indice, mediana_cpa):
+    """
+    Posición de la cuenta en el portafolio (para el JSON).
+
+    Returns:
+        dict con el tamaño del portafolio, su CPA mediano y el percentil de
+        la mediana de CPA de la cuenta, en total y por objetivo; None si el
+        índice no tiene CPA (p. ej. sin otros clientes)
+    """
+    ordenado, clientes = indice.get((TODOS, "cpa"), (None, 0))
+    if ordenado is None or not len(ordenado):
+        return None
+
+    def _posicion(ordenado, clientes, mediana):
+        return {
+            "clientes": int(clientes),
+            "anuncios": int(len(ordenado)),
+            "cpa_mediana_portafolio": round(float(np.median(ordenado)), 2),
+            "percentil_cpa_cuenta": round(float(percentil(ordenado, [mediana])[0]), 1) if mediana else None,
+        }
+
+    resumen = _posicion(ordenado, clientes, mediana_cpa)
+
+    objetivos = _objetivos(df)
+    cpa = _metrica(df, "cpa")
+    resumen["por_objetivo"] = {}
+    for objetivo in pd.unique(objetivos):
+        ordenado_obj, clientes_obj = indice.get((objetivo, "cpa"), (None, 0))
+        valores = cpa[(objetivos == objetivo) & ~np.isnan(cpa)]
+        if ordenado_obj is None or not len(ordenado_obj):
+            continue
+        mediana = float(np.median(valores)) if len(valores) else None
+        resumen["por_objetivo"][objetivo] = _posicion(ordenado_obj, clientes_obj, mediana)
+
+    return resumen
@@ -0,0 +1,197 @@
+"""
+Exports con desglose V4 (ubicación, edad, sexo, región).
+Un export desglosado repite cada anuncio una vez por valor de la dimensión
+("Feed de Instagram", "Stories"...). Este módulo:
+
+    1. Detecta las dimensiones de desglose del export
+    2. Colapsa las filas a una por anuncio para el pipeline de siempre
+       (sumables se suman; CTR, CPC, CPM, frecuencia... se recalculan;
+       el alcance solo se suma entre edades, sexos o regiones)
+    3. Arma un cubo pre-agregado de score, gasto y CPA por anuncio × valor
+       de cada dimensión, con el mejor valor por anuncio, para que el
+       dashboard consulte "mejor ubicación por anuncio" sin las filas crudas
+"""
+import numpy as np
+import pandas as pd
+
+from ad_identity import COLUMNA_CLAVE
+from config import DESGLOSES, UMBRALES
+
+# Métricas que se pueden sumar entre filas del mismo anuncio
+SUMABLES = [
+    'spend', 'results', 'msg_init', 'msg_contacts', 'ig_profile', 'link_clicks',
+    'reach', 'impressions', 'leads', 'purchases', 'conversion_value',
+    'interactions', 'video_views', 'thruplay',
+]
+
+# El alcance son personas únicas: se puede sumar entre grupos disjuntos
+# (cada persona tiene una edad, un sexo, una región) pero no entre
+# ubicaciones, donde la misma persona aparece en Feed y en Stories
+ALCANCE = 'reach'
+DISJUNTAS = {'age', 'gender', 'region'}
+
+# Métricas derivadas: (numerador, denominador, factor)
+DERIVADAS = {
+    'frequency': ('impressions', 'reach', 1),
+    'ctr': ('link_clicks', 'impressions', 100),
+    'cpc': ('spend', 'link_clicks', 1),
+    'cpm': ('spend', 'impressions', 1000),
+    'cpl': ('spend', 'leads', 1),
+    'roas': ('conversion_value', 'spend', 1),
+}
+
+SIN_DATO = "(sin dato)"
+
+
+def _grupo(df):
+    """Columnas que identifican una fila sin desglose (anuncio y, en el histórico, mes)."""
+    return [COLUMNA_CLAVE] + (['periodo'] if 'periodo' in df.columns else [])
+
+
+def detectar_dimensiones(df):
+    """
+    Dimensiones de DESGLOSES['DIMENSIONES'] que toman más de un valor
+    dentro de un mismo anuncio (una columna constante por anuncio, como la
+    ubicación de la conversión en un export común, no es un desglose).
+
+    Returns:
+        list de columnas, vacía si el export no está desglosado
+    """
+    if df is None or df.empty or COLUMNA_CLAVE not in df.columns:
+        return []
+
+    grupo = _grupo(df)
+    if not df.duplicated(grupo).any():
+        return []
+
+    presentes = [d for d in DESGLOSES['DIMENSIONES'] if d in df.columns and df[d].notna().any()]
+    if not presentes:
+        return []
+
+    valores_por_anuncio = df.groupby(grupo, sort=False)[presentes].nunique()
+    return [d for d in presentes if (valores_por_anuncio[d] > 1).any()]
+
+
+def colapsar(df, dimensiones):
+    """
+    Una fila por anuncio (y mes): suma las métricas sumables, recalcula las
+    derivadas y conserva el primer valor no nulo del resto de las columnas.
+    Con alguna dimensión que no es DISJUNTAS el alcance (y con él la
+    frecuencia) queda vacío.
+    """
+    grupo = _grupo(df)
+    suma_alcance = set(dimensiones) <= DISJUNTAS
+    sumables = [c for c in SUMABLES if c in df.columns and (c != ALCANCE or suma_alcance)]
+    otras = [c for c in df.columns if c not in SUMABLES and c not in grupo and c not in dimensiones]
+
+    agrupado = df.groupby(grupo, sort=False)
+    resultado = agrupado[sumables].sum().join(agrupado[otras].first()).reset_index()
+    if ALCANCE in df.columns and not suma_alcance:
+        resultado[ALCANCE] = np.nan
+
+    for columna, (numerador, denominador, factor) in DERIVADAS.items():
+        if columna in resultado.columns and numerador in resultado.columns and denominador in resultado.columns:
+            den = resultado[denominador].to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                derivada = np.where(den > 0, resultado[numerador].to_numpy(dtype=float) / den * factor, 0.0)
+            resultado[columna] = np.where(np.isnan(den), np.nan, derivada)
+
+    resultado = resultado[[c for c in df.columns if c not in dimensiones]]
+    resultado.attrs = dict(df.attrs)
+    return resultado
+
+
+def separar_desgloses(datos):
+    """
+    Colapsa 30d, 7d e histórico si vienen desglosados.
+
+    Args:
+        datos: dict {"30d", "7d", "historico"} de _armar_datos (se modifica)
+
+    Returns:
+        dict {"dimensiones", "filas"} con las filas crudas del 30d para el
+        cubo, o None si el 30d no está desglosado
+    """
+    desglose = None
+    for clave in ("30d", "7d", "historico"):
+        df = datos.get(clave)
+        dimensiones = detectar_dimensiones(df)
+        if not dimensiones:
+            continue
+
+        colapsado = colapsar(df, dimensiones)
+        print(f"     [DESGLOSE] {clave}: {', '.join(dimensiones)} "
+              f"({len(df)} filas -> {len(colapsado)} anuncios)")
+        if clave == "30d":
+            desglose = {"dimensiones": dimensiones, "filas": df}
+        datos[clave] = colapsado
+
+    return desglose
+
+
+def _con_cpa(agregado):
+    score = agregado['score'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        agregado['cpa'] = np.where(score > 0, agregado['gasto'].to_numpy(dtype=float) / score, np.nan)
+    return agregado
+
+
+def _registros(agregado, nombres=None):
+    """Filas del cubo como dicts; nombres mapea _ad_key -> ad_name."""
+    tabla = agregado.reset_index()
+    if nombres is not None:
+        tabla.insert(0, 'ad_name', tabla[COLUMNA_CLAVE].map(nombres))
+        tabla = tabla.drop(columns=COLUMNA_CLAVE)
+    tabla['gasto'] = tabla['gasto'].round(2)
+    tabla['score'] = tabla['score'].round(2)
+    tabla['cpa'] = tabla['cpa'].round(2).astype(object).where(tabla['cpa'].notna(), None)
+    return tabla.to_dict('records')
+
+
+def construir_cubo(desglose, df, pesos=None):
+    """
+    Cubo de score, gasto y CPA por anuncio × valor de cada dimensión.
+
+    Las filas crudas se agrupan una sola vez por (anuncio, todas las
+    dimensiones); el corte de cada dimensión sale de ese resultado.
+    Agrega a df una columna mejor_<dimension> con el valor de menor CPA
+    (con al menos MIN_CONV_EFICIENCIA conversiones) de cada anuncio.
+
+    Args:
+        desglose: {"dimensiones", "filas"} de separar_desgloses
+        df: DataFrame 30d ya colapsado y enriquecido (se modifica)
+        pesos: Pesos de conversiones del cliente (los mismos del score)
+
+    Returns:
+        dict {"dimensiones", "totales", "anuncios", "mejor_por_anuncio"}
+    """
+    from metrics import calcular_score_basico
+
+    dimensiones = desglose["dimensiones"]
+    filas = calcular_score_basico(desglose["filas"].copy(), pesos)
+
+    base = pd.DataFrame({COLUMNA_CLAVE: filas[COLUMNA_CLAVE].to_numpy()})
+    for dim in dimensiones:
+        base[dim] = filas[dim].fillna(SIN_DATO).astype(str).to_numpy()
+    base['gasto'] = pd.to_numeric(filas['spend'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    base['score'] = filas['score'].to_numpy(dtype=float)
+
+    fino = base.groupby([COLUMNA_CLAVE, *dimensiones], sort=False).sum()
+    nombres = df.drop_duplicates(COLUMNA_CLAVE).set_index(COLUMNA_CLAVE)['ad_name']
+
+    cubo = {"dimensiones": dimensiones, "totales": {}, "anuncios": {}, "mejor_por_anuncio": {}}
+    for i, dim in enumerate(dimensiones):
+        por_anuncio = fino if len(dimensiones) == 1 else fino.groupby(level=[0, i + 1], sort=False).sum()
+        por_anuncio = _con_cpa(por_anuncio)
+
+        totales = _con_cpa(por_anuncio.groupby(level=1, sort=False)[['gasto', 'score']].sum())
+        totales['anuncios'] = por_anuncio.groupby(level=1, sort=False).size()
+        cubo["totales"][dim] = sorted(_registros(totales), key=lambda r: r['gasto'], reverse=True)
+        cubo["anuncios"][dim] = _registros(por_anuncio, nombres)
+
+        candidatos = por_anuncio[por_anuncio['score'] >= UMBRALES['MIN_CONV_EFICIENCIA']]
+        mejores = candidatos.sort_values('cpa', kind='stable').reset_index().drop_duplicates(COLUMNA_CLAVE)
+        df[f"mejor_{dim}"] = df[COLUMNA_CLAVE].map(mejores.set_index(COLUMNA_CLAVE)[dim])
+        cubo["mejor_por_anuncio"][dim] = _registros(mejores.set_index([COLUMNA_CLAVE, dim]), nombres)
+
+    return cubo
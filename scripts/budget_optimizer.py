@@ -0,0 +1,184 @@
+"""
+Módulo de optimización de presupuesto V4.
+Calcula cuánto presupuesto mover entre anuncios, no solo cuáles escalar o pausar.
+
+Modelo lineal: cada anuncio rinde 1/CPA conversiones ponderadas por peso
+invertido, ajustado por su ratio de tendencia 7d vs 30d. Con límites mínimo y
+máximo por anuncio, maximizar las conversiones con un presupuesto fijo es una
+mochila fraccionaria: el greedy por rendimiento es la solución óptima del LP y
+se resuelve ordenando una vez y con sumas acumuladas (O(n log n)).
+"""
+import numpy as np
+import pandas as pd
+from config import OPTIMIZADOR
+
+
+def calcular_rendimiento_marginal(df):
+    """
+    Estima las conversiones ponderadas por peso invertido de cada anuncio.
+
+    Rendimiento = (1 / CPA) × factor de tendencia (ratio 7d vs 30d acotado).
+    Anuncios sin CPA válido tienen rendimiento 0.
+
+    Returns:
+        np.ndarray con el rendimiento de cada anuncio
+    """
+    cpa = pd.to_numeric(df['cpa'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    valido = ~np.isnan(cpa) & (cpa > 0)
+
+    rendimiento = np.zeros(len(df))
+    rendimiento[valido] = 1.0 / cpa[valido]
+
+    if 'ratio_tendencia' in df.columns:
+        factor = pd.to_numeric(df['ratio_tendencia'], errors='coerce').fillna(1.0).to_numpy(dtype=float)
+        rendimiento *= np.clip(factor, OPTIMIZADOR['TENDENCIA_MIN'], OPTIMIZADOR['TENDENCIA_MAX'])
+
+    return rendimiento
+
+
+def _gasto_base(df):
+    """
+    Gasto de referencia por anuncio: gasto de 7 días, o el gasto de 30 días
+    llevado a 7 días si no hay datos recientes.
+    """
+    gasto_7d = (
+        pd.to_numeric(df['gasto_7d'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        if 'gasto_7d' in df.columns else np.zeros(len(df))
+    )
+    if gasto_7d.sum() > 0:
+        return gasto_7d
+
+    return _gasto_30d_semanal(df)
+
+
+def _gasto_30d_semanal(df):
+    spend = pd.to_numeric(df['spend'], errors='coerce').fillna(0).to_numpy(dtype=float)
+    return spend * 7 / 30
+
+
+def _gasto_referencia(df, gasto_actual):
+    """
+    Gasto sobre el que se calcula el máximo de cada anuncio: el actual, o
+    el de 30 días llevado a 7 si el anuncio no gastó en la semana (si no,
+    su máximo sería 0 y nunca podría recibir presupuesto).
+    """
+    return np.where(gasto_actual > 0, gasto_actual, _gasto_30d_semanal(df))
+
+
+def asignar_presupuesto(rendimiento, presupuesto, minimo, maximo):
+    """
+    Resuelve max Σ rendimiento·x  s.a.  Σ x = presupuesto, minimo <= x <= maximo.
+
+    Todos los anuncios reciben su mínimo; el resto se asigna en orden de
+    rendimiento descendente hasta el máximo de cada uno. Solo reciben
+    presupuesto extra los anuncios con rendimiento > 0.
+
+    Args:
+        rendimiento: Conversiones por peso de cada anuncio
+        presupuesto: Presupuesto total a repartir
+        minimo: Gasto mínimo por anuncio
+        maximo: Gasto máximo por anuncio
+
+    Returns:
+        tuple: (np.ndarray con la asignación, presupuesto sin asignar)
+    """
+    minimo = np.asarray(minimo, dtype=float)
+    maximo = np.maximum(np.asarray(maximo, dtype=float), minimo)
+
+    # Si los mínimos no entran en el presupuesto, se reducen proporcionalmente
+    total_minimo = minimo.sum()
+    if total_minimo > presupuesto and total_minimo > 0:
+        minimo = minimo * (presupuesto / total_minimo)
+
+    asignacion = minimo.copy()
+    restante = presupuesto - minimo.sum()
+
+    orden = np.argsort(-rendimiento, kind='stable')
+    orden = orden[rendimiento[orden] > 0]
+
+    capacidad = (maximo - minimo)[orden]
+    acumulado_previo = np.cumsum(capacidad) - capacidad
+    asignacion[orden] += np.clip(restante - acumulado_previo, 0, capacidad)
+
+    return asignacion, max(presupuesto - asignacion.sum(), 0.0)
+
+
+def optimizar_presupuesto(df, presupuesto_total=None, min_ratio=None, max_ratio=None):
+    """
+    Calcula la reasignación óptima del presupuesto semanal entre anuncios.
+
+    Args:
+        df: DataFrame enriquecido (cpa, ratio_tendencia, gasto_7d)
+        presupuesto_total: Presupuesto semanal a repartir (por defecto el gasto
+                           actual de 7 días)
+        min_ratio: Gasto mínimo por anuncio como ratio de su gasto actual
+        max_ratio: Gasto máximo por anuncio como ratio de su gasto actual
+                   (o de su gasto de 30 días llevado a 7 si no gastó en 7 días)
+
+    Returns:
+        tuple: (DataFrame por anuncio con gasto actual/óptimo, dict resumen)
+    """
+    min_ratio = OPTIMIZADOR['MIN_RATIO'] if min_ratio is None else min_ratio
+    max_ratio = OPTIMIZADOR['MAX_RATIO'] if max_ratio is None else max_ratio
+
+    gasto_actual = _gasto_base(df)
+    rendimiento = calcular_rendimiento_marginal(df)
+
+    if presupuesto_total is None:
+        presupuesto_total = gasto_actual.sum()
+
+    gasto_optimo, sin_asignar = asignar_presupuesto(
+        rendimiento,
+        presupuesto_total,
+        gasto_actual * min_ratio,
+        _gasto_referencia(df, gasto_actual) * max_ratio,
+    )
+
+    delta = gasto_optimo - gasto_actual
+    conversiones_actuales = float(rendimiento @ gasto_actual)
+    conversiones_optimas = float(rendimiento @ gasto_optimo)
+
+    detalle = pd.DataFrame({
+        'ad_name': df['ad_name'].to_numpy() if 'ad_name' in df.columns else np.arange(len(df)),
+        'gasto_actual': gasto_actual,
+        'gasto_optimo': gasto_optimo,
+        'delta_gasto': delta,
+        'delta_conversiones': rendimiento * delta,
+    }, index=df.index)
+
+    delta_pct = (
+        (conversiones_optimas / conversiones_actuales - 1) * 100
+        if conversiones_actuales > 0 else 0
+    )
+
+    movimientos = detalle.reindex(
+        detalle['delta_gasto'].abs().sort_values(ascending=False).index
+    )
+    movimientos = movimientos[movimientos['delta_gasto'].abs() > 0.5].head(OPTIMIZADOR['TOP_MOVIMIENTOS'])
+
+    resumen = {
+        'presupuesto_total': round(float(presupuesto_total), 2),
+        'sin_asignar': round(float(sin_asignar), 2),
+        'conversiones_actuales': round(conversiones_actuales, 2),
+        'conversiones_esperadas': round(conversiones_optimas, 2),
+        'delta_conversiones': round(conversiones_optimas - conversiones_actuales, 2),
+        'delta_pct': round(delta_pct, 1),
+        'anuncios_suben': int((delta > 0.5).sum()),
+        'anuncios_bajan': int((delta < -0.5).sum()),
+        'movimientos': [
+            {
+                'ad_name': row['ad_name'],
+                'gasto_actual': round(row['gasto_actual'], 0),
+                'gasto_optimo': round(row['gasto_optimo'], 0),
+                'delta_gasto': round(row['delta_gasto'], 0),
+            }
+            for row in movimientos.to_dict('records')
+        ],
+    }
+
+    return detalle, resumen
+
+
+def resumen_reasignacion(df, presupuesto_total=None):
+    """Igual que optimizar_presupuesto pero devuelve solo el resumen (para el JSON)."""
+    return optimizar_presupuesto(df, presupuesto_total)[1]
@@ -0,0 +1,233 @@
+"""
+CLI del pipeline de Meta Ads V4.
+
+Subcomandos:
+    list-clients            Lista los clientes detectados en crudo/
+    plan [CLIENTE ...]      Muestra qué archivos y salidas procesaría cada cliente
+    run [CLIENTE ...]       Ejecuta el pipeline (todos los clientes si no se indica)
+        --outputs json      Genera solo las salidas indicadas y calcula solo lo
+                            que esas salidas necesitan (repetible o "json,txt").
+                            --only es un alias.
+        --workers 4         Clientes procesados a la vez (cola persistente)
+        --reanudar [LOTE]   Retoma una corrida cortada (por defecto la última)
+        --motor polars      Métricas y análisis con Polars (plan lazy multi-hilo)
+                            en lugar de pandas (por defecto MOTOR['BACKEND'])
+    status [--lote LOTE]    Progreso de la cola: estados, throughput y ETA
+    watch                   Vigila crudo/ y reprocesa los clientes cuyos
+                            exports cambian (acepta --outputs)
+    serve                   API HTTP local de informes para el dashboard
+
+Listar y planificar solo leen nombres de archivo: no importan pandas ni
+reportlab. Los módulos pesados se importan dentro de cada etapa del run.
+
+Uso:
+    python cli.py list-clients
+    python cli.py plan TOLENTINOS
+    python cli.py run TOLENTINOS --outputs json
+    python cli.py run --workers 4
+    python cli.py run TOLENTINOS --motor polars
+    python cli.py status
+    python cli.py watch --outputs json,txt
+    python cli.py serve --puerto 8765
+"""
+import argparse
+import os
+import sys
+
+from config import INFORMES_DIR, LIMPIOS_DIR
+from main import SALIDAS, resolver_salidas
+from file_discovery import (
+    detectar_tipo_archivo,
+    hojas_libro,
+    identificar_clientes,
+    listar_archivos_cliente,
+)
+
+
+
+def _salidas(args):
+    """Aplana --outputs json --outputs txt / --outputs json,txt."""
+    if not args.outputs:
+        return list(SALIDAS)
+    return [s.strip() for valor in args.outputs for s in valor.split(",") if s.strip()]
+
+
+def _clientes_o_todos(clientes):
+    return [c.upper() for c in clientes] if clientes else identificar_clientes()
+
+
+def cmd_list_clients(args):
+    clientes = identificar_clientes()
+    if not clientes:
+        print("No se encontraron clientes en crudo/.")
+        return 1
+
+    for cliente in clientes:
+        print(f"{cliente:<20} {len(listar_archivos_cliente(cliente))} archivo(s)")
+    return 0
+
+
+def cmd_plan(args):
+    salidas, secciones = resolver_salidas(_salidas(args))
+    clientes = _clientes_o_todos(args.clientes)
+    if not clientes:
+        print("No se encontraron clientes en crudo/.")
+        return 1
+
+    for cliente in clientes:
+        print(f"\n{cliente}")
+        tipos = []
+        for filepath in listar_archivos_cliente(cliente):
+            tipo, periodo = detectar_tipo_archivo(filepath)
+            if tipo != "otro":
+                tipos.append((tipo, periodo, os.path.basename(filepath)))
+                continue
+            # Libro con una hoja por período: Cliente.xlsx[30d], [7d], [sep]...
+            for hoja in hojas_libro(filepath):
+                tipo, periodo = detectar_tipo_archivo(f"-{hoja.strip()}")
+                tipos.append((tipo, periodo, f"{os.path.basename(filepath)}[{hoja}]"))
+
+        for tipo, periodo, nombre in tipos:
+            etiqueta = f"HIST-{periodo.upper()}" if tipo == "mes" else tipo.upper()
+            print(f"  [{etiqueta:<8}] {nombre}")
+
+        if not any(tipo in ("30d", "diario") for tipo, _, _ in tipos):
+            print("  [ERROR] Falta el archivo -30d (o -diario): el cliente no se puede procesar")
+            continue
+
+        destinos = {
+            "excel": f"{LIMPIOS_DIR}/{cliente}-30d-clean.xlsx",
+            "txt": f"{INFORMES_DIR}/{cliente}-informe.txt",
+            "json": f"{INFORMES_DIR}/{cliente}-informe.json",
+            "pdf": f"{INFORMES_DIR}/{cliente}-informe.pdf",
+        }
+        for salida in SALIDAS:
+            if salida in salidas:
+                print(f"  -> {salida.upper():<5} {destinos[salida]}")
+        print(f"  Secciones: {', '.join(sorted(secciones)) or 'solo métricas'}")
+    return 0
+
+
+def _lote(lote):
+    """Resuelve "ultimo" (o None) al lote más reciente de la cola."""
+    from contextlib import closing
+    from job_queue import conectar, ultimo_lote
+
+    if lote not in (None, "ultimo"):
+        return lote
+    with closing(conectar()) as conn:
+        return ultimo_lote(conn)
+
+
+def cmd_run(args):
+    from main import ejecutar_pipeline
+
+    lote = None
+    if args.reanudar:
+        lote = _lote(args.reanudar)
+        if lote is None:
+            print("La cola está vacía: no hay corrida para reanudar.")
+            return 1
+        clientes = [c.upper() for c in args.clientes]
+    else:
+        clientes = _clientes_o_todos(args.clientes)
+
+    resultados = ejecutar_pipeline(clientes=clientes, salidas=_salidas(args),
+                                   workers=args.workers, lote=lote, motor=args.motor)
+    return 0 if resultados else 1
+
+
+def cmd_status(args):
+    from contextlib import closing
+    from job_queue import conectar, estado_lote, imprimir_estado
+
+    lote = _lote(args.lote)
+    if lote is None:
+        print("La cola está vacía.")
+        return 1
+
+    with closing(conectar()) as conn:
+        estado = estado_lote(conn, lote)
+    if estado is None:
+        print(f"No existe el lote {lote}.")
+        return 1
+
+    imprimir_estado(estado)
+    return 0
+
+
+def cmd_watch(args):
+    from watcher import vigilar
+
+    salidas, _ = resolver_salidas(_salidas(args))
+    return vigilar(
+        salidas=salidas,
+        intervalo=args.intervalo,
+        debounce=args.debounce,
+        forzar_polling=args.polling,
+        precargar=not args.sin_precarga,
+    )
+
+
+def cmd_serve(args):
+    from report_server import servir
+
+    return servir(args.host, args.puerto)
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Meta Ads Analyzer V4")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("list-clients", help="Listar clientes detectados en crudo/")
+    p.set_defaults(func=cmd_list_clients)
+
+    for nombre, func, ayuda in [
+        ("plan", cmd_plan, "Mostrar archivos y salidas sin procesar"),
+        ("run", cmd_run, "Ejecutar el pipeline"),
+    ]:
+        p = sub.add_parser(nombre, help=ayuda)
+        p.add_argument("clientes", nargs="*", help="Clientes (por defecto todos)")
+        p.add_argument("--outputs", "--only", dest="outputs", action="append",
+                       help=f"Salidas a generar: {', '.join(SALIDAS)} (repetible)")
+        p.set_defaults(func=func)
+        if nombre == "run":
+            p.add_argument("--workers", type=int, help="Procesos en paralelo (por defecto COLA['WORKERS'])")
+            p.add_argument("--reanudar", nargs="?", const="ultimo", metavar="LOTE",
+                           help="Reanudar un lote de la cola (por defecto el último)")
+            p.add_argument("--motor", choices=("pandas", "polars"),
+                           help="Motor de métricas y análisis (por defecto MOTOR['BACKEND'])")
+
+    p = sub.add_parser("status", help="Progreso de la cola de trabajos")
+    p.add_argument("--lote", help="Lote a mostrar (por defecto el último)")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("watch", help="Vigilar crudo/ y reprocesar al llegar exports")
+    p.add_argument("--outputs", "--only", dest="outputs", action="append",
+                   help=f"Salidas a generar: {', '.join(SALIDAS)} (repetible)")
+    p.add_argument("--intervalo", type=float, help="Segundos entre escaneos (polling)")
+    p.add_argument("--debounce", type=float, help="Segundos sin cambios para procesar un archivo")
+    p.add_argument("--polling", action="store_true", help="No usar inotify")
+    p.add_argument("--sin-precarga", action="store_true",
+                   help="No parsear los exports actuales al arrancar")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("serve", help="API HTTP local de informes")
+    p.add_argument("--host", help="Interfaz (por defecto SERVIDOR['HOST'])")
+    p.add_argument("--puerto", type=int, help="Puerto (por defecto SERVIDOR['PUERTO'])")
+    p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,12 +17,18 @@ ROOT_DIR = os.path.dirname(SCRIPT_DIR)
 CRUDA_DIR = os.path.join(ROOT_DIR, 'crudo')           # Archivos Excel originales de Meta Ads
 LIMPIOS_DIR = os.path.join(ROOT_DIR, 'limpios')       # Datos procesados y normalizados
 INFORMES_DIR = os.path.join(ROOT_DIR, 'informes')     # PDFs y reportes generados
-SCHEMA_DIR = os.path.join(ROOT_DIR, 'schema')         # Archivos JSON de configuración
+SCHEMA_DIR = os.path.join(SCRIPT_DIR, 'schema')       # Archivos JSON de configuración (scripts/schema)
 WEB_DIR = os.path.join(ROOT_DIR, 'web')               # Dashboard web
 
-# Crear directorios si no existen
-for directorio in [LIMPIOS_DIR, INFORMES_DIR, SCHEMA_DIR, WEB_DIR]:
-    os.makedirs(directorio, exist_ok=True)
+
+
+def asegurar_directorios():
+    """
+    Crea los directorios de salida si no existen.
+    Se llama desde las etapas que escriben archivos, no al importar config.
+    """
+    for directorio in [LIMPIOS_DIR, INFORMES_DIR, WEB_DIR]:
+        os.makedirs(directorio, exist_ok=True)
 
 
 # ==============================================
@@ -42,6 +48,10 @@ PESOS_CONVERSIONES = {
     'thruplay': 0.1,         # Video visto completo = bajo valor
 }
 
+# Ajustes por cliente (nombre en mayúsculas -> pesos que reemplazan a los de arriba)
+# Ejemplo: 'TOLENTINOS': {'leads': 1.5, 'link_clicks': 0.1}
+PESOS_CONVERSIONES_CLIENTE = {}
+
 
 # ==============================================
 # PESOS POR OBJETIVO DE CAMPAÑA
@@ -91,6 +101,17 @@ PESOS_POR_OBJETIVO = {
 }
 
 
+# ==============================================
+# NORMALIZACIÓN DEL SCORE 0-100
+# ==============================================
+SCORE_NORMALIZACION = {
+    # True = comparar cada anuncio solo con anuncios de su mismo objetivo
+    'POR_OBJETIVO': True,
+    # 'max' = valor / máximo del grupo | 'percentil' = rango percentil del grupo
+    'METODO': 'max',
+}
+
+
 # ==============================================
 # UMBRALES DE DECISIÓN PARA RECOMENDACIONES
 # ==============================================
@@ -125,6 +146,154 @@ UMBRALES = {
 }
 
 
+# ==============================================
+# OPTIMIZADOR DE REASIGNACIÓN DE PRESUPUESTO
+# Límites por anuncio como ratio de su gasto de los últimos 7 días
+# ==============================================
+OPTIMIZADOR = {
+    'MIN_RATIO': 0.0,                   # Gasto mínimo = 0% del gasto 7d (se puede pausar)
+    'MAX_RATIO': 2.0,                   # Gasto máximo = 200% del gasto 7d (o del 30d llevado a 7 días)
+    'TENDENCIA_MIN': 0.5,               # Factor de tendencia mínimo aplicado al rendimiento
+    'TENDENCIA_MAX': 1.5,               # Factor de tendencia máximo aplicado al rendimiento
+    'TOP_MOVIMIENTOS': 10,              # Movimientos informados en el JSON
+}
+
+
+# ==============================================
+# PARALELISMO DENTRO DE UN CLIENTE
+# Las etapas posteriores a enriquecer_dataframe corren en procesos separados
+# solo para clientes grandes (para chicos el arranque de procesos no compensa)
+# ==============================================
+PARALELISMO = {
+    'HABILITADO': True,
+    'MIN_FILAS': 20000,                 # Filas de 30d a partir de las cuales paralelizar
+    'MAX_WORKERS': None,                # None = cantidad de CPUs
+}
+
+
+# ==============================================
+# MODO WATCH (cli.py watch)
+# ==============================================
+WATCH = {
+    'INTERVALO_POLLING': 2.0,           # Segundos entre escaneos si no hay inotify
+    'DEBOUNCE': 3.0,                    # Segundos sin cambios para dar un archivo por completo
+}
+
+
+# ==============================================
+# API LOCAL DE INFORMES (cli.py serve)
+# ==============================================
+SERVIDOR = {
+    'HOST': '127.0.0.1',
+    'PUERTO': 8765,
+    'CACHE_CLIENTES': 16,               # Informes de clientes en memoria (LRU)
+    'POR_PAGINA': 50,                   # Anuncios por página por defecto
+    'MAX_POR_PAGINA': 500,
+    'CORS_ORIGEN': '*',                 # Origen permitido para el dashboard
+}
+
+
+# ==============================================
+# COLA DE TRABAJOS (cli.py run / status)
+# Cada cliente es un trabajo en una base SQLite local: un corte o Ctrl+C
+# no pierde lo ya procesado y los fallos transitorios (E/S, base bloqueada)
+# se reintentan con espera creciente
+# ==============================================
+COLA = {
+    'RUTA': os.path.join(ROOT_DIR, 'cola.sqlite3'),
+    'WORKERS': 1,                       # Procesos que toman clientes de la cola a la vez
+    'MAX_INTENTOS': 3,                  # Intentos por cliente ante errores transitorios
+    'BACKOFF_BASE': 5.0,                # Segundos de espera tras el 1er fallo (se duplica)
+    'BACKOFF_MAX': 300.0,
+    'ESPERA_VACIA': 0.5,                # Segundos entre consultas si no hay trabajo listo
+}
+
+
+# ==============================================
+# BENCHMARK ENTRE CLIENTES
+# Percentil de cada anuncio contra todo el portafolio procesado (mismo
+# objetivo), además de la comparación con la mediana de su propia cuenta
+# ==============================================
+BENCHMARK = {
+    'HABILITADO': True,
+    'RUTA': os.path.join(ROOT_DIR, 'benchmark.sqlite3'),
+    'MIN_PARES': 30,                    # Valores mínimos del objetivo para compararse solo con él
+}                                       # (si hay menos, se compara contra todo el portafolio)
+
+
+# ==============================================
+# VALIDACIÓN DE DATOS (validacion.py)
+# Filas imposibles van a cuarentena en lugar de verse como anuncios sin
+# resultados (y recibir un PAUSAR falso)
+# ==============================================
+VALIDACION = {
+    'HABILITADO': True,
+    'CTR_MAXIMO': 100.0,                # CTR (%) por encima de esto es un dato corrupto
+    # Columnas que el schema espera: si faltan o vienen todas en 0 se avisa
+    'COLUMNAS_ESPERADAS': ['spend', 'impressions', 'results'],
+}
+
+
+# ==============================================
+# EMPAREJAMIENTO DE ANUNCIOS ENTRE PERÍODOS (ad_matching.py)
+# Enlaza anuncios del 7d y del histórico con su par del 30d cuando el
+# nombre cambió un poco ("- Copia", emojis, ediciones del copy)
+# ==============================================
+EMPAREJAMIENTO = {
+    'HABILITADO': True,
+    'RUTA': os.path.join(ROOT_DIR, 'emparejamientos.sqlite3'),
+    'UMBRAL': 0.85,                     # Similitud mínima (Dice de n-gramas, 0-1)
+    'NGRAMA': 3,                        # Largo de los n-gramas de caracteres
+    'CANDIDATOS': 5,                    # Candidatos por nombre que se comparan completos
+    'MAX_BLOQUE': 100,                  # N-gramas en más nombres del 30d no generan candidatos
+    'TANDA': 2000,                      # Nombres por tanda del cruce (acota la memoria)
+}
+
+
+# ==============================================
+# EXPORTS CON DESGLOSE (ubicación, edad, sexo, región)
+# Meta repite cada anuncio una vez por valor del desglose
+# ==============================================
+DESGLOSES = {
+    'DIMENSIONES': ['placement', 'age', 'gender', 'region'],
+}
+
+
+# ==============================================
+# CUANTILES APROXIMADOS (sketch KLL, cuantiles.py)
+# Medianas y p10/p90 de portafolio o histórico en memoria acotada
+# ==============================================
+CUANTILES = {
+    'K': 200,                           # Precisión: error de rango ~1.7/K (200 = ~1%)
+    'SEMILLA': 0,                       # Semilla del sketch (resultados reproducibles)
+    # Referencia de las categorías de eficiencia:
+    #   'mediana'    ratio del CPA vs mediana de la cuenta (UMBRALES['EFICIENCIA_*'])
+    #   'cuenta'     p10/p50/p90 del CPA de la cuenta
+    #   'portafolio' p10/p50/p90 del CPA de todos los clientes (sketches del benchmark)
+    'EFICIENCIA': 'mediana',
+}
+
+
+# ==============================================
+# EXPORT DIARIO (serie_diaria.py)
+# Un export con desglose por día reemplaza al 30d, 7d y a los mensuales
+# ==============================================
+SERIE_DIARIA = {
+    'DIAS_30D': 30,                     # Días de la ventana que reemplaza al -30d
+    'DIAS_7D': 7,                       # Días de la ventana que reemplaza al -7d
+}
+
+
+# ==============================================
+# MOTOR DE CÁLCULO (polars_backend.py, cli.py run --motor)
+# 'polars' arma métricas y análisis como un plan lazy multi-hilo; si polars
+# no está instalado se usa pandas
+# ==============================================
+MOTOR = {
+    'BACKEND': 'pandas',                # 'pandas' | 'polars'
+}
+
+
 # ==============================================
 # DETECCIÓN DE ANOMALÍAS
 # Parámetros para identificar comportamientos anómalos
@@ -149,6 +318,8 @@ ANOMALIAS = {
 # ==============================================
 META_COLS = {
     'Nombre del anuncio': 'ad_name',
+    'Nombre de la campaña': 'campaign_name',
+    'Nombre del conjunto de anuncios': 'adset_name',
     'Importe gastado (ARS)': 'spend',
     'Resultados': 'results',
     'Conversaciones con mensajes iniciadas': 'msg_init',
@@ -157,6 +328,9 @@ META_COLS = {
     'Visitas al perfil de Instagram': 'ig_profile',
     'Objetivo': 'objective',
     'Ubicación de la conversión': 'placement',
+    'Edad': 'age',
+    'Sexo': 'gender',
+    'Región': 'region',
     'Inicio del informe': 'date_start',
     'Fin del informe': 'date_end',
     'Alcance': 'reach',
@@ -0,0 +1,170 @@
+"""
+Cuantiles aproximados en memoria acotada V4.
+calcular_mediana_cpa materializa todos los CPA válidos y llama a .median():
+alcanza para una cuenta, pero no para medianas de todo el portafolio o de
+todo el histórico (millones de anuncio-día), donde además se quieren p10 y
+p90 para las categorías de eficiencia.
+
+SketchCuantiles es un sketch KLL: guarda a lo sumo unos 3·K valores sin
+importar cuántos se agreguen, con error de rango de ~1.7/K (K=200 -> ~1%).
+Se actualiza de a lotes (por archivo, por cliente) y dos sketches se fusionan
+sin perder precisión, así cada worker arma el suyo y se combinan al final.
+"""
+import io
+import math
+
+import numpy as np
+
+from config import CUANTILES
+
+# Razón de capacidad entre un nivel y el de arriba (valor del paper de KLL)
+C = 2 / 3
+
+
+class SketchCuantiles:
+    """
+    Sketch KLL de valores float.
+
+    Cada nivel h es un "compactor" cuyos valores pesan 2^h. Cuando un nivel
+    se llena se ordena y sube la mitad de sus valores (los de posición par o
+    impar, al azar) al nivel siguiente.
+
+    Uso:
+        sketch = SketchCuantiles()
+        sketch.agregar(df["cpa"])
+        sketch.fusionar(sketch_de_otro_cliente)
+        p10, p50, p90 = sketch.cuantiles([0.1, 0.5, 0.9])
+    """
+
+    def __init__(self, k=None, semilla=None):
+        self.k = k or CUANTILES["K"]
+        self.n = 0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self._niveles = [np.empty(0)]
+        self._rng = np.random.default_rng(CUANTILES["SEMILLA"] if semilla is None else semilla)
+
+    def __len__(self):
+        """Cantidad de valores agregados (no la de valores guardados)."""
+        return self.n
+
+    def _capacidad(self, nivel):
+        profundidad = len(self._niveles) - nivel - 1
+        return max(2, int(math.ceil(self.k * C ** profundidad)))
+
+    def _tamano_maximo(self):
+        return sum(self._capacidad(h) for h in range(len(self._niveles)))
+
+    def _tamano(self):
+        return sum(len(nivel) for nivel in self._niveles)
+
+    def _comprimir(self):
+        """Compacta niveles llenos, de abajo hacia arriba, hasta entrar en memoria."""
+        while self._tamano() >= self._tamano_maximo():
+            for h in range(len(self._niveles)):
+                nivel = self._niveles[h]
+                if len(nivel) < self._capacidad(h):
+                    continue
+                if h + 1 == len(self._niveles):
+                    self._niveles.append(np.empty(0))
+
+                nivel = np.sort(nivel)
+                # Con cantidad impar, un valor queda en el nivel
+                resto = nivel[len(nivel) - len(nivel) % 2:]
+                pares = nivel[:len(nivel) - len(nivel) % 2]
+                sube = pares[self._rng.integers(2)::2]
+
+                self._niveles[h] = resto
+                self._niveles[h + 1] = np.concatenate([self._niveles[h + 1], sube])
+                if self._tamano() < self._tamano_maximo():
+                    break
+
+    def agregar(self, valores):
+        """
+        Agrega un lote de valores (array, Serie o lista); ignora NaN e infinitos.
+
+        Returns:
+            self, para encadenar
+        """
+        valores = np.asarray(valores, dtype=float).ravel()
+        valores = valores[np.isfinite(valores)]
+        if not len(valores):
+            return self
+
+        self.n += len(valores)
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+        self._niveles[0] = np.concatenate([self._niveles[0], valores])
+        self._comprimir()
+        return self
+
+    def fusionar(self, otro):
+        """
+        Suma a este sketch los valores resumidos en otro (sin modificarlo).
+
+        Returns:
+            self, para encadenar
+        """
+        if not otro.n:
+            return self
+
+        while len(self._niveles) < len(otro._niveles):
+            self._niveles.append(np.empty(0))
+        for h, nivel in enumerate(otro._niveles):
+            self._niveles[h] = np.concatenate([self._niveles[h], nivel])
+
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._comprimir()
+        return self
+
+    def copia(self):
+        nuevo = SketchCuantiles(self.k)
+        nuevo.fusionar(self)
+        return nuevo
+
+    def cuantiles(self, probabilidades):
+        """
+        Cuantiles aproximados (p en [0, 1]); el 0 y el 1 son exactos.
+
+        Returns:
+            np.ndarray, NaN si el sketch está vacío
+        """
+        probabilidades = np.asarray(probabilidades, dtype=float)
+        if not self.n:
+            return np.full(probabilidades.shape, np.nan)
+
+        valores = np.concatenate(self._niveles)
+        pesos = np.concatenate([np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(self._niveles)])
+        orden = np.argsort(valores, kind="stable")
+        valores = valores[orden]
+        acumulado = np.cumsum(pesos[orden])
+
+        # Primer valor cuyo peso acumulado alcanza p·total
+        posicion = np.searchsorted(acumulado, probabilidades * acumulado[-1], side="left")
+        resultado = valores[np.minimum(posicion, len(valores) - 1)]
+        resultado = np.where(probabilidades <= 0, self.minimo, resultado)
+        return np.where(probabilidades >= 1, self.maximo, resultado)
+
+    def cuantil(self, probabilidad):
+        return float(self.cuantiles([probabilidad])[0])
+
+    def a_bytes(self):
+        """Serializa el sketch (npz sin pickle) para guardarlo o enviarlo."""
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            meta=np.array([self.k, self.n, self.minimo, self.maximo], dtype=float),
+            **{f"nivel_{h}": nivel for h, nivel in enumerate(self._niveles)},
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def desde_bytes(cls, datos):
+        with np.load(io.BytesIO(datos), allow_pickle=False) as archivo:
+            k, n, minimo, maximo = archivo["meta"]
+            sketch = cls(int(k))
+            sketch.n, sketch.minimo, sketch.maximo = int(n), float(minimo), float(maximo)
+            sketch._niveles = [archivo[f"nivel_{h}"] for h in range(len(archivo.files) - 1)]
+        return sketch
@@ -6,24 +6,43 @@ Módulo de carga de datos V4 – FIX DEFINITIVO
 """
 
 import pandas as pd
-import glob
+import io
 import os
-import json
 import re
+import json
+import unicodedata
 from pathlib import Path
-from config import CRUDA_DIR, COLUMNAS_NUMERICAS, SCHEMA_DIR
-from pandas.api.types import is_numeric_dtype
+from ad_identity import asignar_claves_anuncio
+from ad_matching import emparejar_anuncios
+from breakdowns import separar_desgloses
+from config import COLUMNAS_NUMERICAS, SCHEMA_DIR, VALIDACION
+from file_discovery import (
+    detectar_tipo_archivo,
+    firma_archivo,
+    identificar_clientes,
+    leer_miembro_zip,
+    listar_archivos_cliente,
+    partir_ruta_zip,
+)
+from numeric_parser import parsear_columnas_numericas
+from serie_diaria import derivar_ventanas
+from validacion import resumen_calidad, validar_export
 import warnings
 
-warnings.filterwarnings("ignore")
-print(">>> DATA_LOADER V4 FIX DEFINITIVO CARGADO <<<")
-
 # -----------------------------------------------------------------------------
 # SCHEMA
 # -----------------------------------------------------------------------------
 
+# Índice invertido compilado una vez por proceso (se invalida por mtime)
+_INDICE_SCHEMA = {"mtime": None, "indice": {}}
+
+
+def _ruta_schema_columnas():
+    return Path(SCHEMA_DIR) / "columnas.json"
+
+
 def cargar_schema_columnas():
-    schema_path = Path(SCHEMA_DIR) / "columnas.json"
+    schema_path = _ruta_schema_columnas()
 
     if schema_path.exists():
         with open(schema_path, "r", encoding="utf-8") as f:
@@ -33,40 +52,106 @@ def cargar_schema_columnas():
     print("  [AVISO] No se encontró schema/columnas.json, usando mapeo básico")
     return {}
 
+
+def clave_encabezado(nombre) -> str:
+    """
+    Normaliza un encabezado para búsqueda: sin acentos, minúsculas y
+    espacios colapsados ("Importe  gastado (ARS)" == "importe gastado (ars)").
+    """
+    texto = unicodedata.normalize("NFKD", str(nombre))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(texto.lower().split())
+
+
+def compilar_schema_columnas() -> dict:
+    """
+    Devuelve el índice invertido {encabezado normalizado: columna interna}.
+
+    El JSON se lee y compila una sola vez por proceso; solo se vuelve a
+    leer si cambia el mtime de schema/columnas.json.
+    """
+    schema_path = _ruta_schema_columnas()
+    try:
+        mtime = schema_path.stat().st_mtime
+    except OSError:
+        mtime = -1
+
+    if _INDICE_SCHEMA["mtime"] == mtime:
+        return _INDICE_SCHEMA["indice"]
+
+    indice = {}
+    for nombre_normalizado, variantes in cargar_schema_columnas().items():
+        for variante in [nombre_normalizado, *variantes]:
+            # La primera aparición gana, igual que el recorrido en orden del schema
+            indice.setdefault(clave_encabezado(variante), nombre_normalizado)
+
+    _INDICE_SCHEMA["mtime"] = mtime
+    _INDICE_SCHEMA["indice"] = indice
+    return indice
+
+
+def _mapear_por_heuristica(col_lower: str):
+    if any(x in col_lower for x in ["gasto", "spent", "spend", "importe"]):
+        return "spend"
+    if col_lower in ["resultados", "results", "result"]:
+        return "results"
+    if "clic" in col_lower and "enlace" in col_lower:
+        return "link_clicks"
+    if col_lower in ["clics", "clicks"]:
+        return "link_clicks"
+    return None
+
 # -----------------------------------------------------------------------------
 # NORMALIZACIÓN
 # -----------------------------------------------------------------------------
 
 def normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
-    schema = cargar_schema_columnas()
+    """
+    Renombra encabezados de Meta a nombres internos con el índice compilado
+    del schema (O(columnas)) y, si no hay match, con heurísticas.
+
+    El detalle queda en df.attrs["mapeo_columnas"]:
+    {"schema": {...}, "heuristica": {...}, "sin_mapear": [...]}
+    """
+    indice = compilar_schema_columnas()
     mapping = {}
+    reporte = {"schema": {}, "heuristica": {}, "sin_mapear": []}
 
     for col in df.columns:
-        col_clean = str(col).strip()
-
-        for nombre_normalizado, variantes in schema.items():
-            if col_clean in variantes:
-                mapping[col] = nombre_normalizado
-                break
+        destino = indice.get(clave_encabezado(col))
+        if destino is not None:
+            reporte["schema"][col] = destino
 
-        if col not in mapping:
-            col_lower = col_clean.lower()
+    # La heurística solo completa destinos que el schema no cubrió
+    # (evita que 'CTR (... clics en el enlace)' duplique link_clicks)
+    usados = set(reporte["schema"].values())
+    for col in df.columns:
+        if col in reporte["schema"]:
+            continue
+        destino = _mapear_por_heuristica(clave_encabezado(col))
+        if destino is None or destino in usados:
+            reporte["sin_mapear"].append(col)
+            continue
+        reporte["heuristica"][col] = destino
+        usados.add(destino)
 
-            if any(x in col_lower for x in ["gasto", "spent", "spend", "importe"]):
-                mapping[col] = "spend"
-            elif col_lower in ["resultados", "results", "result"]:
-                mapping[col] = "results"
-            elif "clic" in col_lower and "enlace" in col_lower:
-                mapping[col] = "link_clicks"
-            elif col_lower in ["clics", "clicks"]:
-                mapping[col] = "link_clicks"
+    for col, destino in {**reporte["schema"], **reporte["heuristica"]}.items():
+        if destino != col:
+            mapping[col] = destino
 
-    return df.rename(columns=mapping)
+    df = df.rename(columns=mapping)
+    df.attrs["mapeo_columnas"] = reporte
+    return df
 
 def asegurar_columnas(df: pd.DataFrame) -> pd.DataFrame:
-    for col in COLUMNAS_NUMERICAS:
-        if isinstance(col, str) and col not in df.columns:
-            df[col] = 0
+    """
+    Crea en 0 las columnas numéricas que el export no trae (las lista en
+    df.attrs["columnas_creadas"] para la validación) y asegura ad_name.
+    """
+    creadas = [col for col in COLUMNAS_NUMERICAS if isinstance(col, str) and col not in df.columns]
+    for col in creadas:
+        df[col] = 0
+    df.attrs["columnas_creadas"] = creadas
 
     if "ad_name" not in df.columns:
         for c in df.columns:
@@ -81,62 +166,175 @@ def asegurar_columnas(df: pd.DataFrame) -> pd.DataFrame:
 
 def convertir_numericos(df: pd.DataFrame) -> pd.DataFrame:
     """
-    FIX CLAVE:
-    - Evita df[col].dtype cuando col no es Serie
-    - Convierte solo Series válidas
-    """
+    Convierte las columnas numéricas con el parser regional (numeric_parser):
+    detecta '1.234,56' vs '1,234.56' por columna y convierte todas las
+    columnas en una pasada vectorizada.
 
-    for col in COLUMNAS_NUMERICAS:
-        if not isinstance(col, str):
-            continue
-
-        if col not in df.columns:
-            continue
-
-        serie = df[col]
-
-        # Si por error vino como DataFrame (defensa extra)
-        if isinstance(serie, pd.DataFrame):
-            serie = serie.iloc[:, 0]
+    Las celdas con contenido que no se pudieron convertir quedan en 0 y se
+    informan en df.attrs["celdas_forzadas"] ({columna: cantidad}) y en
+    df.attrs["filas_forzadas"] ({columna: índice de las filas}).
+    """
+    columnas = [
+        col for col in COLUMNAS_NUMERICAS
+        if isinstance(col, str) and col in df.columns
+    ]
 
-        if not is_numeric_dtype(serie):
-            serie = (
-                serie.astype(str)
-                .str.replace("%", "", regex=False)
-                .str.replace(",", ".", regex=False)
-            )
+    convertidas, forzadas, formatos = parsear_columnas_numericas(df, columnas)
 
-        df[col] = pd.to_numeric(serie, errors="coerce").fillna(0)
+    for col in columnas:
+        df[col] = convertidas[col].fillna(0)
 
+    df.attrs["celdas_forzadas"] = {col: len(filas) for col, filas in forzadas.items()}
+    df.attrs["filas_forzadas"] = {col: filas.tolist() for col, filas in forzadas.items()}
+    df.attrs["formatos_numericos"] = formatos
     return df
 
 # -----------------------------------------------------------------------------
 # ARCHIVOS
 # -----------------------------------------------------------------------------
 
-def detectar_tipo_archivo(filepath):
-    filename = os.path.basename(filepath).lower()
+# Frames ya parseados por ruta, reutilizados mientras el archivo no cambie
+# (el modo watch evita releer los exports que no se tocaron)
+_CACHE_ARCHIVOS = {}
+
+# Hoja de un libro por cliente: "Cliente.xlsx[30d]"
+_RE_HOJA = re.compile(r"\[([^\]]+)\]$")
 
-    if re.search(r"[-_]30d\b", filename):
-        return "30d", "30d"
-    if re.search(r"[-_]7d\b", filename):
-        return "7d", "7d"
 
-    match_mes = re.search(r"[-_](ene|feb|mar|abr|may|jun|jul|ago|sep|oct|nov|dic)\b", filename)
-    if match_mes:
-        return "mes", match_mes.group(1)
+def _firma_archivo(filepath):
+    """
+    Firma del archivo (mtime/tamaño, o CRC si es un miembro de zip) más el
+    mtime del schema: cambia si hay que volver a parsear.
+    """
+    compilar_schema_columnas()
+    return firma_archivo(filepath), _INDICE_SCHEMA["mtime"]
+
+
+def limpiar_cache_archivos(rutas=None):
+    """Descarta los frames cacheados (todos o los de las rutas indicadas)."""
+    if rutas is None:
+        _CACHE_ARCHIVOS.clear()
+        return
+    for ruta in rutas:
+        for libro in (False, True):
+            _CACHE_ARCHIVOS.pop((os.path.abspath(ruta), libro), None)
 
-    return "otro", "n/a"
 
 def cargar_archivo(filepath):
+    """
+    Lee y normaliza un export. Si el archivo no cambió desde la última
+    lectura en este proceso, devuelve una copia del frame cacheado.
+    """
+    frames = _cargar_cacheado(filepath, libro=False)
+    return frames[0][1] if frames else None
+
+
+def cargar_libro(filepath):
+    """
+    Lee un libro por cliente con una hoja por período ('30d', '7d', 'sep'...)
+    abriéndolo una sola vez. Cacheado igual que cargar_archivo.
+
+    Returns:
+        list de (nombre "Archivo.xlsx[hoja]", DataFrame) de las hojas reconocidas
+    """
+    return _cargar_cacheado(filepath, libro=True)
+
+
+def _cargar_cacheado(filepath, libro):
+    clave = (os.path.abspath(filepath), libro)
+    try:
+        firma = _firma_archivo(filepath)
+    except OSError as e:
+        print(f"  -> Error cargando {filepath}: {e}")
+        return []
+
+    cacheado = _CACHE_ARCHIVOS.get(clave)
+    if cacheado is not None and cacheado[0] == firma:
+        return [(nombre, df.copy()) for nombre, df in cacheado[1]]
+
+    # Miembros de zip: se leen a memoria y van directo al lector, sin extraer
+    fuente = None
+    if partir_ruta_zip(filepath) is not None:
+        try:
+            fuente = leer_miembro_zip(filepath)
+        except Exception as e:
+            print(f"  -> Error cargando {filepath}: {e}")
+            return []
+
+    if libro:
+        frames = _leer_libro(filepath, fuente)
+    else:
+        df = _leer_archivo(filepath, fuente)
+        frames = [(filepath, df)] if df is not None else []
+
+    _CACHE_ARCHIVOS[clave] = (firma, [(nombre, df.copy()) for nombre, df in frames])
+    return frames
+
+
+def _leer_excel(filepath, fuente=None, sheet_name=0):
+    """read_excel sobre la ruta o sobre el contenido en memoria."""
+    if isinstance(fuente, (bytes, bytearray, memoryview)):
+        fuente = io.BytesIO(fuente)
+
+    # openpyxl avisa por estilos/validaciones de los exports de Meta
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pd.read_excel(filepath if fuente is None else fuente, sheet_name=sheet_name)
+
+
+def _leer_archivo(filepath, fuente=None):
+    """
+    Lee y normaliza un export.
+
+    Args:
+        filepath: Ruta o nombre del archivo (define tipo, periodo y manager)
+        fuente: Contenido del Excel (bytes o file-like); si es None se lee filepath
+    """
     try:
-        df = pd.read_excel(filepath)
+        df = _leer_excel(filepath, fuente)
+    except Exception as e:
+        print(f"  -> Error cargando {filepath}: {e}")
+        return None
+
+    return _normalizar_export(df, filepath)
+
+
+def _leer_libro(filepath, fuente=None):
+    """
+    Lee todas las hojas de un libro en una sola apertura (sheet_name=None)
+    y normaliza las que tengan nombre de período.
+    """
+    try:
+        hojas = _leer_excel(filepath, fuente, sheet_name=None)
+    except Exception as e:
+        print(f"  -> Error cargando {filepath}: {e}")
+        return []
 
+    frames = []
+    for hoja, df in hojas.items():
+        nombre = f"{os.path.basename(filepath)}[{hoja}]"
+        if _tipo_de_nombre(nombre)[0] == "otro":
+            print(f"     [AVISO] {nombre}: hoja ignorada (usar 30d, 7d, diario o el mes: sep, oct...)")
+            continue
+
+        df = _normalizar_export(df, nombre)
+        if df is not None:
+            frames.append((nombre, df))
+    return frames
+
+
+def _normalizar_export(df, filepath):
+    """Normaliza columnas y números de un export ya leído y lo etiqueta."""
+    try:
         df = normalizar_columnas(df)
+        for original, destino in df.attrs.get("mapeo_columnas", {}).get("heuristica", {}).items():
+            print(f"     [HEURÍSTICA] '{original}' -> {destino}")
         df = asegurar_columnas(df)
         df = convertir_numericos(df)
+        for col, n in df.attrs.get("celdas_forzadas", {}).items():
+            print(f"     [AVISO] {col}: {n} celda(s) no numéricas convertidas a 0")
 
-        tipo, periodo = detectar_tipo_archivo(filepath)
+        tipo, periodo = _tipo_de_nombre(filepath)
         df["_tipo_archivo"] = tipo
         df["_periodo"] = periodo
         df["_archivo_origen"] = os.path.basename(filepath)
@@ -154,59 +352,135 @@ def cargar_archivo(filepath):
 # CLIENTES
 # -----------------------------------------------------------------------------
 
-def cargar_datos_cliente(cliente):
-    data = {"30d": None, "7d": None, "historico": None}
-    print("[1/8] Cargando datos...")
+def _tipo_de_nombre(nombre):
+    """
+    Tipo por nombre de archivo, por hoja de un libro ("Archivo.xlsx[30d]")
+    o por clave suelta ('30d', '7d', 'sep').
+    """
+    hoja = _RE_HOJA.search(nombre)
+    if hoja:
+        nombre = hoja.group(1)
 
-    cliente_regex = re.compile(cliente, re.IGNORECASE)
-    archivos = []
+    tipo, periodo = detectar_tipo_archivo(nombre)
+    if tipo == "otro":
+        tipo, periodo = detectar_tipo_archivo(f"-{nombre.strip()}")
+    return tipo, periodo
 
-    for ext in ("*.xlsx", "*.xlxs"):
-        for f in glob.glob(os.path.join(CRUDA_DIR, ext)):
-            if cliente_regex.search(os.path.basename(f)):
-                archivos.append(f)
 
-    archivos = list(set(archivos))
-    print(f"  -> Archivos encontrados: {len(archivos)}")
+def _cargar_fuentes(nombre, fuente=None):
+    """
+    Exports de un archivo: un período suelto ("Cliente-30d.xlsx") o, si el
+    nombre no indica período, un libro con una hoja por período.
 
-    hist = []
+    Args:
+        nombre: Ruta en crudo/ (fuente None, con cache) o nombre del upload
+        fuente: Contenido en memoria
+
+    Returns:
+        list de (nombre, DataFrame o None)
+    """
+    es_libro = _tipo_de_nombre(nombre)[0] == "otro"
+    if fuente is None:
+        return cargar_libro(nombre) if es_libro else [(nombre, cargar_archivo(nombre))]
+    return _leer_libro(nombre, fuente) if es_libro else [(nombre, _leer_archivo(nombre, fuente))]
 
-    for filepath in archivos:
-        tipo, periodo = detectar_tipo_archivo(filepath)
-        df = cargar_archivo(filepath)
 
+def _armar_datos(cargados, persistir=True, cliente=None):
+    """
+    Arma {"30d", "7d", "historico", "emparejamientos", "desglose",
+    "cuarentena", "calidad"} a partir de frames ya leídos.
+
+    Args:
+        cargados: Iterable de (nombre de archivo, DataFrame o None)
+        persistir: Usar la tabla de emparejamientos en disco (ad_matching)
+        cliente: Cliente de los archivos (sus pares en esa tabla)
+    """
+    data = {"30d": None, "7d": None, "historico": None}
+    hist = []
+    diario = None
+    cuarentena, avisos = [], {}
+
+    for nombre, df in cargados:
         if df is None:
             continue
 
+        tipo, periodo = _tipo_de_nombre(nombre)
+        nombre = os.path.basename(nombre)
+
+        # Filas imposibles a cuarentena antes de que cuenten como anuncios
+        if VALIDACION["HABILITADO"]:
+            df, invalidas, avisos[nombre] = validar_export(df, nombre)
+            for aviso in avisos[nombre]:
+                print(f"     [CALIDAD] {nombre}: {aviso}")
+            if invalidas is not None:
+                cuarentena.append(invalidas)
+                print(f"     [CUARENTENA] {nombre}: {len(invalidas)} fila(s) inválidas")
+
         if tipo == "30d":
             data["30d"] = df
-            print(f"     [30D] {os.path.basename(filepath)} ({len(df)})")
+            print(f"     [30D] {nombre} ({len(df)})")
         elif tipo == "7d":
             data["7d"] = df
-            print(f"     [7D] {os.path.basename(filepath)} ({len(df)})")
+            print(f"     [7D] {nombre} ({len(df)})")
+        elif tipo == "diario":
+            diario = df
+            print(f"     [DIARIO] {nombre} ({len(df)})")
         elif tipo == "mes":
             df["periodo"] = periodo
             hist.append(df)
-            print(f"     [HIST-{periodo.upper()}] {os.path.basename(filepath)} ({len(df)})")
+            print(f"     [HIST-{periodo.upper()}] {nombre} ({len(df)})")
+
+    if hist:
+        data["historico"] = pd.concat(hist, ignore_index=True)
+
+    # Export diario: 30d, 7d y meses que no vinieron en archivos propios
+    if diario is not None:
+        derivar_ventanas(data, diario)
 
     if data["30d"] is None:
         raise RuntimeError("No se encontraron datos válidos de 30 días")
 
-    if hist:
-        data["historico"] = pd.concat(hist, ignore_index=True)
+    # Clave entera de anuncio compartida por 30d, 7d e histórico
+    claves = asignar_claves_anuncio(data)
+
+    # Anuncios del 7d/histórico con nombre casi igual al del 30d
+    data["emparejamientos"] = emparejar_anuncios(data, claves, persistir, cliente)
+
+    # Exports desglosados (ubicación, edad...): una fila por anuncio para el
+    # pipeline; las filas crudas del 30d quedan para el cubo de desgloses
+    data["desglose"] = separar_desgloses(data)
+
+    data["cuarentena"] = pd.concat(cuarentena, ignore_index=True) if cuarentena else None
+    data["calidad"] = resumen_calidad(data["cuarentena"], avisos)
 
     return data
 
-def identificar_clientes():
-    archivos = glob.glob(os.path.join(CRUDA_DIR, "*.xlsx")) + glob.glob(
-        os.path.join(CRUDA_DIR, "*.xlxs")
-    )
 
-    clientes = set()
-    for f in archivos:
-        nombre = os.path.splitext(os.path.basename(f))[0]
-        cliente = re.split(r"[-_]", nombre)[0].upper().strip()
-        if len(cliente) > 2:
-            clientes.add(cliente)
+def cargar_datos_cliente(cliente):
+    print("[1/8] Cargando datos...")
+
+    archivos = listar_archivos_cliente(cliente)
+    print(f"  -> Archivos encontrados: {len(archivos)}")
+
+    return _armar_datos((item for filepath in archivos for item in _cargar_fuentes(filepath)), cliente=cliente)
+
+
+def cargar_datos_memoria(archivos):
+    """
+    Igual que cargar_datos_cliente pero con los Excel en memoria (uploads),
+    sin leer ni escribir el disco.
 
-    return sorted(clientes)
+    Args:
+        archivos: dict {nombre: bytes o file-like}. El nombre puede ser el
+                  del archivo ("Cliente-30d.xlsx"), solo el tipo ("30d",
+                  "7d", "sep", ...) o un libro con una hoja por período
+                  ("Cliente.xlsx")
+
+    Returns:
+        dict: {"30d", "7d", "historico"} como cargar_datos_cliente
+    """
+    print(f"  -> Archivos recibidos: {len(archivos)}")
+    return _armar_datos(
+        (item for nombre, fuente in archivos.items() for item in _cargar_fuentes(nombre, fuente)),
+        persistir=False,
+    )
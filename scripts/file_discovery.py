@@ -0,0 +1,145 @@
+"""
+Descubrimiento de archivos de Meta Ads en crudo/.
+Solo usa la librería estándar: identifica clientes y tipos de archivo por
+nombre sin importar pandas, para que listar o planificar sea instantáneo.
+
+Los .zip de crudo/ se recorren sin extraerlos: cada Excel dentro del zip
+aparece como "crudo/archivo.zip/Cliente-30d.xlsx", así que os.path.basename
+devuelve el nombre del miembro y la detección de tipo y cliente es la misma.
+"""
+import glob
+import html
+import io
+import os
+import re
+import zipfile
+
+from config import CRUDA_DIR
+
+EXTENSIONES = ("*.xlsx", "*.xlxs")
+_RE_RUTA_ZIP = re.compile(r"^(.*?\.zip)/(.+)$", re.IGNORECASE)
+
+
+def detectar_tipo_archivo(filepath):
+    filename = os.path.basename(filepath).lower()
+
+    if re.search(r"[-_]30d\b", filename):
+        return "30d", "30d"
+    if re.search(r"[-_]7d\b", filename):
+        return "7d", "7d"
+    if re.search(r"[-_](diario|daily)\b", filename):
+        return "diario", "diario"
+
+    match_mes = re.search(r"[-_](ene|feb|mar|abr|may|jun|jul|ago|sep|oct|nov|dic)\b", filename)
+    if match_mes:
+        return "mes", match_mes.group(1)
+
+    return "otro", "n/a"
+
+
+def partir_ruta_zip(ruta):
+    """
+    Returns:
+        tuple (ruta del zip, miembro) si ruta apunta dentro de un zip, o None
+    """
+    match = _RE_RUTA_ZIP.match(ruta)
+    return (match.group(1), match.group(2)) if match else None
+
+
+def listar_miembros_zip(ruta_zip):
+    """Rutas virtuales de los Excel dentro de un zip (sin extraer)."""
+    try:
+        with zipfile.ZipFile(ruta_zip) as zf:
+            nombres = [info.filename for info in zf.infolist() if not info.is_dir()]
+    except (OSError, zipfile.BadZipFile):
+        return []
+
+    return [
+        f"{ruta_zip}/{nombre}" for nombre in nombres
+        if nombre.lower().endswith((".xlsx", ".xlxs"))
+        and not nombre.startswith("__MACOSX/")
+        and not os.path.basename(nombre).startswith("~$")
+    ]
+
+
+def leer_miembro_zip(ruta):
+    """Bytes de un Excel dentro de un zip (ruta virtual de listar_archivos)."""
+    ruta_zip, miembro = partir_ruta_zip(ruta)
+    with zipfile.ZipFile(ruta_zip) as zf:
+        return zf.read(miembro)
+
+
+def firma_archivo(ruta):
+    """
+    Identifica el contenido actual de un archivo sin leerlo.
+
+    Returns:
+        tuple: (mtime_ns, tamaño) en disco, o ('crc', CRC, tamaño) para un
+        miembro de zip
+
+    Raises:
+        OSError: si el archivo o el miembro ya no existe
+    """
+    partes = partir_ruta_zip(ruta)
+    if partes is None:
+        estado = os.stat(ruta)
+        return estado.st_mtime_ns, estado.st_size
+
+    ruta_zip, miembro = partes
+    try:
+        with zipfile.ZipFile(ruta_zip) as zf:
+            info = zf.getinfo(miembro)
+    except (KeyError, zipfile.BadZipFile) as e:
+        raise OSError(f"{ruta}: {e}") from e
+    return "crc", info.CRC, info.file_size
+
+
+def hojas_libro(ruta):
+    """
+    Nombres de las hojas de un .xlsx leyendo solo xl/workbook.xml (sin
+    pandas ni openpyxl). Sirve para planificar libros con una hoja por
+    período.
+
+    Returns:
+        list de nombres de hoja (vacía si no se puede leer)
+    """
+    try:
+        partes = partir_ruta_zip(ruta)
+        contenedor = io.BytesIO(leer_miembro_zip(ruta)) if partes else ruta
+        with zipfile.ZipFile(contenedor) as zf:
+            xml = zf.read("xl/workbook.xml").decode("utf-8", errors="replace")
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return []
+    return [html.unescape(nombre) for nombre in re.findall(r'<(?:\w+:)?sheet\b[^>]*?\bname="([^"]*)"', xml)]
+
+
+def listar_archivos(directorio=None):
+    """Devuelve los Excel de crudo/, incluidos los que están dentro de .zip."""
+    directorio = directorio or CRUDA_DIR
+    archivos = []
+    for ext in EXTENSIONES:
+        archivos.extend(glob.glob(os.path.join(directorio, ext)))
+    for ruta_zip in glob.glob(os.path.join(directorio, "*.zip")):
+        archivos.extend(listar_miembros_zip(ruta_zip))
+    return sorted(set(archivos))
+
+
+def cliente_de_archivo(filepath):
+    """Nombre de cliente según la convención Cliente-xxx.xlsx (o None)."""
+    nombre = os.path.splitext(os.path.basename(filepath))[0]
+    cliente = re.split(r"[-_]", nombre)[0].upper().strip()
+    return cliente if len(cliente) > 2 else None
+
+
+def listar_archivos_cliente(cliente, directorio=None):
+    """Archivos de crudo/ cuyo nombre contiene al cliente (texto literal, sin mayúsculas)."""
+    cliente_regex = re.compile(re.escape(cliente), re.IGNORECASE)
+    return [
+        f for f in listar_archivos(directorio)
+        if cliente_regex.search(os.path.basename(f))
+    ]
+
+
+def identificar_clientes():
+    clientes = {cliente_de_archivo(f) for f in listar_archivos()}
+    return sorted(c for c in clientes if c)
@@ -0,0 +1,449 @@
+"""
+Cola de trabajos persistente V4.
+Cada cliente de una corrida es un trabajo en una base SQLite local
+(COLA['RUTA']), con estado, intentos, tiempos y último error. Los procesos
+worker toman trabajos de la cola de a uno, así que un corte, un Ctrl+C o un
+cliente que rompe no hacen perder lo ya procesado:
+
+    pendiente -> en_curso -> ok | omitido (sin datos 30d)
+                          -> pendiente (error transitorio: reintento tras
+                                        BACKOFF_BASE·2^n s)
+                          -> fallido (error de los datos o del código, o
+                                      agotó MAX_INTENTOS)
+
+Los trabajos de una misma corrida comparten un "lote"; una corrida
+interrumpida se reanuda drenando el mismo lote (los trabajos que quedaron
+en_curso de procesos muertos vuelven a pendiente).
+
+Uso:
+    python cli.py run --workers 4
+    python cli.py run --reanudar
+    python cli.py status
+"""
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+import traceback
+import zipfile
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+from config import COLA, PARALELISMO
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+OK = "ok"
+OMITIDO = "omitido"
+FALLIDO = "fallido"
+TERMINADOS = (OK, OMITIDO, FALLIDO)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id            INTEGER PRIMARY KEY,
+    lote          TEXT NOT NULL,
+    cliente       TEXT NOT NULL,
+    salidas       TEXT NOT NULL,
+    estado        TEXT NOT NULL DEFAULT 'pendiente',
+    intentos      INTEGER NOT NULL DEFAULT 0,
+    max_intentos  INTEGER NOT NULL,
+    disponible    REAL NOT NULL,
+    creado        REAL NOT NULL,
+    inicio        REAL,
+    fin           REAL,
+    duracion      REAL,
+    worker        TEXT,
+    error         TEXT,
+    resultado     TEXT,
+    UNIQUE (lote, cliente)
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_lote_estado ON trabajos (lote, estado, disponible);
+"""
+
+
+def conectar(ruta=None):
+    """
+    Abre (y crea si hace falta) la base de la cola.
+
+    En modo WAL los workers escriben sin bloquear a quien consulta el estado;
+    isolation_level=None deja las transacciones explícitas (BEGIN IMMEDIATE).
+    """
+    conn = sqlite3.connect(ruta or COLA["RUTA"], timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(ESQUEMA)
+    return conn
+
+
+@contextmanager
+def transaccion(conn):
+    """BEGIN IMMEDIATE ... COMMIT: reserva la escritura frente a otros workers."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def nuevo_lote():
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+
+
+def ultimo_lote(conn):
+    """Lote encolado más recientemente, o None si la cola está vacía."""
+    fila = conn.execute("SELECT lote FROM trabajos ORDER BY creado DESC, id DESC LIMIT 1").fetchone()
+    return fila["lote"] if fila else None
+
+
+def encolar(conn, lote, clientes, salidas, max_intentos=None):
+    """
+    Agrega un trabajo por cliente al lote (los que ya están se ignoran).
+
+    Args:
+        salidas: Salidas ya resueltas (resolver_salidas) que generará el worker
+
+    Returns:
+        int: trabajos nuevos
+    """
+    ahora = time.time()
+    max_intentos = max_intentos or COLA["MAX_INTENTOS"]
+    salidas = json.dumps(sorted(salidas))
+    with transaccion(conn):
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO trabajos (lote, cliente, salidas, max_intentos, disponible, creado) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(lote, cliente, salidas, max_intentos, ahora, ahora) for cliente in clientes],
+        )
+    return cursor.rowcount
+
+
+def _id_worker():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _proceso_vivo(worker):
+    """False solo si worker es un proceso de esta máquina que ya no existe."""
+    host, _, pid = (worker or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def recuperar_huerfanos(conn, lote):
+    """
+    Devuelve a pendiente los trabajos en_curso cuyo worker murió (corte,
+    kill -9...). El intento interrumpido cuenta: un cliente que tumba al
+    proceso no se reintenta para siempre.
+
+    Returns:
+        int: trabajos recuperados
+    """
+    huerfanos = [
+        fila["id"]
+        for fila in conn.execute(
+            "SELECT id, worker FROM trabajos WHERE lote = ? AND estado = ?", (lote, EN_CURSO)
+        )
+        if not _proceso_vivo(fila["worker"])
+    ]
+    with transaccion(conn):
+        conn.executemany(
+            "UPDATE trabajos SET estado = CASE WHEN intentos >= max_intentos THEN ? ELSE ? END, "
+            "disponible = ?, error = COALESCE(error, 'Interrumpido') WHERE id = ?",
+            [(FALLIDO, PENDIENTE, time.time(), id_) for id_ in huerfanos],
+        )
+    return len(huerfanos)
+
+
+def tomar(conn, lote, worker=None):
+    """
+    Toma el próximo trabajo listo del lote de forma atómica: la lectura y
+    la actualización van en la misma transacción inmediata, así dos workers
+    nunca toman el mismo cliente.
+
+    Returns:
+        dict con la fila del trabajo (ya en_curso), o None si no hay uno listo
+    """
+    ahora = time.time()
+    with transaccion(conn):
+        fila = conn.execute(
+            "SELECT * FROM trabajos WHERE lote = ? AND estado = ? AND disponible <= ? "
+            "ORDER BY disponible, id LIMIT 1",
+            (lote, PENDIENTE, ahora),
+        ).fetchone()
+        if fila is not None:
+            conn.execute(
+                "UPDATE trabajos SET estado = ?, intentos = intentos + 1, inicio = ?, "
+                "fin = NULL, duracion = NULL, worker = ? WHERE id = ?",
+                (EN_CURSO, ahora, worker or _id_worker(), fila["id"]),
+            )
+
+    if fila is None:
+        return None
+    trabajo = dict(fila)
+    trabajo.update(estado=EN_CURSO, intentos=fila["intentos"] + 1, inicio=ahora)
+    return trabajo
+
+
+def completar(conn, trabajo, resultado):
+    """Marca el trabajo como ok (u omitido si el cliente no tenía datos)."""
+    fin = time.time()
+    estado = OK if resultado is not None else OMITIDO
+    with transaccion(conn):
+        conn.execute(
+            "UPDATE trabajos SET estado = ?, fin = ?, duracion = ?, error = NULL, resultado = ? WHERE id = ?",
+            (estado, fin, fin - trabajo["inicio"], json.dumps(resultado, ensure_ascii=False), trabajo["id"]),
+        )
+    return estado
+
+
+def espera_reintento(intentos):
+    """Backoff exponencial: BACKOFF_BASE, 2·BASE, 4·BASE... hasta BACKOFF_MAX."""
+    return min(COLA["BACKOFF_BASE"] * 2 ** (intentos - 1), COLA["BACKOFF_MAX"])
+
+
+def es_transitorio(error):
+    """
+    True si el error puede no repetirse en otro intento: E/S (archivo
+    bloqueado o a medio copiar, disco) o base SQLite ocupada. Los demás
+    (sin datos válidos, salidas inválidas, bugs) fallan igual cada vez.
+    """
+    if isinstance(error, sqlite3.OperationalError):
+        mensaje = str(error).lower()
+        return "locked" in mensaje or "busy" in mensaje
+    return isinstance(error, (OSError, zipfile.BadZipFile))
+
+
+def fallar(conn, trabajo, error, reintentar=True):
+    """
+    Registra el error y reprograma el trabajo con backoff, o lo marca
+    fallido si no se reintenta o agotó sus intentos.
+
+    Returns:
+        str: nuevo estado
+    """
+    fin = time.time()
+    agotado = not reintentar or trabajo["intentos"] >= trabajo["max_intentos"]
+    estado = FALLIDO if agotado else PENDIENTE
+    disponible = fin if agotado else fin + espera_reintento(trabajo["intentos"])
+    with transaccion(conn):
+        conn.execute(
+            "UPDATE trabajos SET estado = ?, fin = ?, duracion = ?, disponible = ?, error = ? WHERE id = ?",
+            (estado, fin, fin - trabajo["inicio"], disponible, error, trabajo["id"]),
+        )
+    return estado
+
+
+def liberar(conn, trabajo):
+    """Devuelve a pendiente un trabajo interrumpido a mano (Ctrl+C): no cuenta como intento."""
+    with transaccion(conn):
+        conn.execute(
+            "UPDATE trabajos SET estado = ?, intentos = intentos - 1, inicio = NULL, disponible = ? "
+            "WHERE id = ? AND estado = ?",
+            (PENDIENTE, time.time(), trabajo["id"], EN_CURSO),
+        )
+
+
+def _hay_pendientes(conn, lote):
+    fila = conn.execute(
+        "SELECT 1 FROM trabajos WHERE lote = ? AND estado = ? LIMIT 1", (lote, PENDIENTE)
+    ).fetchone()
+    return fila is not None
+
+
+def _resumen_resultado(resultado):
+    """Lo que se guarda del resultado de procesar_cliente (no el informe entero)."""
+    if resultado is None:
+        return None
+    return {"meta": resultado.get("meta"), "archivos": resultado.get("archivos")}
+
+
+def ejecutar_trabajo(trabajo, motor=None):
+    """Corre el pipeline del cliente del trabajo."""
+    from main import procesar_cliente
+
+    salidas = set(json.loads(trabajo["salidas"]))
+    return _resumen_resultado(procesar_cliente(trabajo["cliente"], True, salidas, motor=motor))
+
+
+def trabajar(lote, ruta=None, motor=None):
+    """
+    Bucle de un worker: toma trabajos del lote hasta que no queden pendientes.
+    Solo los errores transitorios (es_transitorio) se reintentan, con
+    backoff que se espera acá mismo; el resto marca el trabajo fallido.
+
+    Returns:
+        int: trabajos procesados por este worker
+    """
+    worker = _id_worker()
+    procesados = 0
+
+    with closing(conectar(ruta)) as conn:
+        while True:
+            trabajo = tomar(conn, lote, worker)
+            if trabajo is None:
+                if not _hay_pendientes(conn, lote):
+                    return procesados
+                time.sleep(COLA["ESPERA_VACIA"])
+                continue
+
+            cliente = trabajo["cliente"]
+            try:
+                resultado = ejecutar_trabajo(trabajo, motor)
+            except KeyboardInterrupt:
+                liberar(conn, trabajo)
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                transitorio = es_transitorio(e)
+                estado = fallar(conn, trabajo, f"{type(e).__name__}: {e}", reintentar=transitorio)
+                intento = f"intento {trabajo['intentos']}/{trabajo['max_intentos']}"
+                if not transitorio:
+                    print(f"\n  [ERROR] Falló al procesar {cliente} (sin reintento): {e}")
+                elif estado == FALLIDO:
+                    print(f"\n  [ERROR] Falló al procesar {cliente} ({intento}): {e}")
+                else:
+                    espera = espera_reintento(trabajo["intentos"])
+                    print(f"\n  [REINTENTO] {cliente} ({intento}): {e}. Nuevo intento en {espera:g}s")
+            else:
+                completar(conn, trabajo, resultado)
+            procesados += 1
+
+
+def _trabajar_proceso(lote, ruta, motor, procesos_etapas):
+    # Los workers se reparten los CPUs: cada uno abre a lo sumo
+    # procesos_etapas procesos para las etapas (ver EjecutorEtapas)
+    PARALELISMO["MAX_WORKERS"] = procesos_etapas
+    try:
+        trabajar(lote, ruta, motor)
+    except KeyboardInterrupt:
+        pass  # el trabajo en curso ya volvió a pendiente
+
+
+def drenar(lote, workers=None, ruta=None, motor=None):
+    """
+    Procesa el lote hasta vaciarlo.
+
+    Con un solo worker se trabaja en este proceso; con más, cada worker es
+    un proceso aparte que toma clientes de la cola.
+
+    Returns:
+        bool: False si se interrumpió con Ctrl+C (el lote queda reanudable)
+    """
+    workers = workers or COLA["WORKERS"]
+
+    with closing(conectar(ruta)) as conn:
+        recuperados = recuperar_huerfanos(conn, lote)
+    if recuperados:
+        print(f"\n[COLA] {recuperados} trabajo(s) interrumpido(s) vuelven a la cola")
+
+    if workers <= 1:
+        try:
+            trabajar(lote, ruta, motor)
+        except KeyboardInterrupt:
+            return False
+        return True
+
+    from stage_executor import procesos_por_worker
+
+    procesos_etapas = procesos_por_worker(workers)
+    procesos = [
+        multiprocessing.Process(
+            target=_trabajar_proceso, args=(lote, ruta, motor, procesos_etapas), name=f"worker-{i + 1}"
+        )
+        for i in range(workers)
+    ]
+    for proceso in procesos:
+        proceso.start()
+
+    try:
+        for proceso in procesos:
+            proceso.join()
+    except KeyboardInterrupt:
+        # Los workers reciben el mismo SIGINT y liberan su trabajo
+        for proceso in procesos:
+            proceso.join()
+        return False
+    return True
+
+
+def estado_lote(conn, lote):
+    """
+    Progreso del lote: cantidades por estado, throughput y ETA.
+
+    El throughput se mide como clientes terminados por minuto desde que
+    arrancó el primero (ya incluye la concurrencia de los workers).
+
+    Returns:
+        dict, o None si el lote no existe
+    """
+    filas = [dict(f) for f in conn.execute("SELECT * FROM trabajos WHERE lote = ? ORDER BY id", (lote,))]
+    if not filas:
+        return None
+
+    conteo = {estado: 0 for estado in (PENDIENTE, EN_CURSO, *TERMINADOS)}
+    for fila in filas:
+        conteo[fila["estado"]] += 1
+
+    terminados = sum(conteo[e] for e in TERMINADOS)
+    restantes = conteo[PENDIENTE] + conteo[EN_CURSO]
+    inicios = [f["inicio"] for f in filas if f["inicio"] is not None]
+    fines = [f["fin"] for f in filas if f["estado"] in TERMINADOS and f["fin"] is not None]
+    duraciones = [f["duracion"] for f in filas if f["estado"] == OK and f["duracion"] is not None]
+
+    fin_referencia = time.time() if restantes else max(fines, default=None)
+    transcurrido = fin_referencia - min(inicios) if inicios and fin_referencia else 0.0
+    por_minuto = terminados / transcurrido * 60 if transcurrido > 0 and terminados else None
+
+    return {
+        "lote": lote,
+        "total": len(filas),
+        "conteo": conteo,
+        "terminados": terminados,
+        "restantes": restantes,
+        "transcurrido": transcurrido,
+        "por_minuto": por_minuto,
+        "duracion_media": sum(duraciones) / len(duraciones) if duraciones else None,
+        "eta": restantes / por_minuto * 60 if por_minuto and restantes else None,
+        "en_curso": [f for f in filas if f["estado"] == EN_CURSO],
+        "con_error": [f for f in filas if f["error"] and f["estado"] in (PENDIENTE, FALLIDO)],
+        "trabajos": filas,
+    }
+
+
+def _duracion(segundos):
+    minutos, segundos = divmod(int(round(segundos)), 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas}h{minutos:02d}m{segundos:02d}s" if horas else f"{minutos}m{segundos:02d}s"
+
+
+def imprimir_estado(estado):
+    """Muestra el progreso del lote por consola (cli.py status)."""
+    conteo = estado["conteo"]
+    print(f"Lote {estado['lote']}: {estado['terminados']}/{estado['total']} terminados")
+    print("  " + "  ".join(f"{e}: {conteo[e]}" for e in conteo))
+
+    if estado["por_minuto"]:
+        print(f"  Throughput: {estado['por_minuto']:.2f} clientes/min "
+              f"en {_duracion(estado['transcurrido'])}")
+    if estado["duracion_media"]:
+        print(f"  Duración media por cliente: {estado['duracion_media']:.1f}s")
+    if estado["eta"]:
+        print(f"  ETA: {_duracion(estado['eta'])} para {estado['restantes']} cliente(s)")
+
+    ahora = time.time()
+    for fila in estado["en_curso"]:
+        print(f"  [EN CURSO] {fila['cliente']} hace {_duracion(ahora - fila['inicio'])} ({fila['worker']})")
+    for fila in estado["con_error"]:
+        etiqueta = "FALLIDO" if fila["estado"] == FALLIDO else "REINTENTO"
+        print(f"  [{etiqueta}] {fila['cliente']} ({fila['intentos']}/{fila['max_intentos']}): {fila['error']}")
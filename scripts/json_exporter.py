@@ -1,17 +1,10 @@
 """
 Módulo de exportación JSON V4.
-Genera el archivo JSON estructurado para consumir desde web/dashboard.
+Genera el archivo JSON estructurado para consumir desde web/dashboard a
+partir del InformeCliente (report_model).
 """
-from datetime import datetime
 import math
-# --- NUEVA IMPORTACIÓN ---
-try:
-    # Intenta importar la nueva función de análisis de managers
-    from analyzer import analizar_rendimiento_managers
-except ImportError:
-    # Fallback si el archivo analyzer.py no está actualizado aún
-    analizar_rendimiento_managers = lambda df: {}
-# -------------------------
+from report_model import a_dicts
 
 
 def safe_number(value, default=0):
@@ -49,34 +42,44 @@ def limpiar_lista(lista):
     return lista_limpia
 
 
-def generar_json(cliente, resumen, rankings, candidatos_duplicar,
-                 acciones_urgentes, anomalias, historico, analisis_objetivo,
-                 df, mediana_cpa):
+def generar_json(informe):
     """
     Genera el JSON completo para el dashboard web.
     
+    Args:
+        informe: InformeCliente (report_model.construir_informe)
+    
     Returns:
         dict estructurado listo para serializar a JSON
     """
-    fecha = datetime.now().strftime("%Y-%m-%d")
-    
-    # --- NUEVA LÓGICA: CALCULAR COMPARATIVA AQUÍ ---
-    # La función debe devolver un diccionario (ej: {"Ian": {...}, "General": {...}})
-    comparativa_managers = analizar_rendimiento_managers(df)
-    # -----------------------------------------------
+    fecha = informe.generado.strftime("%Y-%m-%d")
 
     # Limpiar estructuras complejas
-    limpio_rankings = {k: limpiar_lista(v) for k, v in rankings.items()}
-    limpio_duplicar = limpiar_lista(candidatos_duplicar)
-    limpio_urgentes = limpiar_lista(acciones_urgentes)
-    limpio_anomalias = limpiar_lista(anomalias)
-    limpio_historico = limpiar_lista(historico)
+    limpio_rankings = {k: limpiar_lista(v) for k, v in informe.rankings.items()}
+    limpio_duplicar = limpiar_lista(a_dicts(informe.duplicar))
+    limpio_urgentes = limpiar_lista(a_dicts(informe.acciones_urgentes))
+    limpio_anomalias = limpiar_lista(a_dicts(informe.anomalias))
+    limpio_historico = limpiar_lista(a_dicts(informe.historico))
     
+    # Jerarquía: registros por nivel y rankings {nivel: {criterio: [...]}}
+    limpio_jerarquia = {}
+    for clave, valor in (informe.jerarquia or {}).items():
+        if clave == "rankings":
+            valor = {nivel: {k: limpiar_lista(v) for k, v in r.items()} for nivel, r in valor.items()}
+        elif clave != "niveles":
+            valor = limpiar_lista(valor)
+        limpio_jerarquia[clave] = valor
+
+    # Desglose: {parte: {dimension: [registros]}}
+    limpio_desglose = {
+        clave: valor if clave == "dimensiones" else {dim: limpiar_lista(v) for dim, v in valor.items()}
+        for clave, valor in (informe.desglose or {}).items()
+    }
+
     # Asegurar que los anuncios se limpien
-    anuncios_limpios = df.to_dict('records')
     anuncios_limpios = [
         {k: safe_number(v) if isinstance(v, (float, int)) else v for k, v in row.items()}
-        for row in anuncios_limpios
+        for row in informe.anuncios
     ]
 
     # Metadatos del glosario (asumiendo que está aquí)
@@ -124,23 +127,26 @@ def generar_json(cliente, resumen, rankings, candidatos_duplicar,
 
     data = {
         "meta": {
-            "cliente": cliente,
+            "cliente": informe.cliente,
             "fecha_generacion": fecha,
-            "total_anuncios": len(df),
+            "total_anuncios": informe.total_anuncios,
         },
-        "mediana_cpa": safe_number(mediana_cpa),
-        "resumen": resumen,
+        "mediana_cpa": safe_number(informe.mediana_cpa),
+        "resumen": informe.resumen,
         "rankings": limpio_rankings,
         "anuncios": anuncios_limpios,
         "duplicar": limpio_duplicar,
         "acciones_urgentes": limpio_urgentes,
         "anomalias": limpio_anomalias,
         "historico": limpio_historico,
-        "analisis_objetivo": analisis_objetivo,
+        "analisis_objetivo": informe.analisis_objetivo,
         "glosario": glosario,
-        # --- NUEVO CAMPO AGREGADO ---
-        "comparativa_managers": comparativa_managers 
-        # ----------------------------
+        "comparativa_managers": informe.comparativa_managers,
+        "reasignacion_presupuesto": informe.reasignacion or {},
+        "benchmark": informe.benchmark or {},
+        "jerarquia": limpio_jerarquia,
+        "desglose": limpio_desglose,
+        "calidad": informe.calidad or {},
     }
     
     # Limpiar números dentro del resumen
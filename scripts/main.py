@@ -10,41 +10,155 @@ V4.1 ESTABLE:
 
 import json
 
-from data_loader import cargar_datos_cliente, identificar_clientes
-from objective_classifier import clasificar_objetivos_dataframe
-from metrics import enriquecer_dataframe, calcular_score_basico
-from analyzer import (
-    generar_rankings,
-    generar_resumen,
-    generar_historico,
-    detectar_anomalias,
-    analizar_por_objetivo,
-)
-from recommendations import (
-    identificar_duplicar,
-    identificar_pausar,
-    analizar_no_candidatos,
-    generar_resumen_acciones,
-)
-from report_formatter import generar_informe_txt
-from json_exporter import generar_json
-from pdf_generator import generar_pdf
-from config import INFORMES_DIR, LIMPIOS_DIR
+# Solo imports livianos a nivel módulo: cada etapa importa lo que necesita
+# (pandas, reportlab...) al ejecutarse, para que listar/planificar sea inmediato.
+from file_discovery import identificar_clientes
+from config import BENCHMARK, CUANTILES, INFORMES_DIR, LIMPIOS_DIR, MOTOR, asegurar_directorios
 
 
 # -----------------------------------------------------------------------------
 # PIPELINE POR CLIENTE
 # -----------------------------------------------------------------------------
 
-def procesar_cliente(cliente: str, generar_pdf_flag: bool = True):
+SALIDAS = ("excel", "txt", "json", "pdf")
+
+# Secciones del análisis que necesita cada salida
+DEPENDENCIAS_SALIDA = {
+    "excel": set(),
+    "txt": {"resumen", "rankings", "historico", "anomalias", "recomendaciones", "no_candidatos",
+            "jerarquia"},
+    "json": {"resumen", "rankings", "historico", "anomalias", "recomendaciones",
+             "analisis_objetivo", "reasignacion", "jerarquia", "desglose"},
+    "pdf": {"resumen", "rankings", "historico", "anomalias", "recomendaciones"},
+}
+
+
+def resolver_salidas(salidas=None, generar_pdf_flag: bool = True):
+    """
+    Normaliza las salidas pedidas y calcula qué secciones hay que computar.
+
+    Args:
+        salidas: Iterable con 'excel', 'txt', 'json', 'pdf' (None = todas)
+        generar_pdf_flag: Compatibilidad: False quita el PDF de las salidas
+
+    Returns:
+        tuple: (set de salidas, set de secciones necesarias)
+    """
+    salidas = set(SALIDAS if salidas is None else salidas)
+    desconocidas = salidas - set(SALIDAS)
+    if desconocidas:
+        raise ValueError(f"Salidas desconocidas: {', '.join(sorted(desconocidas))}")
+
+    if not generar_pdf_flag:
+        salidas.discard("pdf")
+
+    secciones = set()
+    for salida in salidas:
+        secciones |= DEPENDENCIAS_SALIDA[salida]
+    return salidas, secciones
+
+
+def procesar_cliente(cliente: str, generar_pdf_flag: bool = True, salidas=None, motor=None):
+    """
+    Ejecuta el pipeline de un cliente calculando solo lo que necesitan las
+    salidas pedidas (por ejemplo, salidas={'json'} no escribe Excel, no arma
+    el TXT ni importa reportlab).
+
+    Args:
+        motor: 'pandas' o 'polars' para métricas y análisis (None = MOTOR['BACKEND'])
+
+    Returns:
+        dict: El informe JSON si se pidió, o un resumen con los archivos generados
+    """
+    salidas, secciones = resolver_salidas(salidas, generar_pdf_flag)
+
     print(f"\n{'=' * 60}")
-    print(f"Procesando: {cliente}")
+    print(f"Procesando: {cliente} (salidas: {', '.join(sorted(salidas))})")
     print(f"{'=' * 60}")
 
     # 1. CARGA DE DATOS
     print("\n[1/8] Cargando datos...")
+    from data_loader import cargar_datos_cliente
+
     datos = cargar_datos_cliente(cliente)
 
+    resultado = _procesar_datos(cliente, datos, salidas, secciones, motor=motor)
+    if resultado is None:
+        return None
+
+    if resultado["informe"] is not None:
+        return resultado["informe"]
+
+    return {"meta": {"cliente": cliente, "total_anuncios": resultado["total_anuncios"]},
+            "archivos": resultado["archivos"]}
+
+
+def procesar_en_memoria(archivos, cliente: str = "UPLOAD", salidas=("json",), destino_pdf=None):
+    """
+    Ejecuta el análisis completo sobre Excel en memoria (uploads) sin leer
+    ni escribir el disco.
+
+    Args:
+        archivos: dict {nombre: bytes o file-like} con el 30d, el 7d y los
+                  meses ("Cliente-30d.xlsx" o solo "30d", "7d", "sep"...)
+        cliente: Nombre para el informe (también elige PESOS_CONVERSIONES_CLIENTE)
+        salidas: Subconjunto de 'json', 'txt', 'pdf'
+        destino_pdf: Stream donde escribir el PDF (p. ej. la respuesta HTTP);
+                     si es None y se pide 'pdf', se devuelven los bytes
+
+    Returns:
+        dict: {"informe": dict o None, "txt": str o None,
+               "pdf": bytes (o el destino_pdf) o None}
+    """
+    salidas, secciones = resolver_salidas(salidas)
+    if "excel" in salidas:
+        raise ValueError("La salida 'excel' no está disponible en memoria")
+
+    print(f"\nProcesando en memoria: {cliente} (salidas: {', '.join(sorted(salidas))})")
+    from data_loader import cargar_datos_memoria
+
+    datos = cargar_datos_memoria(archivos)
+
+    pdf_en_bytes = "pdf" in salidas and destino_pdf is None
+    if pdf_en_bytes:
+        import io
+
+        destino_pdf = io.BytesIO()
+
+    resultado = _procesar_datos(cliente, datos, salidas, secciones, en_disco=False, destino_pdf=destino_pdf)
+    if resultado is None:
+        raise RuntimeError("No se encontraron datos válidos de 30 días")
+
+    pdf = resultado["pdf"]
+    if pdf_en_bytes and pdf is not None:
+        pdf = destino_pdf.getvalue()
+
+    return {"informe": resultado["informe"], "txt": resultado["txt"], "pdf": pdf}
+
+
+def iterar_pdf(pdf, bloque: int = 64 * 1024):
+    """Entrega los bytes de un PDF por bloques (respuestas en streaming)."""
+    vista = memoryview(pdf)
+    for inicio in range(0, len(vista), bloque):
+        yield bytes(vista[inicio:inicio + bloque])
+
+
+def _procesar_datos(cliente, datos, salidas, secciones, en_disco=True, destino_pdf=None, motor=None):
+    """
+    Etapas 2-8 del pipeline sobre los datos ya cargados.
+
+    Args:
+        en_disco: False para no escribir limpios/ ni informes/ (uploads)
+        destino_pdf: Stream donde escribir el PDF en lugar de informes/
+        motor: 'pandas' o 'polars' (None = MOTOR['BACKEND'])
+
+    Returns:
+        dict: {"informe", "txt", "pdf", "archivos", "total_anuncios"} o None
+              si no hay datos 30d
+    """
+    archivos = {}
+    informe_txt = pdf = None
+
     df_30 = datos.get("30d")
     df_7 = datos.get("7d")
     df_historico = datos.get("historico")
@@ -55,168 +169,344 @@ def procesar_cliente(cliente: str, generar_pdf_flag: bool = True):
 
     # 2. OBJETIVOS
     print("\n[2/8] Clasificando por objetivos...")
+    from objective_classifier import clasificar_objetivos_dataframe
+
     df_30 = clasificar_objetivos_dataframe(df_30)
     objetivos_detectados = df_30["objetivo_detectado"].value_counts().to_dict()
     print(f"  Objetivos detectados: {objetivos_detectados}")
 
     # 3. MÉTRICAS
     print("\n[3/8] Calculando métricas...")
-    df_30, mediana_cpa = enriquecer_dataframe(df_30, df_7)
+    from metrics import enriquecer_dataframe, calcular_score_basico, obtener_pesos_conversiones
+
+    pesos = obtener_pesos_conversiones(cliente)
+
+    # Con el motor polars, resumen, rankings y análisis por objetivo salen
+    # del mismo plan que las métricas (ver polars_backend.py)
+    motor = motor or MOTOR["BACKEND"]
+    precalculado = {}
+    if motor == "polars":
+        from polars_backend import motivo_no_disponible
+
+        motivo = motivo_no_disponible(df_30, df_7, df_historico)
+        if motivo:
+            print(f"  [AVISO] Motor polars no disponible ({motivo}): se usa pandas")
+            motor = "pandas"
+
+    if motor == "polars":
+        from polars_backend import enriquecer_y_analizar, pl
+
+        analisis = []
+        if secciones:
+            analisis = ["resumen", "rankings"]
+            if "analisis_objetivo" in secciones:
+                analisis.append("analisis_objetivo")
+        print(f"  Motor: polars ({pl.thread_pool_size()} hilos)")
+        df_30, mediana_cpa, precalculado = enriquecer_y_analizar(df_30, df_7, pesos, df_historico, analisis)
+    else:
+        referencia_cpa = None
+        if CUANTILES["EFICIENCIA"] == "portafolio":
+            from benchmark import cargar_sketch
+
+            referencia_cpa = cargar_sketch("cpa", excluir=cliente)
+        df_30, mediana_cpa = enriquecer_dataframe(df_30, df_7, pesos, df_historico, referencia_cpa)
 
     print(f"  Anuncios procesados: {len(df_30)}")
     print(f"  Mediana CPA: ${mediana_cpa:.2f}")
     print(f"  Score promedio 0-100: {df_30['score_100'].mean():.1f}")
 
-    # 4. ANÁLISIS
-    print("\n[4/8] Generando análisis...")
-    resumen = generar_resumen(df_30, mediana_cpa)
-    rankings = generar_rankings(df_30)
-
-    if df_historico is not None and not df_historico.empty:
-        historico = generar_historico(df_historico)
-    else:
-        historico = []
-
-    anomalias = detectar_anomalias(df_30)
-    analisis_objetivo = analizar_por_objetivo(df_30)
-
-    print(f"  Héroes: {resumen['clasificacion']['heroes']}")
-    print(f"  En alerta: {resumen['clasificacion']['alertas']}")
-    print(f"  Anomalías: {len(anomalias)}")
-
-    # 5. RECOMENDACIONES
-    print("\n[5/8] Generando recomendaciones...")
-    candidatos_duplicar = identificar_duplicar(df_30, mediana_cpa)
-    acciones_urgentes = identificar_pausar(df_30, mediana_cpa)
-
-    no_candidatos = (
-        analizar_no_candidatos(df_30, mediana_cpa)
-        if not candidatos_duplicar
-        else []
-    )
-
-    resumen_acciones = generar_resumen_acciones(
-        candidatos_duplicar,
-        acciones_urgentes,
-        analisis_objetivo,
-    )
+    # Percentiles contra el portafolio (uploads en memoria: solo lectura)
+    benchmark = None
+    if BENCHMARK["HABILITADO"]:
+        from benchmark import actualizar_indice, agregar_percentiles, cargar_indice, resumen_benchmark
+
+        if en_disco:
+            actualizar_indice(cliente, df_30)
+        # Referencia sin la propia cuenta (como el sketch de CUANTILES)
+        indice = cargar_indice(excluir=cliente)
+        df_30 = agregar_percentiles(df_30, indice)
+        benchmark = resumen_benchmark(df_30, indice, mediana_cpa)
+        if benchmark and benchmark["percentil_cpa_cuenta"] is not None:
+            print(f"  Benchmark: CPA mediano en el percentil {benchmark['percentil_cpa_cuenta']:.0f} "
+                  f"frente a otros {benchmark['clientes']} cliente(s)")
+
+    # Cubo anuncio × ubicación/edad/sexo/región si el export venía desglosado
+    desglose = None
+    if datos.get("desglose") is not None and "desglose" in secciones:
+        from breakdowns import construir_cubo
+
+        desglose = construir_cubo(datos["desglose"], df_30, pesos)
+        print(f"  Desglose por: {', '.join(desglose['dimensiones'])}")
+
+    # 4-7. ANÁLISIS, RECOMENDACIONES Y EXPORTACIÓN
+    # Las etapas solo leen df_30 y son independientes entre sí: EjecutorEtapas
+    # las corre en procesos con el frame en memoria compartida cuando el
+    # volumen lo justifica (ver PARALELISMO en config.py), o en orden si no.
+    from stage_executor import DF, EjecutorEtapas
+
+    resumen = rankings = None
+    historico, anomalias, analisis_objetivo = [], [], {}
+    candidatos_duplicar, acciones_urgentes, no_candidatos = [], [], []
+    reasignacion = jerarquia = informe_json = None
+
+    with EjecutorEtapas(df_30) as ejecutor:
+        if ejecutor.paralelo:
+            print(f"\n  Etapas en paralelo ({ejecutor.max_workers} procesos)")
+
+        tareas = {}
+        if secciones:
+            tareas["resumen"] = ("analyzer", "generar_resumen", (DF, mediana_cpa), {})
+            tareas["rankings"] = ("analyzer", "generar_rankings", (DF,), {})
+            tareas["anomalias"] = ("analyzer", "detectar_anomalias", (DF,), {})
+            if "analisis_objetivo" in secciones:
+                tareas["analisis_objetivo"] = ("analyzer", "analizar_por_objetivo", (DF,), {})
+            if "jerarquia" in secciones:
+                tareas["jerarquia"] = ("rollups", "calcular_rollups", (DF,), {})
+
+        if "recomendaciones" in secciones:
+            tareas["duplicar"] = ("recommendations", "identificar_duplicar", (DF, mediana_cpa), {})
+            tareas["pausar"] = ("recommendations", "identificar_pausar", (DF, mediana_cpa), {})
+            if "reasignacion" in secciones:
+                tareas["reasignacion"] = ("budget_optimizer", "resumen_reasignacion", (DF,), {})
+
+        for nombre in precalculado:
+            tareas.pop(nombre, None)
+        resultados = {**ejecutor.ejecutar(tareas), **precalculado}
+
+        # 4. ANÁLISIS
+        if secciones:
+            print("\n[4/8] Generando análisis...")
+            from analyzer import generar_historico
+
+            resumen = resultados["resumen"]
+            rankings = resultados["rankings"]
+            anomalias = resultados["anomalias"]
+            analisis_objetivo = resultados.get("analisis_objetivo", {})
+            jerarquia = resultados.get("jerarquia")
+
+            if df_historico is not None and not df_historico.empty:
+                historico = generar_historico(df_historico, pesos)
+
+            print(f"  Héroes: {resumen['clasificacion']['heroes']}")
+            print(f"  En alerta: {resumen['clasificacion']['alertas']}")
+            print(f"  Anomalías: {len(anomalias)}")
+            if jerarquia:
+                print("  Jerarquía: " + ", ".join(
+                    f"{len(jerarquia[nivel])} {nivel}" for nivel in jerarquia["niveles"][:-1]
+                ))
+        else:
+            print("\n[4/8] Análisis omitido (no lo requiere ninguna salida)")
+
+        # 5. RECOMENDACIONES
+        if "recomendaciones" in secciones:
+            print("\n[5/8] Generando recomendaciones...")
+            from recommendations import analizar_no_candidatos, generar_resumen_acciones
+
+            candidatos_duplicar = resultados["duplicar"]
+            acciones_urgentes = resultados["pausar"]
+
+            no_candidatos = (
+                analizar_no_candidatos(df_30, mediana_cpa)
+                if "no_candidatos" in secciones and not candidatos_duplicar
+                else []
+            )
+
+            resumen_acciones = generar_resumen_acciones(
+                candidatos_duplicar,
+                acciones_urgentes,
+                analisis_objetivo,
+            )
+
+            print(f"  Para escalar: {len(candidatos_duplicar)}")
+            print(f"  Para pausar: {resumen_acciones['total_pausar']}")
+            print(f"  Para revisar: {resumen_acciones['total_revisar']}")
+
+            reasignacion = resultados.get("reasignacion")
+            if reasignacion is not None:
+                print(
+                    f"  Reasignación: {reasignacion['delta_conversiones']:+.1f} conversiones "
+                    f"({reasignacion['delta_pct']:+.1f}%) con ${reasignacion['presupuesto_total']:,.0f}/semana"
+                )
+        else:
+            print("\n[5/8] Recomendaciones omitidas (no las requiere ninguna salida)")
 
-    print(f"  Para escalar: {len(candidatos_duplicar)}")
-    print(f"  Para pausar: {resumen_acciones['total_pausar']}")
-    print(f"  Para revisar: {resumen_acciones['total_revisar']}")
+        if en_disco:
+            asegurar_directorios()
 
-    # 6. EXPORTAR DATOS LIMPIOS
-    print("\n[6/8] Exportando datos limpios...")
-    df_30.to_excel(f"{LIMPIOS_DIR}/{cliente}-30d-clean.xlsx", index=False)
+        # 6. EXPORTACIÓN EXCEL (en su propio proceso si el ejecutor es paralelo)
+        tareas = {}
+        if "excel" in salidas:
+            archivos["excel"] = f"{LIMPIOS_DIR}/{cliente}-30d-clean.xlsx"
+            tareas["excel"] = ("stage_executor", "exportar_excel", (DF, archivos["excel"]), {})
 
-    if df_7 is not None and not df_7.empty:
-        df_7_clean = calcular_score_basico(df_7)
-        df_7_clean.to_excel(f"{LIMPIOS_DIR}/{cliente}-7d-clean.xlsx", index=False)
+        ejecutor.ejecutar(tareas)
 
-    # 7. INFORMES TXT + JSON
-    print("\n[7/8] Generando informes...")
-
-    informe_txt = generar_informe_txt(
-        cliente,
-        resumen,
-        rankings,
-        candidatos_duplicar,
-        no_candidatos,
-        acciones_urgentes,
-        anomalias,
-        historico,
-        df_30,
-        mediana_cpa,
-    )
-
-    txt_path = f"{INFORMES_DIR}/{cliente}-informe.txt"
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(informe_txt)
-    print(f"  Informe TXT: {txt_path}")
-
-    informe_json = generar_json(
-        cliente,
-        resumen,
-        rankings,
-        candidatos_duplicar,
-        acciones_urgentes,
-        anomalias,
-        historico,
-        analisis_objetivo,
-        df_30,
-        mediana_cpa,
-    )
-
-    json_path = f"{INFORMES_DIR}/{cliente}-informe.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(informe_json, f, ensure_ascii=False, indent=2)
-    print(f"  Informe JSON: {json_path}")
+    # Modelo del informe: se arma una vez y lo consumen TXT, JSON y PDF
+    informe = None
+    if salidas & {"txt", "json", "pdf"}:
+        from report_model import construir_informe
 
-    # 8. PDF
-    if generar_pdf_flag:
-        print("\n[8/8] Generando PDF...")
-        pdf_path = generar_pdf(
+        informe = construir_informe(
             cliente,
             resumen,
             rankings,
             candidatos_duplicar,
+            no_candidatos,
             acciones_urgentes,
             anomalias,
             historico,
+            analisis_objetivo,
+            df_30,
             mediana_cpa,
+            reasignacion=reasignacion,
+            benchmark=benchmark,
+            jerarquia=jerarquia,
+            desglose=desglose,
+            calidad=datos.get("calidad"),
+            incluir_anuncios="json" in salidas,
         )
 
-        if pdf_path:
-            print(f"  Informe PDF: {pdf_path}")
-        else:
-            print("  [AVISO] PDF no generado (instalar reportlab)")
+    # 6. EXPORTAR DATOS LIMPIOS
+    if "excel" in salidas:
+        print("\n[6/8] Exportando datos limpios...")
+        if df_7 is not None and not df_7.empty:
+            df_7_clean = calcular_score_basico(df_7, pesos)
+            df_7_clean.to_excel(f"{LIMPIOS_DIR}/{cliente}-7d-clean.xlsx", index=False)
+        if datos.get("cuarentena") is not None:
+            datos["cuarentena"].to_excel(f"{LIMPIOS_DIR}/{cliente}-cuarentena.xlsx", index=False)
+            print(f"  Cuarentena: {LIMPIOS_DIR}/{cliente}-cuarentena.xlsx")
+    else:
+        print("\n[6/8] Exportación Excel omitida")
+
+    # 7. INFORMES TXT + JSON
+    if salidas & {"txt", "json"}:
+        print("\n[7/8] Generando informes...")
+
+    if "txt" in salidas:
+        from report_formatter import generar_informe_txt
+
+        informe_txt = generar_informe_txt(informe)
 
-    return informe_json
+    if "json" in salidas:
+        from json_exporter import generar_json
+
+        informe_json = generar_json(informe)
+
+    if "txt" in salidas and en_disco:
+        archivos["txt"] = f"{INFORMES_DIR}/{cliente}-informe.txt"
+        with open(archivos["txt"], "w", encoding="utf-8") as f:
+            f.write(informe_txt)
+        print(f"  Informe TXT: {archivos['txt']}")
+
+    if "json" in salidas and en_disco:
+        archivos["json"] = f"{INFORMES_DIR}/{cliente}-informe.json"
+        with open(archivos["json"], "w", encoding="utf-8") as f:
+            json.dump(informe_json, f, ensure_ascii=False, indent=2)
+        print(f"  Informe JSON: {archivos['json']}")
+
+    # 8. PDF
+    if "pdf" in salidas:
+        print("\n[8/8] Generando PDF...")
+        try:
+            from pdf_generator import generar_pdf
+        except ImportError as e:
+            print(f"  [AVISO] PDF omitido: reportlab no disponible ({e})")
+        else:
+            pdf_path = generar_pdf(
+                informe,
+                destino=destino_pdf,
+            )
+
+            if pdf_path is None:
+                print("  [AVISO] PDF no generado (ver error de pdf_generator)")
+            elif destino_pdf is not None:
+                pdf = pdf_path
+            else:
+                pdf = archivos["pdf"] = str(pdf_path)
+                print(f"  Informe PDF: {pdf_path}")
+
+    return {
+        "informe": informe_json,
+        "txt": informe_txt,
+        "pdf": pdf,
+        "archivos": archivos,
+        "total_anuncios": len(df_30),
+    }
 
 
 # -----------------------------------------------------------------------------
 # PIPELINE GLOBAL
 # -----------------------------------------------------------------------------
 
-def ejecutar_pipeline(generar_pdf_flag: bool = True):
+def ejecutar_pipeline(generar_pdf_flag: bool = True, clientes=None, salidas=None,
+                      workers=None, lote=None, motor=None):
+    """
+    Encola un trabajo por cliente en la cola persistente (job_queue) y la
+    drena con `workers` procesos. Si se corta, la corrida se retoma con el
+    mismo lote: los clientes ya terminados no se vuelven a procesar.
+
+    Args:
+        clientes: Clientes a procesar (por defecto todos; al reanudar, los del lote)
+        workers: Procesos en paralelo (COLA['WORKERS'])
+        lote: Lote existente a reanudar (None = corrida nueva)
+        motor: 'pandas' o 'polars' para esta corrida (None = MOTOR['BACKEND'])
+
+    Returns:
+        dict: {cliente: {"meta", "archivos"}} de los clientes procesados.
+        Los informes completos quedan en informes/ (los workers corren en
+        otros procesos y la cola solo guarda ese resumen); para el informe
+        en memoria usar procesar_cliente.
+    """
+    from contextlib import closing
+    import job_queue
+
     print("╔" + "═" * 58 + "╗")
     print("║" + " META ADS ANALYZER V4 ".center(58) + "║")
     print("║" + " Sistema Inteligente de Análisis ".center(58) + "║")
     print("╚" + "═" * 58 + "╝")
 
-    clientes = identificar_clientes()
-
-    if not clientes:
-        print("\n[ERROR] No se encontraron clientes.")
-        return {}
+    salidas, _ = resolver_salidas(salidas, generar_pdf_flag)
+
+    with closing(job_queue.conectar()) as conn:
+        if lote is None:
+            clientes = clientes or identificar_clientes()
+            if not clientes:
+                print("\n[ERROR] No se encontraron clientes.")
+                return {}
+            lote = job_queue.nuevo_lote()
+        elif job_queue.estado_lote(conn, lote) is None:
+            print(f"\n[ERROR] No existe el lote {lote}.")
+            return {}
+        else:
+            print(f"\nReanudando lote {lote}")
 
-    print(f"\nClientes encontrados: {', '.join(clientes)}")
+        if clientes:
+            print(f"\nClientes encontrados: {', '.join(clientes)}")
+            job_queue.encolar(conn, lote, clientes, salidas)
 
-    resultados = {}
-    exitosos = 0
-    fallidos = 0
+    completo = job_queue.drenar(lote, workers, motor=motor)
 
-    for cliente in clientes:
-        try:
-            resultado = procesar_cliente(cliente, generar_pdf_flag)
-            if resultado:
-                resultados[cliente] = resultado
-                exitosos += 1
-        except Exception as e:
-            print(f"\n  [ERROR] Falló al procesar {cliente}: {e}")
-            import traceback
-            traceback.print_exc()
-            fallidos += 1
+    with closing(job_queue.conectar()) as conn:
+        estado = job_queue.estado_lote(conn, lote)
 
+    conteo = estado["conteo"]
     print("\n" + "=" * 60)
-    print("PIPELINE COMPLETADO")
+    print("PIPELINE COMPLETADO" if completo else "PIPELINE INTERRUMPIDO")
     print("=" * 60)
-    print(f"✅ Exitosos: {exitosos}")
-    print(f"❌ Fallidos: {fallidos}")
+    print(f"✅ Exitosos: {conteo[job_queue.OK]}")
+    print(f"❌ Fallidos: {conteo[job_queue.FALLIDO]}")
+    if conteo[job_queue.OMITIDO]:
+        print(f"⏭️  Sin datos: {conteo[job_queue.OMITIDO]}")
+    if estado["restantes"]:
+        print(f"⏸️  Pendientes: {estado['restantes']} (reanudar con: python cli.py run --reanudar {lote})")
     print(f"📁 Informes en: {INFORMES_DIR}/")
     print("=" * 60)
 
-    return resultados
+    return {
+        trabajo["cliente"]: json.loads(trabajo["resultado"])
+        for trabajo in estado["trabajos"]
+        if trabajo["estado"] == job_queue.OK
+    }
 
 
 if __name__ == "__main__":
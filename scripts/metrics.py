@@ -5,7 +5,16 @@ Soporta diferentes objetivos de campaña.
 """
 import pandas as pd
 import numpy as np
-from config import PESOS_CONVERSIONES, PESOS_POR_OBJETIVO, UMBRALES
+from pandas.api.types import is_numeric_dtype
+from ad_identity import COLUMNA_CLAVE, asegurar_claves, agregar_por_clave
+from config import (
+    CUANTILES,
+    PESOS_CONVERSIONES,
+    PESOS_CONVERSIONES_CLIENTE,
+    PESOS_POR_OBJETIVO,
+    UMBRALES,
+    SCORE_NORMALIZACION,
+)
 
 def limpiar_columnas_duplicadas(df):
     """
@@ -14,50 +23,191 @@ def limpiar_columnas_duplicadas(df):
     return df.loc[:, ~df.columns.duplicated()]
 
 
-def calcular_score_basico(df):
+def obtener_pesos_conversiones(cliente=None, pesos=None):
+    """
+    Devuelve los pesos de conversiones a usar para un cliente.
+    
+    Parte de PESOS_CONVERSIONES y aplica, en orden, los ajustes de
+    PESOS_CONVERSIONES_CLIENTE[cliente] y los pesos explícitos recibidos.
+    
+    Args:
+        cliente: Nombre del cliente (opcional)
+        pesos: Dict con pesos que reemplazan a los de config (opcional)
+        
+    Returns:
+        dict: Pesos por columna de conversión
+    """
+    resultado = dict(PESOS_CONVERSIONES)
+    if cliente:
+        resultado.update(PESOS_CONVERSIONES_CLIENTE.get(str(cliente).upper(), {}))
+    if pesos:
+        resultado.update(pesos)
+    return resultado
+
+
+def _matriz_conversiones(df, columnas):
+    """
+    Arma la matriz (anuncios × columnas) de conversiones como float.
+    Columnas ausentes valen 0; solo se convierten las que no son numéricas.
+    """
+    matriz = np.zeros((len(df), len(columnas)))
+    
+    for j, col in enumerate(columnas):
+        if col not in df.columns:
+            continue
+        
+        serie = df[col]
+        # Si quedó como DataFrame (por duplicados previos)
+        if isinstance(serie, pd.DataFrame):
+            serie = serie.iloc[:, 0]
+        if not is_numeric_dtype(serie):
+            serie = pd.to_numeric(serie, errors="coerce")
+        
+        matriz[:, j] = serie.to_numpy(dtype=float, na_value=0.0)
+    
+    return np.nan_to_num(matriz, nan=0.0)
+
+
+def calcular_score_basico(df, pesos=None):
     """
     Calcula el score básico ponderado de conversiones para cada anuncio.
-    FIX: maneja columnas duplicadas y asegura Series válidas.
+    
+    El score es un único producto matriz-vector entre las columnas de
+    conversión y los pesos de PESOS_CONVERSIONES.
+    
+    Args:
+        df: DataFrame con columnas de conversión
+        pesos: Dict de pesos (por defecto PESOS_CONVERSIONES). Ver
+               obtener_pesos_conversiones() para pesos por cliente.
+        
+    Returns:
+        DataFrame con columna 'score' añadida
     """
     # 🔑 FIX CLAVE
     df = limpiar_columnas_duplicadas(df)
+    
+    df["score"] = score_ponderado(df, pesos)
+    return df
 
-    # Asegurar columnas base
-    columnas_score = [
-        "results",
-        "msg_init",
-        "msg_contacts",
-        "link_clicks",
-        "ig_profile",
-        "leads",
-        "purchases",
-    ]
 
-    for col in columnas_score:
-        if col not in df.columns:
-            df[col] = 0
+def score_ponderado(df, pesos=None):
+    """
+    Score ponderado de cada fila sin modificar df (lo comparten
+    calcular_score_basico y el motor Polars).
+    
+    Returns:
+        np.ndarray con el score de cada fila
+    """
+    pesos = PESOS_CONVERSIONES if pesos is None else pesos
+    columnas = list(pesos)
+    vector_pesos = np.array([pesos[c] for c in columnas], dtype=float)
+    
+    return _matriz_conversiones(df, columnas) @ vector_pesos
 
-        # Si quedó como DataFrame (por duplicados previos)
-        if isinstance(df[col], pd.DataFrame):
-            df[col] = df[col].iloc[:, 0]
-
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-
-    df["score"] = (
-        df["results"] * PESOS_CONVERSIONES.get("results", 1.0) +
-        df["msg_init"] * PESOS_CONVERSIONES.get("msg_init", 0.0) +
-        df["msg_contacts"] * PESOS_CONVERSIONES.get("msg_contacts", 0.0) +
-        df["link_clicks"] * PESOS_CONVERSIONES.get("link_clicks", 0.0) +
-        df["ig_profile"] * PESOS_CONVERSIONES.get("ig_profile", 0.0) +
-        df["leads"] * PESOS_CONVERSIONES.get("leads", 1.0) +
-        df["purchases"] * PESOS_CONVERSIONES.get("purchases", 2.0)
-    )
 
+def calcular_scores_perfiles(df, perfiles, prefijo="score_"):
+    """
+    Calcula el score con varios perfiles de pesos en una sola operación.
+    Útil para comparar cómo cambia el score con distintas valoraciones.
+    
+    Args:
+        df: DataFrame con columnas de conversión
+        perfiles: dict {nombre_perfil: {columna: peso}} o DataFrame
+                  (columnas de conversión × perfiles)
+        prefijo: Prefijo de las columnas de score generadas
+        
+    Returns:
+        DataFrame con una columna '<prefijo><perfil>' por perfil
+    """
+    df = limpiar_columnas_duplicadas(df)
+    
+    matriz_pesos = pd.DataFrame(perfiles).fillna(0).astype(float)
+    scores = _matriz_conversiones(df, list(matriz_pesos.index)) @ matriz_pesos.to_numpy()
+    
+    for j, perfil in enumerate(matriz_pesos.columns):
+        df[f"{prefijo}{perfil}"] = scores[:, j]
+    
     return df
 
 
+METRICAS_INVERTIDAS = ['cpa', 'cpc', 'cpl', 'cpm']
+
+
+def _normalizar_metrica(valores, grupos, metodo='max', invertida=False):
+    """
+    Normaliza una métrica al rango 0-1 dentro de cada grupo.
+    
+    Args:
+        valores: Serie numérica de la métrica
+        grupos: Códigos enteros de grupo (uno por fila)
+        metodo: 'max' (valor / máximo del grupo) o 'percentil' (rango percentil)
+        invertida: True para métricas donde menor es mejor (CPA, CPC, CPL)
+        
+    Returns:
+        np.ndarray con la métrica normalizada 0-1
+    """
+    valores = valores.fillna(0).astype(float)
+    agrupados = valores.groupby(grupos)
+    
+    if metodo == 'percentil':
+        # Solo se rankean valores con dato; 0 = sin actividad = 0 puntos
+        positivos = valores.where(valores > 0)
+        rango = positivos.groupby(grupos).rank(pct=True, ascending=not invertida)
+        return rango.fillna(0).to_numpy()
+    
+    if invertida:
+        # Invertir: valores bajos = score alto
+        max_val = valores.where(valores > 0).groupby(grupos).transform('max').fillna(1)
+        return (1 - (valores / max_val).clip(0, 1)).to_numpy()
+    
+    # Normal: valores altos = score alto
+    max_val = agrupados.transform('max')
+    max_val = max_val.where(max_val > 0, 1)
+    return (valores / max_val).clip(0, 1).to_numpy()
+
+
+def _score_agrupado(df, grupos, pesos_por_grupo, metodo='max'):
+    """
+    Calcula el score 0-100 de todos los grupos en una sola pasada.
+    
+    Cada métrica se normaliza una única vez con transformaciones agrupadas
+    y se pondera con el peso del objetivo de cada fila.
+    
+    Args:
+        df: DataFrame con métricas calculadas
+        grupos: Códigos enteros de grupo (0..n_grupos-1) por fila
+        pesos_por_grupo: Lista de dicts de pesos, uno por código de grupo
+        metodo: 'max' o 'percentil'
+        
+    Returns:
+        np.ndarray con el score 0-100 de cada fila
+    """
+    grupos = np.asarray(grupos)
+    metricas = sorted({m for pesos in pesos_por_grupo for m in pesos if m in df.columns})
+    
+    # Matriz de pesos (grupo × métrica) indexada por el grupo de cada fila
+    matriz_pesos = np.array(
+        [[pesos.get(m, 0.0) for m in metricas] for pesos in pesos_por_grupo],
+        dtype=float,
+    ).reshape(len(pesos_por_grupo), len(metricas))
+    pesos_fila = matriz_pesos[grupos] if len(grupos) else matriz_pesos[:0]
+    
+    total = np.zeros(len(df))
+    for j, metrica in enumerate(metricas):
+        componente = _normalizar_metrica(
+            df[metrica], grupos, metodo, invertida=metrica in METRICAS_INVERTIDAS
+        )
+        total += componente * pesos_fila[:, j]
+    
+    score = pd.Series(total * 100, index=df.index)
+    
+    # Ajustar para que el mejor de cada grupo quede en 100
+    max_score = score.groupby(grupos).transform('max')
+    score = (score / max_score.where(max_score > 0, 1) * 100).where(max_score > 0, score)
+    return score.clip(0, 100).to_numpy()
+
 
-def calcular_score_normalizado(df, objetivo='general'):
+def calcular_score_normalizado(df, objetivo='general', metodo=None):
     """
     Calcula un score normalizado 0-100 considerando:
     - Rendimiento vs otros anuncios del mismo objetivo
@@ -67,40 +217,46 @@ def calcular_score_normalizado(df, objetivo='general'):
     Args:
         df: DataFrame con métricas calculadas
         objetivo: Tipo de objetivo para usar pesos específicos
+        metodo: 'max' (valor / máximo) o 'percentil' (rango percentil).
+                Por defecto SCORE_NORMALIZACION['METODO']
         
     Returns:
         DataFrame con columna 'score_100' añadida (score 0-100)
     """
+    metodo = metodo or SCORE_NORMALIZACION['METODO']
     pesos = PESOS_POR_OBJETIVO.get(objetivo, PESOS_POR_OBJETIVO['general'])
     
-    # Calcular componentes del score
-    componentes = pd.DataFrame(index=df.index)
-    
-    # Normalizar cada métrica al rango 0-1 usando percentiles
-    for metrica, peso in pesos.items():
-        if metrica in df.columns:
-            valores = df[metrica].fillna(0)
-            
-            # Para métricas donde menor es mejor (CPA, CPC, CPL)
-            if metrica in ['cpa', 'cpc', 'cpl', 'cpm']:
-                # Invertir: valores bajos = score alto
-                max_val = valores[valores > 0].max() if (valores > 0).any() else 1
-                componentes[metrica] = 1 - (valores / max_val).clip(0, 1)
-            else:
-                # Normal: valores altos = score alto
-                max_val = valores.max() if valores.max() > 0 else 1
-                componentes[metrica] = (valores / max_val).clip(0, 1)
-            
-            componentes[metrica] *= peso
-    
-    # Sumar componentes
-    df['score_100'] = componentes.sum(axis=1) * 100
-    
-    # Ajustar para que esté en rango 0-100
-    max_score = df['score_100'].max()
-    if max_score > 0:
-        df['score_100'] = (df['score_100'] / max_score * 100).clip(0, 100)
+    grupos = np.zeros(len(df), dtype=int)
+    df['score_100'] = _score_agrupado(df, grupos, [pesos], metodo)
+    return df
+
+
+def calcular_score_por_objetivo(df, columna_objetivo='objetivo_detectado', metodo=None):
+    """
+    Calcula el score 0-100 comparando cada anuncio solo con los anuncios
+    de su mismo objetivo y usando los pesos de ese objetivo.
+    
+    Todos los objetivos se calculan a la vez con transformaciones agrupadas
+    (máximo o rango percentil por grupo), sin filtrar el DataFrame por objetivo.
+    
+    Args:
+        df: DataFrame con métricas calculadas y columna de objetivo
+        columna_objetivo: Columna con el objetivo de cada anuncio
+        metodo: 'max' o 'percentil'. Por defecto SCORE_NORMALIZACION['METODO']
+        
+    Returns:
+        DataFrame con columna 'score_100' añadida (score 0-100)
+    """
+    if columna_objetivo not in df.columns:
+        return calcular_score_normalizado(df, metodo=metodo)
+    
+    metodo = metodo or SCORE_NORMALIZACION['METODO']
+    grupos, objetivos = pd.factorize(df[columna_objetivo].fillna('general'))
+    pesos_por_grupo = [
+        PESOS_POR_OBJETIVO.get(obj, PESOS_POR_OBJETIVO['general']) for obj in objetivos
+    ]
     
+    df['score_100'] = _score_agrupado(df, grupos, pesos_por_grupo, metodo)
     return df
 
 
@@ -139,7 +295,153 @@ def calcular_mediana_cpa(df):
     return 0
 
 
-def calcular_eficiencia(df, mediana_cpa):
+def sketch_cpa(df, sketch=None):
+    """
+    Agrega los CPA válidos (> 0) de df a un sketch de cuantiles.
+    
+    Args:
+        sketch: SketchCuantiles a actualizar (None = uno nuevo)
+        
+    Returns:
+        SketchCuantiles
+    """
+    from cuantiles import SketchCuantiles
+
+    sketch = sketch if sketch is not None else SketchCuantiles()
+    cpa = pd.to_numeric(df["cpa"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return sketch.agregar(cpa[cpa > 0])
+
+
+def calcular_cuantiles_cpa(df, referencia=None):
+    """
+    p10/p50/p90 del CPA en memoria acotada (sketch KLL).
+    
+    Args:
+        referencia: SketchCuantiles con otros CPA a considerar (p. ej. el
+                    resto del portafolio); no se modifica
+                    
+    Returns:
+        dict: {'p10', 'p50', 'p90'}, o None si no hay CPA válidos
+    """
+    sketch = sketch_cpa(df, referencia.copia() if referencia is not None else None)
+    if not len(sketch):
+        return None
+    p10, p50, p90 = sketch.cuantiles([0.1, 0.5, 0.9])
+    return {'p10': float(p10), 'p50': float(p50), 'p90': float(p90)}
+
+
+# Categorías como códigos enteros (posición en cada tupla). Las reglas de
+# abajo aceptan umbrales escalares o arrays (escenarios, 1): las usan
+# enriquecer_dataframe y el simulador de umbrales (escenarios × anuncios).
+EFICIENCIAS = ('SIN_DATOS', 'MUY_EFICIENTE', 'EFICIENTE', 'NORMAL', 'CARO')
+TENDENCIAS = ('SIN_DATOS', 'NUEVO', 'EN_ASCENSO', 'ESTABLE', 'EN_CAIDA', 'CRITICO')
+CLASIFICACIONES = ('HEROE', 'SANO', 'MUERTO', 'ALERTA')
+
+
+def etiquetas(codigos, categorias):
+    """Códigos de las reglas -> array de strings de la categoría."""
+    return np.asarray(categorias, dtype=object)[codigos]
+
+
+def reglas_eficiencia(cpa, mediana_cpa, umbrales=None, cuantiles=None):
+    """
+    Códigos de EFICIENCIAS (ver calcular_eficiencia).
+
+    Args:
+        cpa: np.ndarray de CPA (NaN = sin conversiones)
+        umbrales: dict con EFICIENCIA_* (por defecto UMBRALES)
+    """
+    umbrales = UMBRALES if umbrales is None else umbrales
+    sin_datos = np.isnan(cpa) | (cpa == 0)
+
+    if cuantiles is not None:
+        cortes = [cuantiles['p10'], cuantiles['p50'], cuantiles['p90']]
+        valor = cpa
+    elif mediana_cpa == 0:
+        return np.where(sin_datos, 0, 3)
+    else:
+        cortes = [umbrales['EFICIENCIA_MUY_BUENA'], umbrales['EFICIENCIA_BUENA'], umbrales['EFICIENCIA_NORMAL']]
+        valor = cpa / mediana_cpa
+
+    return np.select(
+        [sin_datos, valor <= cortes[0], valor <= cortes[1], valor <= cortes[2]],
+        [0, 1, 2, 3],
+        default=4,
+    )
+
+
+def reglas_tendencia(score, score_7d, dias_30d=30, dias_7d=7, umbrales=None):
+    """
+    Códigos de TENDENCIAS y ratio 7d/30d de promedios diarios (ver
+    calcular_tendencia).
+
+    Returns:
+        tuple (códigos, ratio_tendencia)
+    """
+    umbrales = UMBRALES if umbrales is None else umbrales
+    with np.errstate(divide='ignore', invalid='ignore'):
+        promedio_30d = score / dias_30d
+        promedio_7d = np.where(score_7d > 0, score_7d / dias_7d, 0.0)
+        ratio = promedio_7d / promedio_30d
+        ratio_tendencia = np.where(score > 0, (score_7d / dias_7d) / (score / dias_30d), 1.0)
+
+    codigos = np.select(
+        [score == 0,
+         promedio_30d == 0,
+         ratio >= umbrales['TENDENCIA_SUBIDA'],
+         ratio <= umbrales['TENDENCIA_CRITICA'],
+         ratio <= umbrales['TENDENCIA_CAIDA']],
+        [np.where(score_7d > 0, 1, 0), np.where(promedio_7d > 0, 1, 0), 2, 5, 4],
+        default=3,
+    )
+    return codigos, ratio_tendencia
+
+
+def reglas_clasificacion(score_100, eficiencia, tendencia, activo, inactivo, score, spend, umbrales=None):
+    """
+    Códigos de CLASIFICACIONES (ver clasificar_anuncios).
+
+    Args:
+        eficiencia, tendencia: Códigos de reglas_eficiencia / reglas_tendencia
+        activo, inactivo: Máscaras de actividad ACTIVO / INACTIVO
+    """
+    umbrales = UMBRALES if umbrales is None else umbrales
+    eficiente = (eficiencia == 1) | (eficiencia == 2)
+    critico = tendencia == 5
+
+    return np.select(
+        [(score_100 >= umbrales['SCORE_HEROE']) & eficiente & activo,
+         (score_100 >= umbrales['SCORE_SANO']) & (eficiencia != 4) & ~critico,
+         inactivo | critico | ((score == 0) & (spend > umbrales['PAUSAR_GASTO_MIN']))],
+        [0, 1, 2],
+        default=3,
+    )
+
+
+def _numerica(df, columna, defecto=0.0):
+    if columna not in df.columns:
+        return np.full(len(df), defecto, dtype=float)
+    return pd.to_numeric(df[columna], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def dias_ventanas(df):
+    """
+    Días de la ventana 30d y 7d de cada anuncio para los promedios diarios:
+    dias_ventana / dias_7d de serie_diaria.py, o 30 y 7 si no vienen.
+
+    Returns:
+        tuple (dias_30d, dias_7d), arrays o escalares
+    """
+    def dias(columna, defecto):
+        if columna not in df.columns:
+            return defecto
+        valores = _numerica(df, columna)
+        return np.where(valores == 0, defecto, valores)
+
+    return dias("dias_ventana", 30), dias("dias_7d", 7)
+
+
+def calcular_eficiencia(df, mediana_cpa, cuantiles=None):
     """
     Categoriza cada anuncio por eficiencia de CPA vs mediana.
     
@@ -149,26 +451,13 @@ def calcular_eficiencia(df, mediana_cpa):
         - NORMAL: CPA < 150% de mediana
         - CARO: CPA >= 150% de mediana
         - SIN_DATOS: Sin conversiones
-    """
-    def _eficiencia(row):
-        if pd.isna(row["cpa"]) or row["cpa"] == 0:
-            return "SIN_DATOS"
-        
-        if mediana_cpa == 0:
-            return "NORMAL"
-        
-        ratio = row["cpa"] / mediana_cpa
         
-        if ratio <= UMBRALES['EFICIENCIA_MUY_BUENA']:
-            return "MUY_EFICIENTE"
-        elif ratio <= UMBRALES['EFICIENCIA_BUENA']:
-            return "EFICIENTE"
-        elif ratio <= UMBRALES['EFICIENCIA_NORMAL']:
-            return "NORMAL"
-        else:
-            return "CARO"
-    
-    df["eficiencia"] = df.apply(_eficiencia, axis=1)
+    Con cuantiles ({'p10', 'p50', 'p90'}, ver calcular_cuantiles_cpa) los
+    cortes son p10, p50 y p90 del CPA de referencia en lugar de ratios de
+    la mediana.
+    """
+    codigos = reglas_eficiencia(_numerica(df, "cpa", np.nan), mediana_cpa, cuantiles=cuantiles)
+    df["eficiencia"] = etiquetas(codigos, EFICIENCIAS)
     return df
 
 
@@ -188,16 +477,13 @@ def calcular_actividad(df, df_7d):
         df["gasto_7d"] = 0
         return df
     
-    # Preparar datos de 7d
-    df_7d_agg = df_7d[["ad_name", "score", "spend"]].rename(columns={
-        "score": "score_7d",
-        "spend": "gasto_7d"
-    })
+    # Pre-agregar 7d por clave entera y cruzar por posición (sin merge por string)
+    n_claves = asegurar_claves(df, df_7d)
+    claves_7d = df_7d[COLUMNA_CLAVE].to_numpy()
+    claves_30d = df[COLUMNA_CLAVE].to_numpy()
     
-    # Merge
-    df = df.merge(df_7d_agg, on="ad_name", how="left")
-    df["score_7d"] = df["score_7d"].fillna(0)
-    df["gasto_7d"] = df["gasto_7d"].fillna(0)
+    df["score_7d"] = agregar_por_clave(claves_7d, df_7d["score"], n_claves)[claves_30d]
+    df["gasto_7d"] = agregar_por_clave(claves_7d, df_7d["spend"], n_claves)[claves_30d]
     
     def _actividad(row):
         if row["score_7d"] > 0:
@@ -221,89 +507,107 @@ def calcular_tendencia(df, df_7d):
         - EN_CAIDA: Rendimiento 7d < 80% del promedio
         - CRITICO: Rendimiento 7d < 50% del promedio
         - NUEVO: No hay suficientes datos para comparar
+    
+    Con ventanas derivadas del export diario (serie_diaria.py) los promedios
+    usan los días reales desde la primera entrega del anuncio (dias_ventana)
+    en lugar de 30 y 7.
     """
     if df_7d.empty:
         df["tendencia"] = "SIN_DATOS"
         df["ratio_tendencia"] = 1.0
         return df
     
-    def _tendencia(row):
-        score_30d = row.get("score", 0)
-        score_7d = row.get("score_7d", 0)
-        
-        if score_30d == 0:
-            if score_7d > 0:
-                return "NUEVO"
-            return "SIN_DATOS"
-        
-        # Calcular promedio diario de 30d y comparar con 7d
-        promedio_diario_30d = score_30d / 30
-        promedio_diario_7d = score_7d / 7 if score_7d > 0 else 0
-        
-        if promedio_diario_30d == 0:
-            return "NUEVO" if promedio_diario_7d > 0 else "SIN_DATOS"
-        
-        ratio = promedio_diario_7d / promedio_diario_30d
-        
-        if ratio >= UMBRALES['TENDENCIA_SUBIDA']:
-            return "EN_ASCENSO"
-        elif ratio <= UMBRALES['TENDENCIA_CRITICA']:
-            return "CRITICO"
-        elif ratio <= UMBRALES['TENDENCIA_CAIDA']:
-            return "EN_CAIDA"
-        else:
-            return "ESTABLE"
+    if "dias_ventana" in df_7d.columns:
+        n_claves = asegurar_claves(df, df_7d)
+        df["dias_7d"] = agregar_por_clave(
+            df_7d[COLUMNA_CLAVE].to_numpy(), df_7d["dias_ventana"], n_claves
+        )[df[COLUMNA_CLAVE].to_numpy()]
     
-    df["tendencia"] = df.apply(_tendencia, axis=1)
+    # Promedio diario de 7d vs 30d (ratio_tendencia también para gráficos)
+    dias_30d, dias_7d = dias_ventanas(df)
+    codigos, ratio = reglas_tendencia(_numerica(df, "score"), _numerica(df, "score_7d"), dias_30d, dias_7d)
+    df["tendencia"] = etiquetas(codigos, TENDENCIAS)
+    df["ratio_tendencia"] = ratio
     
-    # Calcular ratio numérico para gráficos
-    df["ratio_tendencia"] = df.apply(
-        lambda r: (r.get("score_7d", 0) / 7) / (r["score"] / 30) 
-                  if r["score"] > 0 else 1.0, 
-        axis=1
-    )
+    return df
+
+
+def calcular_historico_anuncio(df, df_hist, pesos=None):
+    """
+    Agrega a cada anuncio su contexto histórico mensual.
+    
+    El histórico se pre-agrega por clave de anuncio (y mes) antes de cruzarlo
+    con el DataFrame principal por la clave entera.
     
+    Columnas:
+        - meses_historico: Meses con datos del anuncio
+        - score_hist_promedio: Score mensual promedio en esos meses
+        - gasto_hist_promedio: Gasto mensual promedio en esos meses
+    """
+    if df_hist is None or df_hist.empty:
+        df["meses_historico"] = 0
+        df["score_hist_promedio"] = 0.0
+        df["gasto_hist_promedio"] = 0.0
+        return df
+    
+    df_hist = calcular_score_basico(df_hist, pesos)
+    n_claves = asegurar_claves(df, df_hist)
+    claves_hist = df_hist[COLUMNA_CLAVE].to_numpy()
+    claves_30d = df[COLUMNA_CLAVE].to_numpy()
+    
+    # Meses distintos por anuncio (pares clave-mes únicos)
+    periodos, _ = pd.factorize(df_hist["periodo"])
+    pares = np.unique(claves_hist.astype(np.int64) * (periodos.max() + 1) + periodos)
+    meses = np.bincount(pares // (periodos.max() + 1), minlength=n_claves)
+    
+    score_total = agregar_por_clave(claves_hist, df_hist["score"], n_claves)
+    gasto_total = agregar_por_clave(claves_hist, df_hist["spend"], n_claves)
+    divisor = np.maximum(meses, 1)
+    
+    df["meses_historico"] = meses[claves_30d]
+    df["score_hist_promedio"] = (score_total / divisor)[claves_30d]
+    df["gasto_hist_promedio"] = (gasto_total / divisor)[claves_30d]
     return df
 
 
-def clasificar_anuncio(row):
+def _codigos(df, columna, categorias, defecto):
+    """Columna de categorías -> códigos de la tupla (-1 si no es ninguna)."""
+    valores = df[columna].to_numpy() if columna in df.columns else np.full(len(df), defecto, dtype=object)
+    return pd.Index(categorias).get_indexer(valores)
+
+
+def clasificar_anuncios(df):
     """
-    Clasifica un anuncio en categorías para acciones.
+    Clasifica todos los anuncios en categorías para acciones.
     
     Categorías:
         - HEROE: Score alto, eficiente, activo → Escalar
         - SANO: Buen rendimiento general → Mantener
         - ALERTA: Problemas detectados → Revisar
         - MUERTO: Sin rendimiento → Pausar
+        
+    Returns:
+        np.ndarray con la clasificación de cada fila
     """
-    score_100 = row.get('score_100', 0)
-    eficiencia = row.get('eficiencia', 'SIN_DATOS')
-    actividad = row.get('actividad', 'SIN_DATOS_7D')
-    tendencia = row.get('tendencia', 'SIN_DATOS')
-    
-    # Anuncio héroe: alto score, eficiente y activo
-    if (score_100 >= UMBRALES['SCORE_HEROE'] and 
-        eficiencia in ['MUY_EFICIENTE', 'EFICIENTE'] and 
-        actividad == 'ACTIVO'):
-        return 'HEROE'
-    
-    # Anuncio sano: buen score y sin problemas graves
-    if (score_100 >= UMBRALES['SCORE_SANO'] and 
-        eficiencia not in ['CARO'] and 
-        tendencia not in ['CRITICO']):
-        return 'SANO'
-    
-    # Anuncio muerto: sin actividad o tendencia crítica
-    if (actividad == 'INACTIVO' or 
-        tendencia == 'CRITICO' or 
-        (row.get('score', 0) == 0 and row.get('spend', 0) > UMBRALES['PAUSAR_GASTO_MIN'])):
-        return 'MUERTO'
-    
-    # En alerta: todo lo demás
-    return 'ALERTA'
+    actividad = df['actividad'].to_numpy() if 'actividad' in df.columns else np.full(len(df), 'SIN_DATOS_7D')
+    codigos = reglas_clasificacion(
+        _numerica(df, 'score_100'),
+        _codigos(df, 'eficiencia', EFICIENCIAS, 'SIN_DATOS'),
+        _codigos(df, 'tendencia', TENDENCIAS, 'SIN_DATOS'),
+        actividad == 'ACTIVO',
+        actividad == 'INACTIVO',
+        _numerica(df, 'score'),
+        _numerica(df, 'spend'),
+    )
+    return etiquetas(codigos, CLASIFICACIONES)
 
 
-def enriquecer_dataframe(df, df_7d=None):
+def clasificar_anuncio(row):
+    """Clasificación de un solo anuncio (ver clasificar_anuncios)."""
+    return clasificar_anuncios(pd.DataFrame([row]))[0]
+
+
+def enriquecer_dataframe(df, df_7d=None, pesos=None, df_hist=None, referencia_cpa=None):
     """
     Aplica todos los cálculos de métricas a un DataFrame.
     Pipeline completo de enriquecimiento.
@@ -311,23 +615,31 @@ def enriquecer_dataframe(df, df_7d=None):
     Args:
         df: DataFrame principal (30d)
         df_7d: DataFrame de 7 días (opcional)
+        pesos: Pesos de conversiones (opcional, ver obtener_pesos_conversiones)
+        df_hist: DataFrame histórico mensual (opcional)
+        referencia_cpa: SketchCuantiles con los CPA del portafolio para
+                        CUANTILES['EFICIENCIA'] = 'portafolio' (opcional)
         
     Returns:
         tuple: (DataFrame enriquecido, mediana_cpa)
     """
     # Score básico
-    df = calcular_score_basico(df)
+    df = calcular_score_basico(df, pesos)
     
     # CPA
     df = calcular_cpa(df)
     mediana_cpa = calcular_mediana_cpa(df)
     
-    # Eficiencia
-    df = calcular_eficiencia(df, mediana_cpa)
+    # Eficiencia (vs mediana de la cuenta o vs p10/p50/p90, ver CUANTILES)
+    cuantiles = None
+    if CUANTILES['EFICIENCIA'] != 'mediana':
+        referencia = referencia_cpa if CUANTILES['EFICIENCIA'] == 'portafolio' else None
+        cuantiles = calcular_cuantiles_cpa(df, referencia)
+    df = calcular_eficiencia(df, mediana_cpa, cuantiles)
     
     # Actividad y tendencia (requieren datos de 7d)
     if df_7d is not None and not df_7d.empty:
-        df_7d = calcular_score_basico(df_7d)
+        df_7d = calcular_score_basico(df_7d, pesos)
         df = calcular_actividad(df, df_7d)
         df = calcular_tendencia(df, df_7d)
     else:
@@ -337,10 +649,16 @@ def enriquecer_dataframe(df, df_7d=None):
         df["tendencia"] = "SIN_DATOS"
         df["ratio_tendencia"] = 1.0
     
+    # Contexto histórico por anuncio
+    df = calcular_historico_anuncio(df, df_hist, pesos)
+    
     # Score normalizado 0-100 (después de tener todas las métricas)
-    df = calcular_score_normalizado(df)
+    if SCORE_NORMALIZACION['POR_OBJETIVO']:
+        df = calcular_score_por_objetivo(df)
+    else:
+        df = calcular_score_normalizado(df)
     
     # Clasificación final
-    df['clasificacion'] = df.apply(clasificar_anuncio, axis=1)
+    df['clasificacion'] = clasificar_anuncios(df)
     
     return df, mediana_cpa
@@ -0,0 +1,179 @@
+"""
+Módulo de parseo numérico V4.
+Convierte columnas de texto de los exports de Meta a números respetando el
+formato regional de cada columna:
+
+    - 'es': 1.234,56  (punto de miles, coma decimal - Argentina)
+    - 'en': 1,234.56  (coma de miles, punto decimal)
+
+El formato se detecta por columna a partir de una muestra. Las celdas que
+no son ambiguas por sí solas ('1.234,5', '1.234.567', '1,234,567') se
+convierten con su propio formato aunque la columna vote el otro. Todas las
+celdas del mismo formato se convierten juntas en una sola pasada
+vectorizada (con Arrow compute si pyarrow está instalado) y se informa
+cuántas celdas con contenido no pudieron convertirse.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype, infer_dtype
+
+try:
+    import pyarrow  # noqa: F401
+    DTYPE_TEXTO = "string[pyarrow]"
+except ImportError:
+    DTYPE_TEXTO = "string"
+
+TAMANO_MUESTRA = 200
+
+# Caracteres que no forman parte de un número (%, $, ARS, espacios, NBSP...)
+_RE_BASURA = {
+    "es": r"[^\d,\-]",     # también descarta '.', separador de miles
+    "en": r"[^\d.\-eE]",   # también descarta ',', separador de miles
+}
+_RE_VACIO = re.compile(r"^\s*(-|–|—|n/?a|nan|none)?\s*$", re.IGNORECASE)
+_RE_MILES_EN = r"^-?\d{1,3}(?:,\d{3})+(?:\.\d+)?$"
+_RE_MILES_ES = r"^-?\d{1,3}(?:\.\d{3})+(?:,\d+)?$"
+# '12.345': miles argentinos o decimal con 3 cifras, no vota
+_RE_AMBIGUO = r"^-?\d{1,3}\.\d{3}$"
+
+
+def _clasificar_celdas(textos: pd.Series):
+    """
+    Formato de cada celda de texto según sus separadores.
+
+    Returns:
+        tuple: (Serie con el formato propio de las celdas que no son ambiguas
+                por sí solas, '' en las demás; Serie con el voto de cada
+                celda para el formato de la columna, '' si no vota)
+    """
+    limpio = textos.astype(str).str.replace(r"[^\d.,\-]", "", regex=True)
+    puntos = limpio.str.count(r"\.")
+    comas = limpio.str.count(",")
+    coma_al_final = limpio.str.rfind(",") > limpio.str.rfind(".")
+
+    ambos = (puntos > 0) & (comas > 0)
+    miles_en = (puntos == 0) & (comas > 1) & limpio.str.match(_RE_MILES_EN)
+    miles_es = (comas == 0) & (puntos > 1) & limpio.str.match(_RE_MILES_ES)
+
+    propio = np.select(
+        [ambos & coma_al_final, ambos, miles_en, miles_es],
+        ["es", "en", "en", "es"],
+        default="",
+    )
+    voto = np.select(
+        [propio != "", comas > 0, limpio.str.match(_RE_AMBIGUO), puntos > 0],
+        [propio, "es", "", "en"],
+        default="",
+    )
+    return pd.Series(propio, index=textos.index), pd.Series(voto, index=textos.index)
+
+
+def detectar_formato_numerico(muestra) -> str:
+    """
+    Detecta el formato regional de una columna a partir de una muestra de textos.
+
+    Reglas:
+        - Si aparecen '.' y ',' juntos, el último separador es el decimal
+        - '1.234.567' => miles con punto ('es')
+        - ',' sola => decimal ('es') salvo grupos de miles '1,234,567' ('en')
+        - '12.345' (un punto y 3 decimales) es ambiguo y no vota
+        - Otro '.' solo => decimal ('en')
+        - Empate o sin votos => 'en'
+
+    Args:
+        muestra: Iterable de strings
+
+    Returns:
+        str: 'es' o 'en'
+    """
+    _, votos = _clasificar_celdas(pd.Series(list(muestra), dtype=object))
+    return "es" if (votos == "es").sum() > (votos == "en").sum() else "en"
+
+
+def _parsear_textos(textos: pd.Series, formato: str) -> pd.Series:
+    """Convierte una serie de textos (ya en formato conocido) a float."""
+    limpio = textos.astype(DTYPE_TEXTO).str.replace(_RE_BASURA[formato], "", regex=True)
+    if formato == "es":
+        limpio = limpio.str.replace(",", ".", regex=False)
+    return pd.to_numeric(limpio, errors="coerce").astype(float)
+
+
+def _separar_textos(serie: pd.Series):
+    """
+    Separa una columna object en valores ya numéricos y celdas de texto.
+
+    Returns:
+        tuple: (Serie float con los valores numéricos, máscara de celdas texto)
+    """
+    tipo = infer_dtype(serie, skipna=True)
+    if tipo in ("string", "empty"):
+        return pd.Series(np.nan, index=serie.index), serie.notna()
+
+    es_texto = serie.map(lambda v: isinstance(v, str)).astype(bool)
+    numericos = pd.to_numeric(serie.where(~es_texto), errors="coerce").astype(float)
+    return numericos, es_texto
+
+
+def parsear_columnas_numericas(df: pd.DataFrame, columnas):
+    """
+    Convierte a número todas las columnas indicadas en una sola pasada por formato.
+
+    Args:
+        df: DataFrame con las columnas a convertir
+        columnas: Columnas numéricas esperadas
+
+    Returns:
+        tuple: (dict {columna: Serie float con NaN en celdas inválidas},
+                dict {columna: índice de las celdas con contenido que no se
+                      pudieron convertir},
+                dict {columna: formato detectado})
+    """
+    resultado = {}
+    forzadas = {}
+    formatos = {}
+    pendientes = {"es": [], "en": []}
+
+    for col in columnas:
+        serie = df[col]
+        # Si por error vino como DataFrame (defensa extra)
+        if isinstance(serie, pd.DataFrame):
+            serie = serie.iloc[:, 0]
+
+        if is_numeric_dtype(serie):
+            resultado[col] = serie.astype(float)
+            continue
+
+        numericos, es_texto = _separar_textos(serie)
+        textos = serie[es_texto].astype(str)
+        textos = textos[~textos.str.match(_RE_VACIO)]
+
+        propio, votos = _clasificar_celdas(textos)
+        muestra = votos.head(TAMANO_MUESTRA)
+        formato = "es" if (muestra == "es").sum() > (muestra == "en").sum() else "en"
+        formatos[col] = formato
+        resultado[col] = numericos
+        # Las celdas no ambiguas van con su propio formato
+        propio = propio.mask(propio == "", formato)
+        for f in pendientes:
+            pendientes[f].append((col, textos[(propio == f).to_numpy()]))
+
+    # Una pasada vectorizada por formato con todas las columnas concatenadas
+    for formato, partes in pendientes.items():
+        partes = [(col, textos) for col, textos in partes if len(textos)]
+        if not partes:
+            continue
+
+        todos = pd.concat([textos for _, textos in partes], keys=[col for col, _ in partes])
+        valores = _parsear_textos(todos, formato)
+
+        for col, _ in partes:
+            parte = valores.xs(col, level=0)
+            resultado[col] = resultado[col].copy()
+            resultado[col].loc[parte.index] = parte.to_numpy()
+            fallidas = parte.index[parte.isna().to_numpy()]
+            forzadas[col] = forzadas[col].append(fallidas) if col in forzadas else fallidas
+
+    forzadas = {col: filas for col, filas in forzadas.items() if len(filas)}
+    return resultado, forzadas, formatos
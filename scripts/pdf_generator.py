@@ -22,9 +22,12 @@ BG = colors.HexColor("#F8FAFC")
 BORDER = colors.HexColor("#E5E7EB")
 
 def register_fonts():
-    pdfmetrics.registerFont(TTFont("DM", FONTS_DIR / "DMSans-Regular.ttf"))
+    # Registrar una sola vez por proceso (el modo watch genera muchos PDF)
+    if "DM" in pdfmetrics.getRegisteredFontNames():
+        return
     pdfmetrics.registerFont(TTFont("DM-Medium", FONTS_DIR / "DMSans-Medium.ttf"))
     pdfmetrics.registerFont(TTFont("DM-Bold", FONTS_DIR / "DMSans-Bold.ttf"))
+    pdfmetrics.registerFont(TTFont("DM", FONTS_DIR / "DMSans-Regular.ttf"))
 
 def footer(canvas, doc):
     w, _ = A4
@@ -46,23 +49,27 @@ def footer(canvas, doc):
         f"Fanger · Performance Marketing · {datetime.now().strftime('%d/%m/%Y')}",
     )
 
-def generar_pdf(
-    cliente,
-    resumen,
-    rankings,
-    candidatos_duplicar,
-    acciones_urgentes,
-    anomalias,
-    historico,
-    mediana_cpa,
-    output_dir="informes",
-):
+def generar_pdf(informe, output_dir="informes", destino=None):
+    """
+    Genera el PDF del InformeCliente en informes/<CLIENTE>-informe.pdf, o en
+    destino (buffer o stream con .write, p. ej. una respuesta HTTP) sin tocar
+    el disco. Devuelve la ruta o el destino; None si falla.
+    """
+    cliente = informe.cliente
+    resumen = informe.resumen
+    rankings = informe.rankings
+    acciones_urgentes = informe.acciones_urgentes
+    mediana_cpa = informe.mediana_cpa
+
     try:
         register_fonts()
-       output_dir = BASE_DIR / "informes"
-        output_dir.mkdir(exist_ok=True)
+        if destino is not None:
+            path = destino
+        else:
+            output_dir = BASE_DIR / "informes"
+            output_dir.mkdir(exist_ok=True)
 
-        path = output_dir / f"{cliente}-informe.pdf"
+            path = output_dir / f"{cliente}-informe.pdf"
 
 
         doc = SimpleDocTemplate(
@@ -184,8 +191,8 @@ def generar_pdf(
             story.append(Paragraph("Acciones prioritarias", styles["Section"]))
             for a in acciones_urgentes:
                 story.append(Paragraph(
-                    f"<b>{a['tipo']}</b> — {a['nombre']}<br/>"
-                    f"<font color='#8F8F8F'>{a['razon']}</font>",
+                    f"<b>{a.tipo}</b> — {a.nombre}<br/>"
+                    f"<font color='#8F8F8F'>{a.razon}</font>",
                     styles["Body"],
                 ))
 
@@ -0,0 +1,522 @@
+"""
+Motor Polars V4 (opcional: cli.py run --motor polars o MOTOR['BACKEND']).
+El motor pandas encadena enriquecer_dataframe, generar_resumen,
+generar_rankings y analizar_por_objetivo de forma eager: cada paso copia el
+frame (limpiar_columnas_duplicadas, merges, filtros booleanos para contar).
+
+Este motor arma todo eso como un único plan lazy de Polars:
+
+    1. Proyección: del 30d, 7d e histórico entran al plan solo la clave, el
+       score ponderado, el gasto y lo que usa cada paso (métricas del score
+       0-100, objetivo, días de la ventana, mes)
+    2. CPA, mediana, eficiencia, actividad, tendencia, histórico, score
+       0-100 y clasificación como expresiones del mismo plan
+    3. Resumen, análisis por objetivo y rankings son consultas sobre ese
+       plan; pl.collect_all las ejecuta juntas (subplanes compartidos,
+       multi-hilo)
+
+Se vuelve a pandas una sola vez, al final: las columnas nuevas se pegan al
+30d y los rankings se arman con las filas elegidas por el plan, porque
+recomendaciones, benchmark, Excel e informes siguen leyendo el DataFrame.
+
+Columnas, rankings y conteos dan lo mismo que el motor pandas: el score
+ponderado sale del mismo producto matriz-vector (metrics.score_ponderado),
+las sumas por anuncio van en el orden de las filas y los divisores son
+columnas (ver _constante). Solo los totales del resumen y por objetivo
+pueden diferir en un centavo al redondear, por el orden de suma.
+Las reglas de tendencia, score 0-100 y clasificación están escritas como
+expresiones Polars: tests/test_polars_backend.py compara ambos motores.
+"""
+import numpy as np
+import pandas as pd
+
+try:
+    import polars as pl
+except ImportError:  # motor opcional
+    pl = None
+
+from ad_identity import COLUMNA_CLAVE
+from config import CUANTILES, PESOS_POR_OBJETIVO, SCORE_NORMALIZACION, UMBRALES
+from metrics import METRICAS_INVERTIDAS, limpiar_columnas_duplicadas, score_ponderado
+
+_FILA = "_fila"
+
+# Columnas de los rankings (las mismas que analyzer.generar_rankings)
+COLUMNAS_RANKING = {
+    'impacto': ['ad_name', 'score', 'cpa', 'spend', 'actividad', 'clasificacion'],
+    'volumen': ['ad_name', 'spend', 'cpa', 'score', 'eficiencia'],
+    'eficiencia': ['ad_name', 'cpa', 'score', 'spend', 'eficiencia'],
+    'heroes': ['ad_name', 'score_100', 'score', 'cpa', 'clasificacion', 'tendencia'],
+    'tendencia': ['ad_name', 'ratio_tendencia', 'tendencia', 'score_7d', 'score'],
+}
+
+# Conteos del resumen: {sección: {clave: (columna, valor)}}
+CONTEOS_RESUMEN = {
+    'actividad': {
+        'activos': ('actividad', 'ACTIVO'),
+        'gastando': ('actividad', 'GASTANDO'),
+        'inactivos': ('actividad', 'INACTIVO'),
+        'sin_datos_7d': ('actividad', 'SIN_DATOS_7D'),
+    },
+    'eficiencia': {
+        'muy_eficientes': ('eficiencia', 'MUY_EFICIENTE'),
+        'eficientes': ('eficiencia', 'EFICIENTE'),
+        'normales': ('eficiencia', 'NORMAL'),
+        'caros': ('eficiencia', 'CARO'),
+    },
+    'clasificacion': {
+        'heroes': ('clasificacion', 'HEROE'),
+        'sanos': ('clasificacion', 'SANO'),
+        'alertas': ('clasificacion', 'ALERTA'),
+        'muertos': ('clasificacion', 'MUERTO'),
+    },
+    'tendencia': {
+        'en_ascenso': ('tendencia', 'EN_ASCENSO'),
+        'estables': ('tendencia', 'ESTABLE'),
+        'en_caida': ('tendencia', 'EN_CAIDA'),
+        'criticos': ('tendencia', 'CRITICO'),
+    },
+}
+
+
+def motivo_no_disponible(df, df_7d=None, df_hist=None):
+    """
+    Por qué el motor Polars no puede correr con estos datos.
+
+    Returns:
+        str con el motivo, o None si se puede usar
+    """
+    if pl is None:
+        return "instalar polars"
+    if CUANTILES['EFICIENCIA'] != 'mediana':
+        return f"CUANTILES['EFICIENCIA'] = '{CUANTILES['EFICIENCIA']}' solo en pandas"
+    frames = [f for f in (df, df_7d, df_hist) if f is not None and not f.empty]
+    if not all(COLUMNA_CLAVE in f.columns for f in frames):
+        return f"datos sin {COLUMNA_CLAVE}"
+    return None
+
+
+def _proyeccion(df, pesos, numericas, texto=()):
+    """LazyFrame con la clave, el score y solo las columnas pedidas que df tiene."""
+    df = limpiar_columnas_duplicadas(df)
+    columnas = {
+        COLUMNA_CLAVE: pl.Series(COLUMNA_CLAVE, df[COLUMNA_CLAVE].to_numpy(dtype=np.int64)),
+        "score": pl.Series("score", score_ponderado(df, pesos)),
+    }
+    for columna in dict.fromkeys(numericas):
+        if columna in df.columns:
+            valores = pd.to_numeric(df[columna], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            columnas[columna] = pl.Series(columna, valores, nan_to_null=True)
+    for columna in texto:
+        if columna in df.columns:
+            valores = df[columna].astype(object).where(df[columna].notna(), None).tolist()
+            columnas[columna] = pl.Series(columna, valores, dtype=pl.String)
+    return pl.LazyFrame(columnas)
+
+
+def _constante(valor, n):
+    """
+    Constante como columna de largo n. Polars divide por un escalar
+    multiplicando por su recíproco, que no redondea igual que pandas: los
+    divisores tienen que ser columnas para que los cortes den lo mismo.
+    """
+    return pl.lit(pl.Series(np.full(n, valor, dtype=float)))
+
+
+def _mediana_cpa():
+    """
+    Mediana de los CPA > 0 como la de pandas: promedio de los dos del medio
+    (median() de Polars interpola y puede diferir en el último decimal).
+    """
+    cpa = pl.col("cpa")
+    positivos = cpa.filter(cpa > 0).sort()
+    n = positivos.len()
+    return positivos.slice((n - 1) // 2, 2 - n % 2).mean()
+
+
+def _suma_por_clave(columna):
+    """Suma de un group_by en el orden de las filas, como agregar_por_clave."""
+    return pl.col(columna).fill_null(0.0).cum_sum().last()
+
+
+def _con_7d(lf, lf_7d, columnas_7d):
+    """score_7d, gasto_7d (y dias_7d) por clave, cruzados al 30d."""
+    agregados = [
+        _suma_por_clave("score").alias("score_7d"),
+        _suma_por_clave("spend").alias("gasto_7d"),
+    ]
+    if "dias_ventana" in columnas_7d:
+        agregados.append(_suma_por_clave("dias_ventana").alias("dias_7d"))
+
+    por_clave = lf_7d.group_by(COLUMNA_CLAVE).agg(agregados)
+    nuevas = [a.meta.output_name() for a in agregados]
+    return (
+        lf.join(por_clave, on=COLUMNA_CLAVE, how="left", maintain_order="left")
+        .with_columns(pl.col(nuevas).fill_null(0.0))
+    )
+
+
+def _actividad():
+    return (
+        pl.when(pl.col("score_7d") > 0).then(pl.lit("ACTIVO"))
+        .when(pl.col("gasto_7d") > 0).then(pl.lit("GASTANDO"))
+        .otherwise(pl.lit("INACTIVO"))
+        .alias("actividad")
+    )
+
+
+def _tendencia(columnas_30d, con_dias_7d, n):
+    """tendencia y ratio_tendencia (mismas reglas que metrics.reglas_tendencia)."""
+    dias_30d = (
+        pl.when(pl.col("dias_ventana") == 0).then(30.0).otherwise(pl.col("dias_ventana"))
+        if "dias_ventana" in columnas_30d else _constante(30.0, n)
+    )
+    dias_7d = (
+        pl.when(pl.col("dias_7d") == 0).then(7.0).otherwise(pl.col("dias_7d"))
+        if con_dias_7d else _constante(7.0, n)
+    )
+    score, score_7d = pl.col("score"), pl.col("score_7d")
+    promedio_30d = score / dias_30d
+    promedio_7d = pl.when(score_7d > 0).then(score_7d / dias_7d).otherwise(0.0)
+    ratio = promedio_7d / promedio_30d
+    sin_base = pl.when(score_7d > 0).then(pl.lit("NUEVO")).otherwise(pl.lit("SIN_DATOS"))
+    nuevo_7d = pl.when(promedio_7d > 0).then(pl.lit("NUEVO")).otherwise(pl.lit("SIN_DATOS"))
+
+    tendencia = (
+        pl.when(score == 0).then(sin_base)
+        .when(promedio_30d == 0).then(nuevo_7d)
+        .when(ratio >= UMBRALES['TENDENCIA_SUBIDA']).then(pl.lit("EN_ASCENSO"))
+        .when(ratio <= UMBRALES['TENDENCIA_CRITICA']).then(pl.lit("CRITICO"))
+        .when(ratio <= UMBRALES['TENDENCIA_CAIDA']).then(pl.lit("EN_CAIDA"))
+        .otherwise(pl.lit("ESTABLE"))
+    )
+    ratio_tendencia = pl.when(score > 0).then((score_7d / dias_7d) / (score / dias_30d)).otherwise(1.0)
+    return [tendencia.alias("tendencia"), ratio_tendencia.alias("ratio_tendencia")]
+
+
+def _con_historico(lf, lf_hist):
+    """meses_historico y promedios mensuales por clave."""
+    por_clave = (
+        lf_hist.group_by(COLUMNA_CLAVE)
+        .agg(
+            pl.col("periodo").n_unique().cast(pl.Int64).alias("meses_historico"),
+            _suma_por_clave("score").alias("_score_hist"),
+            _suma_por_clave("spend").alias("_gasto_hist"),
+        )
+    )
+    divisor = pl.max_horizontal(pl.col("meses_historico"), 1)
+    return (
+        lf.join(por_clave, on=COLUMNA_CLAVE, how="left", maintain_order="left")
+        .with_columns(
+            pl.col("meses_historico").fill_null(0),
+            (pl.col("_score_hist").fill_null(0.0) / divisor).alias("score_hist_promedio"),
+            (pl.col("_gasto_hist").fill_null(0.0) / divisor).alias("gasto_hist_promedio"),
+        )
+        .drop("_score_hist", "_gasto_hist")
+    )
+
+
+def _metricas_score_100(por_objetivo):
+    perfiles = PESOS_POR_OBJETIVO.values() if por_objetivo else [PESOS_POR_OBJETIVO['general']]
+    return sorted({m for pesos in perfiles for m in pesos})
+
+
+def _score_100(columnas_30d, metodo):
+    """
+    Score 0-100 por objetivo (metrics._score_agrupado). Las métricas de
+    objetivos que no están en los datos pesan 0 en todas las filas.
+    """
+    por_objetivo = SCORE_NORMALIZACION['POR_OBJETIVO'] and "objetivo_detectado" in columnas_30d
+    grupo = pl.col("objetivo_detectado").fill_null("general") if por_objetivo else pl.lit(0)
+    general = PESOS_POR_OBJETIVO['general']
+
+    total = pl.lit(0.0)
+    for metrica in _metricas_score_100(por_objetivo):
+        if metrica not in columnas_30d:
+            continue
+        valores = pl.col(metrica).fill_null(0.0)
+        invertida = metrica in METRICAS_INVERTIDAS
+
+        if metodo == 'percentil':
+            positivos = pl.when(valores > 0).then(valores)
+            componente = (
+                positivos.rank("average", descending=invertida).over(grupo)
+                / positivos.count().over(grupo)
+            ).fill_null(0.0)
+        elif invertida:
+            maximo = pl.when(valores > 0).then(valores).max().over(grupo).fill_null(1.0)
+            componente = 1 - (valores / maximo).clip(0, 1)
+        else:
+            maximo = valores.max().over(grupo)
+            componente = (valores / pl.when(maximo > 0).then(maximo).otherwise(1.0)).clip(0, 1)
+
+        if por_objetivo:
+            peso = grupo.replace_strict(
+                {objetivo: float(pesos.get(metrica, 0.0)) for objetivo, pesos in PESOS_POR_OBJETIVO.items()},
+                default=float(general.get(metrica, 0.0)),
+                return_dtype=pl.Float64,
+            )
+        else:
+            peso = pl.lit(float(general.get(metrica, 0.0)))
+        total = total + componente * peso
+
+    score = total * 100
+    maximo = score.max().over(grupo)
+    return (
+        pl.when(maximo > 0).then(score / maximo * 100).otherwise(score)
+        .clip(0, 100)
+        .alias("score_100")
+    )
+
+
+def _clasificacion():
+    """Reglas de metrics.reglas_clasificacion como una expresión."""
+    score_100 = pl.col("score_100")
+    eficiencia, actividad, tendencia = pl.col("eficiencia"), pl.col("actividad"), pl.col("tendencia")
+    return (
+        pl.when(
+            (score_100 >= UMBRALES['SCORE_HEROE'])
+            & eficiencia.is_in(['MUY_EFICIENTE', 'EFICIENTE'])
+            & (actividad == 'ACTIVO')
+        ).then(pl.lit('HEROE'))
+        .when(
+            (score_100 >= UMBRALES['SCORE_SANO'])
+            & (eficiencia != 'CARO')
+            & (tendencia != 'CRITICO')
+        ).then(pl.lit('SANO'))
+        .when(
+            (actividad == 'INACTIVO')
+            | (tendencia == 'CRITICO')
+            | ((pl.col("score") == 0) & (pl.col("spend") > UMBRALES['PAUSAR_GASTO_MIN']))
+        ).then(pl.lit('MUERTO'))
+        .otherwise(pl.lit('ALERTA'))
+        .alias("clasificacion")
+    )
+
+
+def plan_enriquecido(df, df_7d=None, pesos=None, df_hist=None, metodo=None):
+    """
+    Plan lazy equivalente a metrics.enriquecer_dataframe.
+
+    Returns:
+        tuple (LazyFrame con _fila y las columnas calculadas, list de
+        columnas nuevas en el orden del motor pandas)
+    """
+    metodo = metodo or SCORE_NORMALIZACION['METODO']
+    con_7d = df_7d is not None and not df_7d.empty
+    con_hist = df_hist is not None and not df_hist.empty
+
+    # 1. Proyecciones
+    metricas_100 = _metricas_score_100(SCORE_NORMALIZACION['POR_OBJETIVO'])
+    lf = _proyeccion(df, pesos, ['spend', *metricas_100, 'dias_ventana'], ['objetivo_detectado'])
+    columnas_30d = set(lf.collect_schema().names())
+    lf = lf.with_row_index(_FILA)
+
+    # 2. CPA, mediana y eficiencia (la mediana se cruza como columna, ver _constante)
+    cpa = pl.col("cpa")
+    lf = lf.with_columns(pl.when(pl.col("score") > 0).then(pl.col("spend") / pl.col("score")).alias("cpa"))
+    mediana = pl.col("_mediana_cpa")
+    ratio = cpa / mediana
+    lf = (
+        lf.join(
+            lf.select(_mediana_cpa().fill_null(0.0).alias("_mediana_cpa")),
+            how="cross", maintain_order="left",
+        )
+        .with_columns(
+            pl.when(cpa.is_null() | (cpa == 0)).then(pl.lit("SIN_DATOS"))
+            .when(mediana == 0).then(pl.lit("NORMAL"))
+            .when(ratio <= UMBRALES['EFICIENCIA_MUY_BUENA']).then(pl.lit("MUY_EFICIENTE"))
+            .when(ratio <= UMBRALES['EFICIENCIA_BUENA']).then(pl.lit("EFICIENTE"))
+            .when(ratio <= UMBRALES['EFICIENCIA_NORMAL']).then(pl.lit("NORMAL"))
+            .otherwise(pl.lit("CARO"))
+            .alias("eficiencia")
+        )
+        .drop("_mediana_cpa")
+    )
+    nuevas = ["score", "cpa", "eficiencia"]
+
+    # 3. Actividad y tendencia
+    if con_7d:
+        lf_7d = _proyeccion(df_7d, pesos, ['spend', 'dias_ventana'])
+        columnas_7d = set(lf_7d.collect_schema().names())
+        lf = _con_7d(lf, lf_7d, columnas_7d)
+        con_dias = "dias_ventana" in columnas_7d
+        lf = lf.with_columns(_actividad()).with_columns(_tendencia(columnas_30d, con_dias, len(df)))
+        nuevas += ["score_7d", "gasto_7d", "actividad", *(["dias_7d"] if con_dias else []),
+                   "tendencia", "ratio_tendencia"]
+    else:
+        lf = lf.with_columns(
+            pl.lit("SIN_DATOS_7D").alias("actividad"),
+            pl.lit(0, dtype=pl.Int64).alias("score_7d"),
+            pl.lit(0, dtype=pl.Int64).alias("gasto_7d"),
+            pl.lit("SIN_DATOS").alias("tendencia"),
+            pl.lit(1.0).alias("ratio_tendencia"),
+        )
+        nuevas += ["actividad", "score_7d", "gasto_7d", "tendencia", "ratio_tendencia"]
+
+    # 4. Histórico
+    historico = ["meses_historico", "score_hist_promedio", "gasto_hist_promedio"]
+    if con_hist:
+        lf = _con_historico(lf, _proyeccion(df_hist, pesos, ['spend'], ['periodo']))
+    else:
+        lf = lf.with_columns(
+            pl.lit(0, dtype=pl.Int64).alias("meses_historico"),
+            pl.lit(0.0).alias("score_hist_promedio"),
+            pl.lit(0.0).alias("gasto_hist_promedio"),
+        )
+    nuevas += historico
+
+    # 5. Score 0-100 y clasificación
+    lf = lf.with_columns(_score_100(columnas_30d, metodo)).with_columns(_clasificacion())
+    nuevas += ["score_100", "clasificacion"]
+
+    return lf, nuevas
+
+
+def _plan_resumen(lf):
+    cpa = pl.col("cpa")
+    conteos = [
+        (pl.col(columna) == valor).sum().alias(f"{seccion}.{clave}")
+        for seccion, claves in CONTEOS_RESUMEN.items()
+        for clave, (columna, valor) in claves.items()
+    ]
+    return lf.select(
+        pl.col("spend").sum().alias("gasto_total"),
+        pl.col("score").sum().alias("score_total"),
+        _mediana_cpa().alias("mediana_cpa"),
+        pl.col("score_100").mean().alias("score_100_promedio"),
+        pl.len().alias("total_anuncios"),
+        cpa.is_not_null().sum().alias("con_conversiones"),
+        *conteos,
+    )
+
+
+def _plan_objetivos(lf):
+    return (
+        lf.group_by("objetivo_detectado", maintain_order=True)
+        .agg(
+            pl.len().alias("total_anuncios"),
+            pl.col("spend").sum().alias("gasto_total"),
+            pl.col("score").sum().alias("score_total"),
+            pl.col("cpa").mean().alias("cpa_promedio"),
+            pl.col("score_100").mean().alias("score_100_promedio"),
+            (pl.col("clasificacion") == "HEROE").sum().alias("heroes"),
+            (pl.col("clasificacion") == "MUERTO").sum().alias("muertos"),
+            pl.col(_FILA).sort_by("score", descending=True, maintain_order=True).head(3).alias("mejores"),
+        )
+    )
+
+
+def _plan_top(lf, columna, n=5, filtro=None, ascendente=False):
+    """Filas de df.nlargest / df.nsmallest (empates en el orden original)."""
+    condicion = pl.col(columna).is_not_null()
+    if filtro is not None:
+        condicion = condicion & filtro
+    return (
+        lf.filter(condicion)
+        .sort(columna, descending=not ascendente, maintain_order=True)
+        .head(n)
+        .select(_FILA)
+    )
+
+
+def _planes_rankings(lf):
+    cpa = pl.col("cpa")
+    return {
+        'impacto': _plan_top(lf, 'score'),
+        'volumen': _plan_top(lf, 'spend'),
+        'eficiencia': _plan_top(
+            lf, 'cpa', filtro=(cpa > 0) & (pl.col("score") >= UMBRALES['MIN_CONV_EFICIENCIA']),
+            ascendente=True,
+        ),
+        'heroes': _plan_top(lf, 'score_100'),
+        'tendencia': _plan_top(lf, 'ratio_tendencia', filtro=pl.col("ratio_tendencia") > 0),
+    }
+
+
+def _a_pandas(df, enriquecido, nuevas):
+    """Pega las columnas calculadas al 30d (la única vuelta a pandas)."""
+    df = limpiar_columnas_duplicadas(df)
+    for columna in nuevas:
+        valores = enriquecido.get_column(columna).to_numpy()
+        if columna == "cpa" and not enriquecido.get_column(columna).is_not_null().any():
+            valores = np.full(len(df), None, dtype=object)  # como df.apply sin ningún CPA
+        df[columna] = valores
+    return df
+
+
+def _redondear(valor, decimales):
+    return round(np.float64(valor), decimales)
+
+
+def _resumen(fila):
+    """Dict de analyzer.generar_resumen a partir de la fila agregada."""
+    gasto_total, score_total = np.float64(fila["gasto_total"]), np.float64(fila["score_total"])
+    mediana_cpa = 0 if fila["mediana_cpa"] is None else np.float64(fila["mediana_cpa"])
+    resumen = {
+        'gasto_total': _redondear(gasto_total, 2),
+        'score_total': _redondear(score_total, 2),
+        'cpa_global': round(gasto_total / score_total if score_total > 0 else 0, 2),
+        'mediana_cpa': round(mediana_cpa, 2),
+        'score_100_promedio': _redondear(fila["score_100_promedio"], 1),
+        'total_anuncios': int(fila["total_anuncios"]),
+        'con_conversiones': int(fila["con_conversiones"]),
+    }
+    for seccion, claves in CONTEOS_RESUMEN.items():
+        resumen[seccion] = {clave: int(fila[f"{seccion}.{clave}"]) for clave in claves}
+    return resumen, mediana_cpa
+
+
+def _analisis_objetivo(df, objetivos):
+    """Dict de analyzer.analizar_por_objetivo a partir del agregado por objetivo."""
+    return {
+        fila["objetivo_detectado"]: {
+            'total_anuncios': int(fila["total_anuncios"]),
+            'gasto_total': _redondear(fila["gasto_total"], 2),
+            'score_total': _redondear(fila["score_total"], 2),
+            'cpa_promedio': 0 if fila["cpa_promedio"] is None else _redondear(fila["cpa_promedio"], 2),
+            'score_100_promedio': _redondear(fila["score_100_promedio"], 1),
+            'heroes': int(fila["heroes"]),
+            'muertos': int(fila["muertos"]),
+            'mejores': df.iloc[fila["mejores"]][['ad_name', 'score', 'cpa']].to_dict('records'),
+        }
+        for fila in objetivos.iter_rows(named=True)
+    }
+
+
+def enriquecer_y_analizar(df, df_7d=None, pesos=None, df_hist=None, analisis=()):
+    """
+    enriquecer_dataframe y, en el mismo plan, las secciones pedidas de
+    analyzer ('resumen', 'rankings', 'analisis_objetivo').
+
+    Returns:
+        tuple (DataFrame enriquecido, mediana_cpa, dict {sección: resultado})
+    """
+    lf, nuevas = plan_enriquecido(df, df_7d, pesos, df_hist)
+    lf = lf.cache()
+
+    consultas = {"enriquecido": lf, "resumen": _plan_resumen(lf)}
+    por_objetivo = "analisis_objetivo" in analisis and "objetivo_detectado" in df.columns
+    if por_objetivo:
+        consultas["analisis_objetivo"] = _plan_objetivos(lf)
+    if "rankings" in analisis:
+        consultas.update({f"ranking.{nombre}": plan for nombre, plan in _planes_rankings(lf).items()})
+
+    resultados = dict(zip(consultas, pl.collect_all(list(consultas.values()))))
+
+    df = _a_pandas(df, resultados["enriquecido"], nuevas)
+    resumen, mediana_cpa = _resumen(resultados["resumen"].row(0, named=True))
+
+    precalculado = {}
+    if "resumen" in analisis:
+        precalculado["resumen"] = resumen
+    if "analisis_objetivo" in analisis:
+        precalculado["analisis_objetivo"] = (
+            _analisis_objetivo(df, resultados["analisis_objetivo"]) if por_objetivo else {}
+        )
+    if "rankings" in analisis:
+        precalculado["rankings"] = {
+            nombre: df.iloc[resultados[f"ranking.{nombre}"][_FILA].to_numpy()][columnas].to_dict('records')
+            for nombre, columnas in COLUMNAS_RANKING.items()
+        }
+    return df, mediana_cpa, precalculado
@@ -3,6 +3,7 @@ Módulo de recomendaciones V4.
 Genera recomendaciones inteligentes basadas en el análisis completo.
 """
 import pandas as pd
+from ad_identity import COLUMNA_CLAVE, asegurar_claves
 from config import UMBRALES
 
 
@@ -18,8 +19,10 @@ def identificar_duplicar(df, mediana_cpa):
         5. Tendencia no crítica
     
     Returns:
-        list de candidatos con razones detalladas
+        list de candidatos con razones detalladas (con '_ad_key' para
+        cruzarlos con df)
     """
+    asegurar_claves(df)
     candidatos = []
     
     for _, row in df.iterrows():
@@ -69,6 +72,7 @@ def identificar_duplicar(df, mediana_cpa):
             
             candidatos.append({
                 'nombre': row['ad_name'],
+                COLUMNA_CLAVE: int(row[COLUMNA_CLAVE]),
                 'score': round(row['score'], 1),
                 'score_100': round(row.get('score_100', 0), 1),
                 'cpa': round(row['cpa'], 0),
@@ -173,8 +177,9 @@ def analizar_no_candidatos(df, mediana_cpa):
     Returns:
         list con análisis de no-candidatos
     """
-    candidatos_nombres = [c['nombre'] for c in identificar_duplicar(df, mediana_cpa)]
-    no_candidatos = df[~df['ad_name'].isin(candidatos_nombres)]
+    # Por clave y no por nombre: anuncios distintos pueden compartir ad_name
+    claves_candidatos = [c[COLUMNA_CLAVE] for c in identificar_duplicar(df, mediana_cpa)]
+    no_candidatos = df[~df[COLUMNA_CLAVE].isin(claves_candidatos)]
     
     # Tomar los 5 mejores por score que no calificaron
     top_no_candidatos = no_candidatos.nlargest(5, 'score')
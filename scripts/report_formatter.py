@@ -1,9 +1,8 @@
 """
 Módulo de formateo del informe TXT V4.
-Genera el informe legible para humanos con análisis completo.
+Genera el informe legible para humanos a partir del InformeCliente
+(report_model), sin recalcular nada.
 """
-from datetime import datetime
-import pandas as pd
 
 
 def generar_glosario():
@@ -86,24 +85,24 @@ def formatear_acciones_urgentes(acciones):
         lines.append("✅ Sin acciones urgentes.")
         lines.append("   Todos los anuncios dentro de parámetros aceptables.")
     else:
-        pausar = [a for a in acciones if a['tipo'] == 'PAUSAR']
-        revisar = [a for a in acciones if a['tipo'] == 'REVISAR']
+        pausar = [a for a in acciones if a.tipo == 'PAUSAR']
+        revisar = [a for a in acciones if a.tipo == 'REVISAR']
         
         if pausar:
             lines.append(f"🛑 PAUSAR INMEDIATAMENTE ({len(pausar)} anuncios):")
             lines.append("-" * 40)
             for a in pausar:
-                lines.append(f"   • {a['nombre'][:45]}")
-                lines.append(f"     Razón: {a['razon']}")
-                lines.append(f"     Acción: {a['accion']}")
+                lines.append(f"   • {a.nombre[:45]}")
+                lines.append(f"     Razón: {a.razon}")
+                lines.append(f"     Acción: {a.accion}")
                 lines.append("")
         
         if revisar:
             lines.append(f"⚠️ REVISAR ({len(revisar)} anuncios):")
             lines.append("-" * 40)
             for a in revisar[:5]:
-                lines.append(f"   • {a['nombre'][:45]}")
-                lines.append(f"     Razón: {a['razon']}")
+                lines.append(f"   • {a.nombre[:45]}")
+                lines.append(f"     Razón: {a.razon}")
                 lines.append("")
     
     lines.extend(["", ""])
@@ -173,14 +172,14 @@ def formatear_duplicar(candidatos, no_candidatos, mediana_cpa):
         
         for i, c in enumerate(candidatos, 1):
             lines.append("=" * 50)
-            lines.append(f"🚀 #{i}: {c['nombre'][:50]}")
+            lines.append(f"🚀 #{i}: {c.nombre[:50]}")
             lines.append("=" * 50)
-            lines.append(f"   Score: {c['score']:.1f} | Score 0-100: {c.get('score_100', 0):.1f}")
-            lines.append(f"   CPA: ${c['cpa']:.0f} (mediana: ${mediana_cpa:.0f})")
-            lines.append(f"   Tendencia: {c.get('tendencia', 'N/A')} | Clasificación: {c.get('clasificacion', 'N/A')}")
+            lines.append(f"   Score: {c.score:.1f} | Score 0-100: {c.score_100:.1f}")
+            lines.append(f"   CPA: ${c.cpa:.0f} (mediana: ${mediana_cpa:.0f})")
+            lines.append(f"   Tendencia: {c.tendencia} | Clasificación: {c.clasificacion}")
             lines.append("")
             lines.append("   POR QUÉ ESCALAR:")
-            for razon in c['razones']:
+            for razon in c.razones:
                 lines.append(f"   ✓ {razon}")
             lines.append("")
     else:
@@ -191,10 +190,10 @@ def formatear_duplicar(candidatos, no_candidatos, mediana_cpa):
             lines.append("Los mejores candidatos y por qué no califican:")
             lines.append("-" * 40)
             for nc in no_candidatos[:3]:
-                cpa_str = f"${nc['cpa']:.0f}" if nc['cpa'] else "Sin conversiones"
-                lines.append(f"  {nc['nombre'][:40]}")
-                lines.append(f"     Score: {nc['score']:.1f} | CPA: {cpa_str}")
-                lines.append(f"     Problemas: {', '.join(nc['problemas'][:2])}")
+                cpa_str = f"${nc.cpa:.0f}" if nc.cpa else "Sin conversiones"
+                lines.append(f"  {nc.nombre[:40]}")
+                lines.append(f"     Score: {nc.score:.1f} | CPA: {cpa_str}")
+                lines.append(f"     Problemas: {', '.join(nc.problemas[:2])}")
                 lines.append("")
     
     return lines
@@ -212,11 +211,11 @@ def formatear_anomalias(anomalias):
         lines.append("✅ No se detectaron anomalías significativas.")
     else:
         for a in anomalias[:10]:
-            icono = "🚨" if a['severidad'] == 'ALTA' else "⚠️"
-            lines.append(f"{icono} [{a['severidad']}] {a['tipo']}")
-            lines.append(f"   Anuncio: {a['anuncio'][:40]}")
-            lines.append(f"   Detalle: {a['mensaje']}")
-            lines.append(f"   Acción: {a['accion']}")
+            icono = "🚨" if a.severidad == 'ALTA' else "⚠️"
+            lines.append(f"{icono} [{a.severidad}] {a.tipo}")
+            lines.append(f"   Anuncio: {a.anuncio[:40]}")
+            lines.append(f"   Detalle: {a.mensaje}")
+            lines.append(f"   Acción: {a.accion}")
             lines.append("")
     
     lines.append("")
@@ -224,7 +223,7 @@ def formatear_anomalias(anomalias):
 
 
 def formatear_historico(historico):
-    """Genera la sección de histórico con análisis."""
+    """Genera la sección de histórico (ya ordenado por mes en el modelo)."""
     lines = [
         "## F: CONTEXTO HISTÓRICO",
         "=" * 60,
@@ -236,38 +235,25 @@ def formatear_historico(historico):
         lines.append("Para ver historial, agrega archivos: Cliente-sep.xlsx, Cliente-oct.xlsx, etc.")
         return lines
     
-    # Ordenar por período
-    meses_orden = ['ene', 'feb', 'mar', 'abr', 'may', 'jun', 
-                   'jul', 'ago', 'sep', 'oct', 'nov', 'dic']
-    
-    def orden_mes(h):
-        periodo = h['periodo'].lower()[:3]
-        try:
-            return meses_orden.index(periodo)
-        except ValueError:
-            return 99
-    
-    historico_ordenado = sorted(historico, key=orden_mes)
-    
     lines.append("SCORE POR MES:")
     lines.append("-" * 40)
     
-    scores = [h['score'] for h in historico_ordenado]
+    scores = [h.score for h in historico]
     max_score = max(scores) if scores else 1
     avg_score = sum(scores) / len(scores) if scores else 0
     
-    for h in historico_ordenado:
-        barra_len = int((h['score'] / max_score) * 20) if max_score > 0 else 0
+    for h in historico:
+        barra_len = int((h.score / max_score) * 20) if max_score > 0 else 0
         barra = "█" * barra_len + "░" * (20 - barra_len)
         
-        if h['score'] > avg_score * 1.1:
+        if h.score > avg_score * 1.1:
             indicador = "↑"
-        elif h['score'] < avg_score * 0.9:
+        elif h.score < avg_score * 0.9:
             indicador = "↓"
         else:
             indicador = "→"
         
-        lines.append(f"   {h['periodo'].upper():>5}: {barra} {h['score']:>6.1f} {indicador}")
+        lines.append(f"   {h.periodo.upper():>5}: {barra} {h.score:>6.1f} {indicador}")
     
     lines.append("")
     lines.append(f"   Promedio: {avg_score:.1f} | Mejor: {max(scores):.1f} | Peor: {min(scores):.1f}")
@@ -330,46 +316,104 @@ def formatear_comparativa_managers(comparativa):
     return lines
 
 
-def generar_informe_txt(cliente, resumen, rankings, candidatos_duplicar, 
-                        no_candidatos, acciones_urgentes, anomalias,
-                        historico, df, mediana_cpa):
+def formatear_calidad(calidad):
+    """Genera la sección de calidad de datos (solo si hubo problemas)."""
+    if not calidad:
+        return []
+
+    lines = [
+        "## I: CALIDAD DE DATOS",
+        "=" * 60,
+        ""
+    ]
+
+    if calidad["filas_cuarentena"]:
+        lines.append(f"🚧 {calidad['filas_cuarentena']} fila(s) en cuarentena (no se analizaron):")
+        for motivo, n in calidad["motivos"].items():
+            lines.append(f"   - {motivo}: {n}")
+        lines.append("")
+
+    for archivo, avisos in calidad["avisos"].items():
+        lines.append(f"⚠️ {archivo}")
+        for aviso in avisos:
+            lines.append(f"   - {aviso}")
+    
+    lines.extend(["", ""])
+    return lines
+
+
+def formatear_jerarquia(jerarquia):
+    """Genera la sección de rollups por campaña y conjunto de anuncios."""
+    if not jerarquia:
+        return []
+
+    titulos = {"campanas": "CAMPAÑAS", "conjuntos": "CONJUNTOS DE ANUNCIOS"}
+    lines = [
+        "## H: CAMPAÑAS Y CONJUNTOS DE ANUNCIOS",
+        "=" * 60,
+        ""
+    ]
+
+    for nivel in jerarquia["niveles"][:-1]:
+        registros = jerarquia.get(nivel, [])
+        lines.append(f"📂 {titulos[nivel]} ({len(registros)}) - por gasto")
+        lines.append("-" * 40)
+        for r in registros[:10]:
+            cpa_str = f"${r['cpa']:.0f}" if r.get('cpa') else "N/A"
+            clas = r['clasificacion']
+            lines.append(f"  {r['nombre'][:45]}")
+            lines.append(
+                f"     Gasto: ${r['gasto']:,.0f} | Score: {r['score']:.1f} | CPA: {cpa_str} | "
+                f"{r['anuncios']} anuncios ({clas['heroes']} héroes, {clas['muertos']} muertos)"
+            )
+        lines.append("")
+
+        eficiencia = jerarquia["rankings"][nivel]["eficiencia"]
+        if eficiencia:
+            lines.append(f"⚡ {titulos[nivel]} MÁS EFICIENTES (menor CPA)")
+            lines.append("-" * 40)
+            for r in eficiencia:
+                lines.append(f"  {r['nombre'][:45]} - CPA: ${r['cpa']:.0f} | Score: {r['score']:.1f}")
+            lines.append("")
+
+    lines.extend(["", ""])
+    return lines
+
+
+def generar_informe_txt(informe):
     """
     Genera el informe completo en formato TXT.
     
+    Args:
+        informe: InformeCliente (report_model.construir_informe)
+    
     Returns:
         str con el contenido del informe
     """
-    fecha = datetime.now().strftime("%Y-%m-%d %H:%M")
-    
-    # === Nuevo: Importar y calcular la comparativa de managers ===
-    try:
-        # Se asume que analyzer.py está en el mismo path.
-        from analyzer import analizar_rendimiento_managers
-        comparativa_managers = analizar_rendimiento_managers(df)
-    except ImportError:
-        comparativa_managers = None
-    # =============================================================
+    fecha = informe.generado.strftime("%Y-%m-%d %H:%M")
+    mediana_cpa = informe.mediana_cpa
     
     lines = [
         "╔" + "═" * 58 + "╗",
-        "║" + f" INFORME META ADS V4: {cliente.upper()} ".center(58) + "║",
+        "║" + f" INFORME META ADS V4: {informe.cliente.upper()} ".center(58) + "║",
         "║" + f" Fecha: {fecha} ".center(58) + "║",
         "╚" + "═" * 58 + "╝",
         ""
     ]
     
     lines.extend(generar_glosario())
-    lines.extend(formatear_resumen(resumen, mediana_cpa))
-    lines.extend(formatear_acciones_urgentes(acciones_urgentes))
-    lines.extend(formatear_rankings(rankings, mediana_cpa))
-    lines.extend(formatear_duplicar(candidatos_duplicar, no_candidatos, mediana_cpa))
-    lines.extend(formatear_anomalias(anomalias))
-    lines.extend(formatear_historico(historico))
-    
-    # === Nuevo: Agregar la sección de comparativa ===
-    if comparativa_managers:
-        lines.extend(formatear_comparativa_managers(comparativa_managers))
-    # ================================================
+    lines.extend(formatear_resumen(informe.resumen, mediana_cpa))
+    lines.extend(formatear_acciones_urgentes(informe.acciones_urgentes))
+    lines.extend(formatear_rankings(informe.rankings, mediana_cpa))
+    lines.extend(formatear_duplicar(informe.duplicar, informe.no_candidatos, mediana_cpa))
+    lines.extend(formatear_anomalias(informe.anomalias))
+    lines.extend(formatear_historico(informe.historico))
+    
+    if informe.comparativa_managers:
+        lines.extend(formatear_comparativa_managers(informe.comparativa_managers))
+
+    lines.extend(formatear_jerarquia(informe.jerarquia))
+    lines.extend(formatear_calidad(informe.calidad))
     
     lines.extend([
         "",
@@ -379,4 +423,4 @@ def generar_informe_txt(cliente, resumen, rankings, candidatos_duplicar,
         "=" * 60
     ])
     
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
@@ -0,0 +1,169 @@
+"""
+Modelo intermedio del informe V4.
+Se arma una sola vez por cliente con todo lo que necesitan las salidas, y
+los tres renderizadores (TXT, JSON y PDF) solo lo formatean: agregar una
+salida nueva no requiere volver a analizar nada.
+
+Las listas del informe usan dataclasses con __slots__ (livianas y con
+campos fijos); resumen, rankings y análisis por objetivo quedan como dict
+porque ya se publican tal cual en el JSON.
+"""
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+
+MESES_ORDEN = ['ene', 'feb', 'mar', 'abr', 'may', 'jun',
+               'jul', 'ago', 'sep', 'oct', 'nov', 'dic']
+
+
+@dataclass(slots=True)
+class Candidato:
+    """Anuncio candidato a duplicar/escalar (identificar_duplicar)."""
+    nombre: str
+    score: float
+    score_100: float
+    cpa: float
+    gasto: float
+    actividad: str
+    tendencia: str
+    clasificacion: str
+    score_7d: float
+    razones: list = field(default_factory=list)
+    prioridad: int = 0
+    acciones: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class NoCandidato:
+    """Buen anuncio que no califica para duplicar (analizar_no_candidatos)."""
+    nombre: str
+    score: float
+    cpa: float | None
+    actividad: str
+    tendencia: str
+    problemas: list = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Accion:
+    """Acción urgente PAUSAR/REVISAR (identificar_pausar)."""
+    tipo: str
+    prioridad: str
+    nombre: str
+    razon: str
+    detalle: str
+    accion: str
+
+
+@dataclass(slots=True)
+class Anomalia:
+    """Anomalía detectada en un anuncio (detectar_anomalias)."""
+    tipo: str
+    severidad: str
+    anuncio: str
+    valor: float
+    mensaje: str
+    accion: str
+
+
+@dataclass(slots=True)
+class PeriodoHistorico:
+    """Totales de un mes histórico (generar_historico)."""
+    periodo: str
+    score: float
+    gasto: float
+    cpa: float
+    anuncios: int
+
+
+@dataclass(slots=True)
+class InformeCliente:
+    """Informe completo de un cliente, listo para cualquier renderizador."""
+    cliente: str
+    generado: datetime
+    mediana_cpa: float
+    total_anuncios: int
+    resumen: dict
+    rankings: dict
+    duplicar: list
+    no_candidatos: list
+    acciones_urgentes: list
+    anomalias: list
+    historico: list
+    analisis_objetivo: dict
+    comparativa_managers: dict | None
+    reasignacion: dict | None
+    anuncios: list
+    benchmark: dict | None = None
+    jerarquia: dict | None = None
+    desglose: dict | None = None
+    calidad: dict | None = None
+
+
+def _desde_dict(cls, datos):
+    """Crea la dataclass ignorando claves que el modelo no conoce."""
+    nombres = {f.name for f in fields(cls)}
+    return cls(**{k: v for k, v in datos.items() if k in nombres})
+
+
+def orden_mes(periodo):
+    """Posición del mes ('sep', 'Septiembre'...) para ordenar; 99 si no es un mes."""
+    try:
+        return MESES_ORDEN.index(str(periodo).lower()[:3])
+    except ValueError:
+        return 99
+
+
+def a_dicts(items):
+    """Lista de dataclasses del modelo a lista de dicts (para serializar)."""
+    return [asdict(item) for item in items]
+
+
+def construir_informe(cliente, resumen, rankings, candidatos_duplicar, no_candidatos,
+                      acciones_urgentes, anomalias, historico, analisis_objetivo,
+                      df, mediana_cpa, reasignacion=None, benchmark=None, jerarquia=None,
+                      desglose=None, calidad=None, incluir_anuncios=True):
+    """
+    Arma el InformeCliente a partir de los resultados del análisis.
+
+    Calcula acá (una sola vez) lo que antes recalculaba cada salida: la
+    comparativa de managers, el orden cronológico del histórico y los
+    registros por anuncio.
+
+    Args:
+        benchmark: Posición de la cuenta en el portafolio (benchmark.resumen_benchmark)
+        jerarquia: Rollups por campaña y conjunto (rollups.calcular_rollups)
+        desglose: Cubo por ubicación/edad/sexo/región (breakdowns.construir_cubo)
+        calidad: Filas en cuarentena y avisos de columnas (validacion.resumen_calidad)
+        incluir_anuncios: False para no convertir df a registros (solo lo usa el JSON)
+
+    Returns:
+        InformeCliente
+    """
+    from analyzer import analizar_rendimiento_managers
+
+    historico = sorted(
+        (_desde_dict(PeriodoHistorico, h) for h in historico or []),
+        key=lambda h: orden_mes(h.periodo),
+    )
+
+    return InformeCliente(
+        cliente=cliente,
+        generado=datetime.now(),
+        mediana_cpa=mediana_cpa,
+        total_anuncios=len(df),
+        resumen=resumen or {},
+        rankings=rankings or {},
+        duplicar=[_desde_dict(Candidato, c) for c in candidatos_duplicar or []],
+        no_candidatos=[_desde_dict(NoCandidato, n) for n in no_candidatos or []],
+        acciones_urgentes=[_desde_dict(Accion, a) for a in acciones_urgentes or []],
+        anomalias=[_desde_dict(Anomalia, a) for a in anomalias or []],
+        historico=historico,
+        analisis_objetivo=analisis_objetivo or {},
+        comparativa_managers=analizar_rendimiento_managers(df),
+        reasignacion=reasignacion,
+        anuncios=df.to_dict('records') if incluir_anuncios else [],
+        benchmark=benchmark,
+        jerarquia=jerarquia,
+        desglose=desglose,
+        calidad=calidad,
+    )
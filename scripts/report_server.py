@@ -0,0 +1,356 @@
+"""
+API local de informes V4.
+Servidor HTTP (solo librería estándar) para que el dashboard consulte los
+informes sin subir el JSON a mano.
+
+Endpoints (GET):
+    /api/clientes                           Clientes detectados en crudo/
+    /api/clientes/<CLIENTE>                 Informe completo
+    /api/clientes/<CLIENTE>/resumen         meta, mediana_cpa y resumen
+    /api/clientes/<CLIENTE>/rankings        Rankings
+    /api/clientes/<CLIENTE>/anuncios        Anuncios paginados (?pagina=1&por_pagina=50)
+    /api/clientes/<CLIENTE>/desglose        Cubo por ubicación/edad/sexo/región
+                                            (?dimension=placement para una sola)
+
+Cada respuesta lleva un ETag derivado de la firma de los archivos de
+entrada del cliente (mtime y tamaño, o CRC dentro de un zip) y de la huella
+del código y la configuración con que corre el servidor (scripts/*.py,
+config.py incluido, y scripts/schema): el dashboard puede repetir la
+consulta con If-None-Match y recibir 304 sin volver a transferir nada, y
+un cambio de umbrales, pesos o versión invalida los informes anteriores.
+
+Los informes se guardan en un cache LRU en memoria. El pipeline solo se
+ejecuta cuando cambian los exports del cliente (y una sola vez aunque
+lleguen muchas consultas a la vez); si informes/<CLIENTE>-informe.json es
+más nuevo que los exports y que el código se lee de disco.
+
+Uso:
+    python cli.py serve --puerto 8765
+"""
+import glob
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from config import INFORMES_DIR, SCHEMA_DIR, SCRIPT_DIR, SERVIDOR
+from file_discovery import firma_archivo, identificar_clientes, listar_archivos_cliente, partir_ruta_zip
+
+
+class CacheLRU:
+    """Diccionario acotado y seguro entre hilos: descarta lo menos usado."""
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave, default=None):
+        with self._lock:
+            if clave not in self._datos:
+                return default
+            self._datos.move_to_end(clave)
+            return self._datos[clave]
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def pop(self, clave):
+        with self._lock:
+            return self._datos.pop(clave, None)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+def firma_entradas(cliente):
+    """
+    Firma de los exports de un cliente: cambia si se agrega, borra o
+    modifica cualquiera de sus archivos en crudo/.
+
+    Returns:
+        tuple de (archivo, mtime_ns del archivo en disco, firma_archivo),
+        vacía si no hay archivos
+    """
+    firma = []
+    for ruta in listar_archivos_cliente(cliente):
+        en_disco = (partir_ruta_zip(ruta) or (ruta,))[0]
+        try:
+            firma.append((ruta, os.stat(en_disco).st_mtime_ns, firma_archivo(ruta)))
+        except OSError:
+            continue
+    return tuple(sorted(firma, key=repr))
+
+
+# Huella del código y la configuración, calculada una vez por proceso
+_HUELLA = {}
+
+
+def huella_codigo():
+    """
+    Huella de lo que, además de los exports, define el informe: los módulos
+    del pipeline (config.py incluido) y los JSON del schema. Se calcula al
+    primer uso: es la versión del código que este proceso tiene importado.
+
+    Returns:
+        tuple: (hash del contenido, mtime_ns más reciente de esos archivos)
+    """
+    if not _HUELLA:
+        rutas = sorted(glob.glob(os.path.join(SCRIPT_DIR, "*.py")) + glob.glob(os.path.join(SCHEMA_DIR, "*.json")))
+        contenido = hashlib.sha1()
+        mtime = 0
+        for ruta in rutas:
+            with open(ruta, "rb") as f:
+                contenido.update(os.path.basename(ruta).encode("utf-8") + b"\0" + f.read())
+            mtime = max(mtime, os.stat(ruta).st_mtime_ns)
+        _HUELLA.update(hash=contenido.hexdigest()[:16], mtime=mtime)
+    return _HUELLA["hash"], _HUELLA["mtime"]
+
+
+def _version(firma):
+    return hashlib.sha1(repr((huella_codigo()[0], firma)).encode("utf-8")).hexdigest()[:16]
+
+
+class AlmacenInformes:
+    """
+    Informes por cliente con cache LRU invalidado por la firma de entradas.
+    """
+
+    def __init__(self, capacidad=None):
+        self.cache = CacheLRU(capacidad or SERVIDOR["CACHE_CLIENTES"])
+        self._locks = {}
+        self._lock_locks = threading.Lock()
+        # procesar_cliente usa caches de módulo y escribe a disco: de a uno
+        self._lock_pipeline = threading.Lock()
+
+    def _lock_cliente(self, cliente):
+        with self._lock_locks:
+            return self._locks.setdefault(cliente, threading.Lock())
+
+    def obtener(self, cliente):
+        """
+        Returns:
+            tuple: (informe dict, versión) del cliente
+
+        Raises:
+            KeyError: si el cliente no tiene archivos en crudo/
+        """
+        firma = firma_entradas(cliente)
+        if not firma:
+            raise KeyError(cliente)
+
+        entrada = self.cache.get(cliente)
+        if entrada is not None and entrada[0] == firma:
+            return entrada[1], entrada[2]
+
+        # Una sola ejecución por cliente aunque lleguen consultas simultáneas
+        with self._lock_cliente(cliente):
+            entrada = self.cache.get(cliente)
+            if entrada is not None and entrada[0] == firma:
+                return entrada[1], entrada[2]
+
+            informe = self._leer_de_disco(cliente, firma)
+            if informe is None:
+                informe = self._generar(cliente)
+
+            version = _version(firma)
+            self.cache.put(cliente, (firma, informe, version))
+            return informe, version
+
+    def _leer_de_disco(self, cliente, firma):
+        """Usa informes/<CLIENTE>-informe.json si es posterior a los exports y al código."""
+        ruta = os.path.join(INFORMES_DIR, f"{cliente}-informe.json")
+        try:
+            if os.stat(ruta).st_mtime_ns < max(huella_codigo()[1], *(mtime for _, mtime, _ in firma)):
+                return None
+            with open(ruta, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _generar(self, cliente):
+        from main import procesar_cliente
+
+        with self._lock_pipeline:
+            informe = procesar_cliente(cliente, generar_pdf_flag=False, salidas={"json"})
+
+        if informe is None:
+            raise KeyError(cliente)
+        return informe
+
+
+def paginar(items, pagina, por_pagina):
+    """Devuelve la página pedida (1-based) y los datos de paginación."""
+    total = len(items)
+    paginas = max(1, math.ceil(total / por_pagina))
+    inicio = (pagina - 1) * por_pagina
+    return {
+        "pagina": pagina,
+        "por_pagina": por_pagina,
+        "total": total,
+        "paginas": paginas,
+        "anuncios": items[inicio:inicio + por_pagina],
+    }
+
+
+def _entero(query, nombre, default, minimo=1, maximo=None):
+    try:
+        valor = int(query.get(nombre, [default])[0])
+    except ValueError:
+        raise ValueError(f"'{nombre}' debe ser un entero")
+    if valor < minimo:
+        raise ValueError(f"'{nombre}' debe ser >= {minimo}")
+    return min(valor, maximo) if maximo else valor
+
+
+class ManejadorInformes(BaseHTTPRequestHandler):
+    """Atiende la API; self.server.almacen y self.server.cuerpos son compartidos."""
+
+    server_version = "MetaAdsV4"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        partes = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        query = parse_qs(url.query)
+
+        try:
+            if partes == ["api", "clientes"]:
+                clientes = identificar_clientes()
+                self._responder_json(_version(tuple(clientes)), url, lambda: {"clientes": clientes})
+                return
+
+            if len(partes) in (3, 4) and partes[:2] == ["api", "clientes"]:
+                cliente = partes[2].upper()
+                # Solo clientes de crudo/: el nombre termina en rutas de informes/
+                if cliente not in identificar_clientes():
+                    raise KeyError(cliente)
+                self._responder_cliente(cliente, partes[3] if len(partes) == 4 else None, url, query)
+                return
+
+            self._error(404, "Ruta no encontrada")
+        except KeyError as e:
+            self._error(404, f"Cliente sin datos: {e.args[0]}")
+        except ValueError as e:
+            self._error(400, str(e))
+        except Exception as e:
+            self._error(500, f"Error procesando la consulta: {e}")
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cabeceras_cors()
+        self.end_headers()
+
+    def _responder_cliente(self, cliente, seccion, url, query):
+        if seccion not in (None, "resumen", "rankings", "anuncios", "desglose"):
+            self._error(404, "Ruta no encontrada")
+            return
+
+        if seccion == "anuncios":
+            pagina = _entero(query, "pagina", 1)
+            por_pagina = _entero(query, "por_pagina", SERVIDOR["POR_PAGINA"], maximo=SERVIDOR["MAX_POR_PAGINA"])
+
+        informe, version = self.server.almacen.obtener(cliente)
+
+        def construir():
+            if seccion is None:
+                return informe
+            if seccion == "resumen":
+                return {
+                    "meta": informe.get("meta"),
+                    "mediana_cpa": informe.get("mediana_cpa"),
+                    "resumen": informe.get("resumen"),
+                }
+            if seccion == "rankings":
+                return {"meta": informe.get("meta"), "rankings": informe.get("rankings")}
+            if seccion == "desglose":
+                desglose = informe.get("desglose") or {}
+                dimension = query.get("dimension", [None])[0]
+                if dimension is None:
+                    return {"meta": informe.get("meta"), "desglose": desglose}
+                if dimension not in desglose.get("dimensiones", []):
+                    raise ValueError(f"El informe no tiene desglose por '{dimension}'")
+                return {
+                    "meta": informe.get("meta"),
+                    "dimension": dimension,
+                    **{parte: desglose[parte][dimension] for parte in ("totales", "anuncios", "mejor_por_anuncio")},
+                }
+            return {"meta": informe.get("meta"), **paginar(informe.get("anuncios", []), pagina, por_pagina)}
+
+        self._responder_json(version, url, construir)
+
+    def _responder_json(self, version, url, construir):
+        """Responde con ETag; 304 si coincide, cuerpo cacheado si ya se serializó."""
+        etag = f'"{version}-{hashlib.sha1(url.geturl().encode("utf-8")).hexdigest()[:8]}"'
+
+        if etag in [e.strip() for e in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self._cabeceras_cors()
+            self.end_headers()
+            return
+
+        cuerpo = self.server.cuerpos.get(etag)
+        if cuerpo is None:
+            cuerpo = json.dumps(construir(), ensure_ascii=False).encode("utf-8")
+            self.server.cuerpos.put(etag, cuerpo)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self._cabeceras_cors()
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _error(self, codigo, mensaje):
+        cuerpo = json.dumps({"error": mensaje}, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self._cabeceras_cors()
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _cabeceras_cors(self):
+        self.send_header("Access-Control-Allow-Origin", SERVIDOR["CORS_ORIGEN"])
+        self.send_header("Access-Control-Allow-Headers", "If-None-Match")
+        self.send_header("Access-Control-Expose-Headers", "ETag")
+
+    def log_message(self, formato, *args):
+        pass  # el pipeline ya informa por consola; sin log por consulta
+
+
+def crear_servidor(host=None, puerto=None, almacen=None):
+    """Crea el servidor (un hilo por consulta) sin empezar a atender."""
+    servidor = ThreadingHTTPServer(
+        (host or SERVIDOR["HOST"], SERVIDOR["PUERTO"] if puerto is None else puerto),
+        ManejadorInformes,
+    )
+    servidor.daemon_threads = True
+    servidor.almacen = almacen or AlmacenInformes()
+    # Respuestas ya serializadas por ETag (páginas, resúmenes...)
+    servidor.cuerpos = CacheLRU(SERVIDOR["CACHE_CLIENTES"] * 32)
+    return servidor
+
+
+def servir(host=None, puerto=None):
+    """Atiende consultas hasta Ctrl+C."""
+    servidor = crear_servidor(host, puerto)
+    host, puerto = servidor.server_address[:2]
+    print(f"[API] Sirviendo informes en http://{host}:{puerto}/api/clientes (Ctrl+C para salir)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[API] Detenido.")
+    finally:
+        servidor.server_close()
+    return 0
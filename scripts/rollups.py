@@ -0,0 +1,146 @@
+"""
+Rollups por jerarquía V4.
+Los compradores deciden presupuesto por campaña y conjunto de anuncios, no
+por anuncio. Este módulo agrega score, gasto, CPA y clasificaciones en los
+tres niveles (campaña -> conjunto -> anuncio) y arma rankings por nivel.
+
+El frame de anuncios se recorre UNA sola vez: un groupby por el nivel más
+fino disponible (campaña, conjunto) suma todas las métricas y los conteos de
+clasificación (columnas indicadoras), y los niveles superiores se agregan a
+partir de ese resultado, que tiene una fila por conjunto.
+"""
+import numpy as np
+import pandas as pd
+
+from config import UMBRALES
+
+# Columna del frame -> nombre del nivel en el informe (de arriba hacia abajo)
+NIVELES = {
+    "campaign_name": "campanas",
+    "adset_name": "conjuntos",
+}
+
+CLASIFICACIONES = {
+    "HEROE": "heroes",
+    "SANO": "sanos",
+    "ALERTA": "alertas",
+    "MUERTO": "muertos",
+}
+
+SIN_NOMBRE = "(sin nombre)"
+TOP = 5
+
+
+def _numerica(df, columna):
+    if columna not in df.columns:
+        return np.zeros(len(df))
+    return pd.to_numeric(df[columna], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+
+def _base(df, columnas):
+    """Frame mínimo para agregar: claves de jerarquía, métricas e indicadores."""
+    base = {c: df[c].fillna(SIN_NOMBRE).astype(str).str.strip().replace("", SIN_NOMBRE) for c in columnas}
+    base["anuncios"] = np.ones(len(df), dtype=int)
+    base["gasto"] = _numerica(df, "spend")
+    base["score"] = _numerica(df, "score")
+    base["gasto_7d"] = _numerica(df, "gasto_7d")
+    base["score_7d"] = _numerica(df, "score_7d")
+
+    clasificacion = df["clasificacion"].to_numpy() if "clasificacion" in df.columns else np.full(len(df), "")
+    for valor, nombre in CLASIFICACIONES.items():
+        base[nombre] = (clasificacion == valor).astype(int)
+
+    return pd.DataFrame(base, index=df.index)
+
+
+def _con_cpa(agregado):
+    """Agrega cpa = gasto / score (NaN sin conversiones)."""
+    score = agregado["score"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        agregado["cpa"] = np.where(score > 0, agregado["gasto"].to_numpy(dtype=float) / score, np.nan)
+    return agregado
+
+
+def _registros(agregado, columnas):
+    """Filas del nivel como lista de dicts (nombre + padres + métricas redondeadas)."""
+    registros = []
+    for claves, fila in zip(agregado.index, agregado.to_dict("records")):
+        claves = claves if isinstance(claves, tuple) else (claves,)
+        registro = {"nombre": claves[-1]}
+        for columna, clave in zip(columnas[:-1], claves[:-1]):
+            registro[NIVELES[columna][:-1]] = clave  # "campana" para un conjunto
+        registro.update({
+            "anuncios": int(fila["anuncios"]),
+            "gasto": round(float(fila["gasto"]), 2),
+            "score": round(float(fila["score"]), 2),
+            "cpa": round(float(fila["cpa"]), 2) if pd.notna(fila["cpa"]) else None,
+            "gasto_7d": round(float(fila["gasto_7d"]), 2),
+            "score_7d": round(float(fila["score_7d"]), 2),
+            "clasificacion": {nombre: int(fila[nombre]) for nombre in CLASIFICACIONES.values()},
+        })
+        registros.append(registro)
+    return registros
+
+
+def rankings_nivel(registros):
+    """
+    Rankings de un nivel: impacto (score), volumen (gasto) y eficiencia
+    (menor CPA con al menos MIN_CONV_EFICIENCIA conversiones).
+    """
+    con_conv = [
+        r for r in registros
+        if r["cpa"] is not None and r["score"] >= UMBRALES["MIN_CONV_EFICIENCIA"]
+    ]
+    return {
+        "impacto": sorted(registros, key=lambda r: r["score"], reverse=True)[:TOP],
+        "volumen": sorted(registros, key=lambda r: r["gasto"], reverse=True)[:TOP],
+        "eficiencia": sorted(con_conv, key=lambda r: r["cpa"])[:TOP],
+    }
+
+
+def _rankings_anuncios(df, columnas):
+    """Rankings del nivel anuncio (el frame ya tiene una fila por anuncio)."""
+    cols = ["ad_name", "score", "cpa", "spend", *columnas]
+    anuncios = df[[c for c in cols if c in df.columns]]
+    con_conv = anuncios[
+        anuncios["cpa"].notna() & (anuncios["cpa"] > 0) & (anuncios["score"] >= UMBRALES["MIN_CONV_EFICIENCIA"])
+    ]
+    return {
+        "impacto": anuncios.nlargest(TOP, "score").to_dict("records"),
+        "volumen": anuncios.nlargest(TOP, "spend").to_dict("records"),
+        "eficiencia": con_conv.nsmallest(TOP, "cpa").to_dict("records"),
+    }
+
+
+def calcular_rollups(df):
+    """
+    Agrega el frame enriquecido por campaña y conjunto de anuncios.
+
+    Returns:
+        dict {"niveles", <nivel>: [registros], "rankings": {<nivel>: {...}}}
+        con los niveles presentes en el export, o None si no trae campaña
+        ni conjunto
+    """
+    columnas = [c for c in NIVELES if c in df.columns and df[c].notna().any()]
+    if not columnas:
+        return None
+
+    base = _base(df, columnas)
+
+    # Única pasada sobre los anuncios: el nivel más fino de la jerarquía
+    cubo = {columnas[-1]: base.groupby(columnas, sort=False).sum()}
+    # Los niveles de arriba salen del resultado anterior (una fila por conjunto)
+    for i in range(len(columnas) - 1):
+        cubo[columnas[i]] = cubo[columnas[-1]].groupby(level=list(range(i + 1)), sort=False).sum()
+
+    resultado = {"niveles": [NIVELES[c] for c in columnas] + ["anuncios"]}
+    rankings = {}
+    for i, columna in enumerate(columnas):
+        registros = _registros(_con_cpa(cubo[columna]), columnas[:i + 1])
+        registros.sort(key=lambda r: r["gasto"], reverse=True)
+        resultado[NIVELES[columna]] = registros
+        rankings[NIVELES[columna]] = rankings_nivel(registros)
+
+    rankings["anuncios"] = _rankings_anuncios(df, columnas)
+    resultado["rankings"] = rankings
+    return resultado
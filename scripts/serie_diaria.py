@@ -0,0 +1,234 @@
+"""
+Serie diaria por anuncio V4.
+El pipeline pide tres exports que se pisan (-30d, -7d y uno por mes) y la
+tendencia solo puede aproximar promedios diarios como score/30 y score/7.
+Con un único export desglosado por día ("Cliente-diario.xlsx", una fila por
+anuncio y día según date_start/date_end) este módulo:
+
+    1. Arma una matriz anuncio × día de cada métrica sumable (bincount)
+    2. Acumula cada matriz sobre los días (cumsum), así la suma de cualquier
+       ventana es una resta de dos columnas: 7d, 14d, 30d, mes a la fecha
+       o todos los meses del histórico a la vez
+    3. Devuelve cada ventana con la forma del export de Meta equivalente
+       (una fila por anuncio, derivadas recalculadas) para que el resto del
+       pipeline no cambie
+
+El alcance son personas únicas y la misma persona vuelve a aparecer cada
+día: no se suma entre días, así que cada ventana trae reach y frequency
+vacíos (NaN).
+
+Cada ventana trae además dias_ventana: días de la ventana desde la primera
+entrega del anuncio, para que la tendencia compare promedios diarios reales
+de anuncios que arrancaron dentro de los 30 días.
+
+Memoria: métricas × anuncios × días float64 (13 × 2.000 × 120 ≈ 25 MB).
+"""
+import numpy as np
+import pandas as pd
+
+from ad_identity import COLUMNA_CLAVE, clave_texto_anuncio, nivel_clave
+from breakdowns import ALCANCE, DERIVADAS, SUMABLES
+from config import SERIE_DIARIA
+from report_model import MESES_ORDEN
+
+# Columnas que la serie recalcula en cada ventana
+_PROPIAS = {COLUMNA_CLAVE, 'date_start', 'date_end', 'periodo', 'dias_ventana'}
+
+# No se pueden sumar entre días: quedan vacías en cada ventana
+_SIN_VENTANA = {ALCANCE, 'frequency'}
+
+
+def _fechas(df, columna):
+    if columna not in df.columns:
+        return pd.Series(pd.NaT, index=df.index)
+    return pd.to_datetime(df[columna], errors='coerce').dt.normalize()
+
+
+def es_export_diario(df):
+    """True si cada fila del export cubre un solo día (date_start == date_end)."""
+    if df is None or df.empty or 'date_start' not in df.columns:
+        return False
+    inicio = _fechas(df, 'date_start')
+    if inicio.isna().all():
+        return False
+    fin = _fechas(df, 'date_end')
+    return bool(((fin == inicio) | fin.isna())[inicio.notna()].all())
+
+
+class SerieDiaria:
+    """
+    Métricas sumables de un export diario como arrays anuncio × día.
+
+    Uso:
+        serie = SerieDiaria(df_diario)
+        df_30d = serie.ultimos(30)
+        df_14d = serie.ultimos(14)
+        df_mes = serie.mes_a_la_fecha()
+        df_hist = serie.meses()
+    """
+
+    def __init__(self, df):
+        inicio = _fechas(df, 'date_start')
+        validas = inicio.notna().to_numpy()
+        if not validas.any():
+            raise ValueError("El export diario no tiene fechas (date_start)")
+        df = df.loc[validas]
+        inicio = inicio[validas]
+
+        self.primer_dia = inicio.min()
+        self.dias = pd.date_range(self.primer_dia, inicio.max(), freq='D')
+        dia = (inicio - self.primer_dia).dt.days.to_numpy()
+
+        # Identidad propia (el export diario todavía no tiene _ad_key)
+        claves, uniques = pd.factorize(clave_texto_anuncio(df, nivel_clave([df])))
+        n_anuncios, n_dias = len(uniques), len(self.dias)
+
+        self.metricas = [c for c in SUMABLES if c in df.columns and c not in _SIN_VENTANA]
+        otras = [c for c in df.columns if c not in self.metricas and c not in _PROPIAS | _SIN_VENTANA]
+        self.columnas = [c for c in df.columns if c not in _PROPIAS]
+
+        # Atributos de cada anuncio (nombre, conjunto, objetivo...): el último no nulo
+        orden = np.argsort(dia, kind='stable')
+        self.atributos = (
+            df[otras].iloc[orden].groupby(claves[orden], sort=True).last()
+            .reindex(range(n_anuncios)).reset_index(drop=True)
+        )
+
+        # Matriz (métricas, anuncios, días) y su acumulado con una columna 0 adelante
+        posicion = claves.astype(np.int64) * n_dias + dia
+        valores = df[self.metricas].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(dtype=float)
+        matriz = np.stack([
+            np.bincount(posicion, weights=valores[:, i], minlength=n_anuncios * n_dias).reshape(n_anuncios, n_dias)
+            for i in range(len(self.metricas))
+        ]) if self.metricas else np.zeros((0, n_anuncios, n_dias))
+
+        self.acumulado = np.zeros((len(self.metricas), n_anuncios, n_dias + 1))
+        np.cumsum(matriz, axis=2, out=self.acumulado[:, :, 1:])
+
+        # Primer día con entrega (gasto o impresiones) de cada anuncio
+        entrega = np.zeros((n_anuncios, n_dias), dtype=bool)
+        for columna in ('spend', 'impressions'):
+            if columna in self.metricas:
+                entrega |= matriz[self.metricas.index(columna)] > 0
+        self.inicio_anuncio = np.where(entrega.any(axis=1), entrega.argmax(axis=1), n_dias)
+
+    def __len__(self):
+        return len(self.dias)
+
+    def _indice(self, fecha):
+        """Posición (exclusiva) del día siguiente a fecha, acotada a la serie."""
+        if fecha is None:
+            return len(self.dias)
+        dias = (pd.Timestamp(fecha).normalize() - self.primer_dia).days + 1
+        return int(min(max(dias, 0), len(self.dias)))
+
+    def sumas(self, inicio, fin):
+        """
+        Sumas de cada métrica en los días [inicio, fin) (posiciones).
+
+        Returns:
+            np.ndarray (métricas, anuncios)
+        """
+        return self.acumulado[:, :, fin] - self.acumulado[:, :, inicio]
+
+    def _frame(self, sumas, inicio, fin):
+        """Export equivalente a la ventana: una fila por anuncio con entrega."""
+        df = self.atributos.copy()
+        for i, columna in enumerate(self.metricas):
+            df[columna] = sumas[i]
+        for columna in _SIN_VENTANA & set(self.columnas):
+            df[columna] = np.nan
+        df['dias_ventana'] = np.clip(fin - np.maximum(inicio, self.inicio_anuncio), 0, fin - inicio)
+
+        for columna, (numerador, denominador, factor) in DERIVADAS.items():
+            if columna in df.columns and numerador in df.columns and denominador in df.columns:
+                den = df[denominador].to_numpy(dtype=float)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    derivada = np.where(den > 0, df[numerador].to_numpy(dtype=float) / den * factor, 0.0)
+                df[columna] = np.where(np.isnan(den), np.nan, derivada)
+
+        df['date_start'] = self.dias[inicio].strftime('%Y-%m-%d')
+        df['date_end'] = self.dias[fin - 1].strftime('%Y-%m-%d')
+
+        activos = (sumas != 0).any(axis=0)
+        df = df.loc[activos, [*self.columnas, 'date_start', 'date_end', 'dias_ventana']]
+        return df.reset_index(drop=True)
+
+    def ventana(self, desde, hasta=None):
+        """
+        Export de los días entre desde y hasta (inclusive; hasta None = último día).
+
+        Returns:
+            DataFrame con una fila por anuncio con entrega en la ventana
+        """
+        fin = self._indice(hasta)
+        inicio = max(self._indice(desde) - 1, 0)
+        if inicio >= fin:
+            raise ValueError(f"Ventana vacía: {desde} -> {hasta}")
+        return self._frame(self.sumas(inicio, fin), inicio, fin)
+
+    def ultimos(self, dias, hasta=None):
+        """Ventana móvil de los últimos `dias` días terminando en hasta."""
+        fin = self._indice(hasta)
+        inicio = max(fin - dias, 0)
+        return self._frame(self.sumas(inicio, fin), inicio, fin)
+
+    def mes_a_la_fecha(self, hasta=None):
+        """Del primer día del mes de hasta (o del último día) hasta ese día."""
+        fin = self._indice(hasta)
+        return self.ventana(self.dias[fin - 1].replace(day=1), self.dias[fin - 1])
+
+    def meses(self):
+        """
+        Histórico mensual como el de los exports por mes: todos los meses de
+        la serie (el primero y el último pueden estar incompletos) con la
+        columna periodo ('sep', 'oct'...). Las sumas de todos los meses salen
+        de una sola indexación del acumulado.
+
+        Returns:
+            DataFrame o None si la serie no tiene días
+        """
+        if not len(self.dias):
+            return None
+        meses = self.dias.to_period('M')
+        cortes = np.flatnonzero(np.r_[True, meses[1:] != meses[:-1], True])
+        acumulado = self.acumulado[:, :, cortes]
+        sumas = acumulado[:, :, 1:] - acumulado[:, :, :-1]
+
+        frames = []
+        for m, (inicio, fin) in enumerate(zip(cortes[:-1], cortes[1:])):
+            df = self._frame(sumas[:, :, m], inicio, fin)
+            df['periodo'] = MESES_ORDEN[self.dias[inicio].month - 1]
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+
+def derivar_ventanas(data, df_diario):
+    """
+    Completa 30d, 7d e histórico de _armar_datos a partir del export diario.
+    Un export -30d, -7d o mensual explícito tiene prioridad sobre la serie.
+
+    Args:
+        data: dict {"30d", "7d", "historico"} (se modifica)
+        df_diario: Export con una fila por anuncio y día
+
+    Returns:
+        SerieDiaria, o None si el export no es diario
+    """
+    if not es_export_diario(df_diario):
+        print("     [AVISO] El export diario no trae una fila por día (date_start = date_end): ignorado")
+        return None
+
+    serie = SerieDiaria(df_diario)
+    ultimo = serie.dias[-1].strftime('%Y-%m-%d')
+    ventanas = {
+        "30d": lambda: serie.ultimos(SERIE_DIARIA['DIAS_30D']),
+        "7d": lambda: serie.ultimos(SERIE_DIARIA['DIAS_7D']),
+        "historico": serie.meses,
+    }
+    for clave, derivar in ventanas.items():
+        if data.get(clave) is not None:
+            continue
+        data[clave] = derivar()
+        print(f"     [DIARIO->{clave.upper()}] {len(data[clave])} filas (hasta {ultimo})")
+    return serie
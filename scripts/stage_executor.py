@@ -0,0 +1,244 @@
+"""
+Ejecutor de etapas en paralelo V4.
+Después de enriquecer_dataframe, las etapas de análisis, recomendaciones y
+exportación leen el mismo df_30 y son independientes entre sí. Este módulo
+las ejecuta en procesos separados.
+
+El DataFrame NO se serializa con pickle para cada proceso: sus columnas se
+publican una sola vez en un bloque de memoria compartida
+(multiprocessing.shared_memory) y cada proceso arma su DataFrame sobre esas
+mismas páginas de memoria:
+    - Columnas numéricas, booleanas y fechas: buffer crudo con su dtype
+    - Columnas de texto/mixtas: códigos enteros (factorize) + categorías
+
+El descriptor del bloque (con las categorías) viaja una sola vez por
+proceso, en el inicializador del pool; cada tarea solo envía su
+(modulo, funcion, args, kwargs) y el resultado se serializa una vez.
+
+Las tareas se indican como (modulo, funcion, args, kwargs) para que los
+procesos las importen por nombre; el marcador DF dentro de args/kwargs se
+reemplaza por el DataFrame compartido.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+from config import PARALELISMO
+
+ALINEACION = 64
+
+# Marcador que se reemplaza por el DataFrame compartido en args/kwargs
+DF = "<<DF>>"
+
+
+def _adjuntar_memoria(nombre):
+    """Abre un bloque existente sin que el proceso hijo lo registre para borrarlo."""
+    try:
+        return shared_memory.SharedMemory(name=nombre, track=False)
+    except TypeError:
+        # Python < 3.13: el hijo comparte el resource_tracker del padre, que
+        # ya tiene registrado el bloque; el padre lo libera con unlink()
+        return shared_memory.SharedMemory(name=nombre)
+
+
+def publicar_frame(df):
+    """
+    Copia las columnas de df a un bloque de memoria compartida.
+
+    Returns:
+        tuple: (SharedMemory, descriptor picklable para reconstruir el frame)
+    """
+    arrays = []
+    columnas = []
+
+    for nombre in df.columns:
+        serie = df[nombre]
+        if isinstance(serie, pd.DataFrame):
+            serie = serie.iloc[:, 0]
+
+        dtype = serie.dtype
+        if (is_numeric_dtype(dtype) or is_bool_dtype(dtype) or is_datetime64_any_dtype(dtype)) \
+                and isinstance(dtype, np.dtype):
+            datos = serie.to_numpy()
+            columnas.append({"nombre": nombre, "tipo": "crudo", "dtype": datos.dtype.str})
+        else:
+            codigos, categorias = pd.factorize(serie, use_na_sentinel=True)
+            datos = codigos.astype(np.int32)
+            columnas.append({
+                "nombre": nombre,
+                "tipo": "codigos",
+                "dtype": datos.dtype.str,
+                "categorias": np.asarray(categorias, dtype=object),
+            })
+        arrays.append(np.ascontiguousarray(datos))
+
+    offset = 0
+    for col, datos in zip(columnas, arrays):
+        offset = -(-offset // ALINEACION) * ALINEACION
+        col["offset"] = offset
+        offset += datos.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for col, datos in zip(columnas, arrays):
+        destino = np.ndarray(datos.shape, dtype=datos.dtype, buffer=shm.buf, offset=col["offset"])
+        destino[...] = datos
+
+    descriptor = {
+        "memoria": shm.name,
+        "filas": len(df),
+        "indice": df.index if not isinstance(df.index, pd.RangeIndex) else None,
+        "columnas": columnas,
+    }
+    return shm, descriptor
+
+
+def abrir_frame(descriptor, shm):
+    """
+    Reconstruye el DataFrame publicado sobre el buffer compartido.
+    Las columnas numéricas son vistas (sin copia) de la memoria compartida.
+    """
+    filas = descriptor["filas"]
+    datos = {}
+
+    for col in descriptor["columnas"]:
+        valores = np.ndarray((filas,), dtype=np.dtype(col["dtype"]), buffer=shm.buf, offset=col["offset"])
+        if col["tipo"] == "codigos":
+            categorias = np.append(col["categorias"], np.nan).astype(object)
+            valores = categorias[valores]  # código -1 (NaN) toma el último elemento
+        datos[col["nombre"]] = valores
+
+    indice = descriptor["indice"] if descriptor["indice"] is not None else pd.RangeIndex(filas)
+    return pd.DataFrame(datos, index=indice, copy=False)
+
+
+def _es_marcador(valor):
+    return isinstance(valor, str) and valor == DF
+
+
+def _llamar(modulo, funcion, args, kwargs, df):
+    """Importa modulo.funcion y la llama reemplazando el marcador DF."""
+    import importlib
+
+    fn = getattr(importlib.import_module(modulo), funcion)
+    args = [df if _es_marcador(a) else a for a in args]
+    kwargs = {k: df if _es_marcador(v) else v for k, v in kwargs.items()}
+    return fn(*args, **kwargs)
+
+
+def _usa_df(args, kwargs):
+    return any(_es_marcador(a) for a in (*args, *kwargs.values()))
+
+
+# Frame publicado, visto desde el proceso hijo (ver _inicializar_proceso)
+_COMPARTIDO = {}
+
+
+def _inicializar_proceso(descriptor):
+    """
+    Inicializador del pool: recibe el descriptor una vez por proceso y deja
+    el bloque abierto mientras viva el proceso, así los resultados que
+    apunten al buffer se pueden serializar después de la tarea.
+    """
+    _COMPARTIDO["descriptor"] = descriptor
+    _COMPARTIDO["memoria"] = _adjuntar_memoria(descriptor["memoria"])
+
+
+def _ejecutar_tarea(modulo, funcion, args, kwargs):
+    """Punto de entrada en el proceso hijo: arma el frame y corre la etapa."""
+    df = None
+    if _usa_df(args, kwargs):
+        df = abrir_frame(_COMPARTIDO["descriptor"], _COMPARTIDO["memoria"])
+    return _llamar(modulo, funcion, args, kwargs, df)
+
+
+def exportar_excel(df, ruta):
+    """Etapa de exportación: escribe df en Excel y devuelve la ruta."""
+    df.to_excel(ruta, index=False)
+    return ruta
+
+
+def usar_paralelo(df, paralelo=None, max_workers=None):
+    """Decide si conviene paralelizar (por config, tamaño del frame y procesos disponibles)."""
+    if paralelo is not None:
+        return bool(paralelo)
+    return (PARALELISMO["HABILITADO"] and len(df) >= PARALELISMO["MIN_FILAS"]
+            and (max_workers is None or max_workers > 1))
+
+
+def procesos_por_worker(workers):
+    """
+    Procesos de etapas para cada uno de `workers` procesos que corren
+    clientes a la vez (cola con --workers N): entre todos no pasan de
+    PARALELISMO['MAX_WORKERS'] o de la cantidad de CPUs.
+    """
+    total = PARALELISMO["MAX_WORKERS"] or os.cpu_count() or 1
+    return max(1, total // max(1, workers))
+
+
+class EjecutorEtapas:
+    """
+    Ejecuta tareas independientes que leen el mismo DataFrame.
+
+    Uso:
+        with EjecutorEtapas(df_30, paralelo=True) as ejecutor:
+            resultados = ejecutor.ejecutar({
+                "rankings": ("analyzer", "generar_rankings", (DF,), {}),
+                "resumen": ("analyzer", "generar_resumen", (DF, mediana_cpa), {}),
+            })
+
+    Con paralelo=False las tareas se ejecutan en este proceso, en orden,
+    con la misma interfaz.
+    """
+
+    def __init__(self, df, paralelo=None, max_workers=None):
+        self.df = df
+        self.max_workers = max_workers or PARALELISMO["MAX_WORKERS"] or os.cpu_count() or 1
+        self.paralelo = usar_paralelo(df, paralelo, self.max_workers)
+        self._shm = None
+        self._descriptor = None
+        self._pool = None
+
+    def __enter__(self):
+        if self.paralelo:
+            self._shm, self._descriptor = publicar_frame(self.df)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_inicializar_proceso,
+                initargs=(self._descriptor,),
+            )
+        return self
+
+    def __exit__(self, *exc):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+        return False
+
+    def ejecutar(self, tareas):
+        """
+        Ejecuta un grupo de tareas independientes.
+
+        Args:
+            tareas: dict {nombre: (modulo, funcion, args, kwargs)}; DF en
+                    args/kwargs se reemplaza por el DataFrame compartido
+
+        Returns:
+            dict {nombre: resultado}
+        """
+        if not self.paralelo:
+            return {
+                nombre: _llamar(modulo, funcion, args, kwargs, self.df)
+                for nombre, (modulo, funcion, args, kwargs) in tareas.items()
+            }
+
+        futuros = {
+            nombre: self._pool.submit(_ejecutar_tarea, modulo, funcion, args, kwargs)
+            for nombre, (modulo, funcion, args, kwargs) in tareas.items()
+        }
+        return {nombre: futuro.result() for nombre, futuro in futuros.items()}
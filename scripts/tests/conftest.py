@@ -0,0 +1,61 @@
+"""
+Fixtures compartidas: los scripts se importan como módulos sueltos (igual
+que al correr python main.py desde scripts/) y los datos de muestra se leen
+de crudo/ en memoria, sin escribir limpios/ ni informes/.
+"""
+import os
+import sys
+import warnings
+from collections import defaultdict
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+
+from config import CRUDA_DIR  # noqa: E402
+
+
+def _archivos_muestra(directorio):
+    from file_discovery import cliente_de_archivo, listar_archivos
+
+    por_cliente = defaultdict(dict)
+    for ruta in listar_archivos(directorio):
+        cliente = cliente_de_archivo(ruta)
+        if cliente:
+            with open(ruta, "rb") as f:
+                por_cliente[cliente][os.path.basename(ruta)] = f.read()
+    return dict(por_cliente)
+
+
+@pytest.fixture(scope="session")
+def datos_muestra():
+    """{cliente: {"30d", "7d", "historico"}} de los Excel de crudo/ (y crudo/a/)."""
+    from data_loader import cargar_datos_memoria
+
+    archivos = {}
+    for directorio in (CRUDA_DIR, os.path.join(CRUDA_DIR, "a")):
+        for cliente, fuentes in _archivos_muestra(directorio).items():
+            if any("30d" in nombre for nombre in fuentes):
+                archivos.setdefault(cliente, fuentes)
+    if not archivos:
+        pytest.skip("No hay datos de muestra en crudo/")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return {cliente: cargar_datos_memoria(fuentes) for cliente, fuentes in sorted(archivos.items())}
+
+
+@pytest.fixture(scope="session")
+def enriquecidos(datos_muestra):
+    """{cliente: (df enriquecido, mediana_cpa)} con el motor pandas."""
+    from metrics import enriquecer_dataframe, obtener_pesos_conversiones
+    from objective_classifier import clasificar_objetivos_dataframe
+
+    resultado = {}
+    for cliente, datos in datos_muestra.items():
+        df = clasificar_objetivos_dataframe(datos["30d"].copy())
+        resultado[cliente] = enriquecer_dataframe(
+            df, datos.get("7d"), obtener_pesos_conversiones(cliente), datos.get("historico")
+        )
+    return resultado
@@ -0,0 +1,17 @@
+from ad_matching import cargar_tabla, guardar_tabla, normalizar_para_emparejar
+
+
+def test_tabla_por_cliente(tmp_path):
+    ruta = str(tmp_path / "emparejamientos.sqlite3")
+    guardar_tabla("A", {("nombre:promo verano copia", "nombre:promo verano", 0.95)}, ruta)
+    guardar_tabla("B", {("nombre:promo verano copia", "nombre:promo invierno", 0.9)}, ruta)
+
+    assert cargar_tabla("A", ruta) == {"nombre:promo verano copia": [("nombre:promo verano", 0.95)]}
+    assert cargar_tabla("B", ruta) == {"nombre:promo verano copia": [("nombre:promo invierno", 0.9)]}
+    assert cargar_tabla("C", ruta) == {}
+
+
+def test_normalizar_para_emparejar():
+    assert normalizar_para_emparejar(["Promo Verano 🌞 - Copia", "PROMO verano (2)", "Acción copy 3"]).tolist() == [
+        "promo verano", "promo verano", "accion",
+    ]
@@ -0,0 +1,95 @@
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import TODOS, _conectar_lectura, actualizar_indice, agregar_percentiles, cargar_indice, resumen_benchmark
+
+
+def _cuenta(cpas, objetivo="leads"):
+    return pd.DataFrame({
+        "cpa": cpas,
+        "ctr": np.full(len(cpas), 1.5),
+        "score": np.arange(len(cpas), dtype=float),
+        "objetivo_detectado": objetivo,
+    })
+
+
+def test_primer_cliente_sin_referencia(tmp_path):
+    ruta = str(tmp_path / "benchmark.sqlite3")
+    df = _cuenta([10.0, 20.0, 30.0])
+    actualizar_indice("A", df, ruta)
+
+    indice = cargar_indice(excluir="A", ruta=ruta)
+    assert indice == {}
+    assert resumen_benchmark(df, indice, 20.0) is None
+    assert agregar_percentiles(df, indice)["percentil_cpa"].isna().all()
+
+
+def test_referencia_excluye_al_propio_cliente(tmp_path):
+    ruta = str(tmp_path / "benchmark.sqlite3")
+    a, b, c = _cuenta([10.0, 20.0]), _cuenta([30.0, 40.0]), _cuenta([50.0])
+    for cliente, df in (("A", a), ("B", b), ("C", c)):
+        actualizar_indice(cliente, df, ruta)
+
+    indice = cargar_indice(excluir="A", ruta=ruta)
+    ordenado, clientes = indice[(TODOS, "cpa")]
+    assert ordenado.tolist() == [30.0, 40.0, 50.0]
+    assert clientes == 2
+
+    completo, clientes = cargar_indice(ruta=ruta)[(TODOS, "cpa")]
+    assert completo.tolist() == [10.0, 20.0, 30.0, 40.0, 50.0]
+    assert clientes == 3
+
+    resumen = resumen_benchmark(a, indice, 15.0)
+    assert resumen["clientes"] == 2
+    assert resumen["percentil_cpa_cuenta"] == 0.0
+
+
+def test_actualizar_reemplaza_valores(tmp_path):
+    ruta = str(tmp_path / "benchmark.sqlite3")
+    actualizar_indice("A", _cuenta([10.0, 20.0]), ruta)
+    actualizar_indice("B", _cuenta([30.0]), ruta)
+
+    def actualizados():
+        with closing(sqlite3.connect(ruta)) as conn:
+            return conn.execute("SELECT actualizado FROM valores WHERE cliente = 'A'").fetchall()
+
+    antes = actualizados()
+    assert actualizar_indice("A", _cuenta([10.0, 20.0]), ruta) == 6  # cpa, ctr y score
+    assert actualizados() == antes
+
+    actualizar_indice("A", _cuenta([5.0]), ruta)
+
+    ordenado, clientes = cargar_indice(ruta=ruta)[(TODOS, "cpa")]
+    assert ordenado.tolist() == [5.0, 30.0]
+    assert clientes == 2
+    assert cargar_indice(excluir="B", ruta=ruta)[(TODOS, "cpa")][0].tolist() == [5.0]
+
+
+def test_indice_con_repetidos_coincide_con_reordenar(tmp_path):
+    ruta = str(tmp_path / "benchmark.sqlite3")
+    rng = np.random.default_rng(0)
+    cuentas = {c: rng.integers(1, 6, size=8).astype(float) for c in "ABCD"}
+    for cliente, cpas in cuentas.items():
+        actualizar_indice(cliente, _cuenta(cpas), ruta)
+    cuentas["B"] = np.array([2.0, 2.0, 9.0])
+    actualizar_indice("B", _cuenta(cuentas["B"]), ruta)
+
+    for excluir in (None, "A", "B"):
+        esperado = np.sort(np.concatenate([v for c, v in cuentas.items() if c != excluir]))
+        ordenado, clientes = cargar_indice(excluir=excluir, ruta=ruta)[(TODOS, "cpa")]
+        assert ordenado.tolist() == esperado.tolist()
+        assert clientes == (4 if excluir is None else 3)
+
+
+def test_lectura_no_escribe_la_base(tmp_path):
+    ruta = str(tmp_path / "benchmark.sqlite3")
+    actualizar_indice("A", _cuenta([10.0]), ruta)
+    assert cargar_indice(ruta=ruta)[(TODOS, "cpa")][0].tolist() == [10.0]
+
+    with closing(_conectar_lectura(ruta)) as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("CREATE TABLE IF NOT EXISTS otra (x)")
@@ -0,0 +1,83 @@
+import pandas as pd
+
+from ad_identity import COLUMNA_CLAVE
+from breakdowns import colapsar, construir_cubo, detectar_dimensiones
+
+PESOS = {"leads": 1.0}
+
+
+def _filas(dimension, valores):
+    """Dos anuncios: a en tres valores de la dimensión, b en dos."""
+    return pd.DataFrame({
+        COLUMNA_CLAVE: ["a", "a", "a", "b", "b"],
+        "ad_name": ["Anuncio A"] * 3 + ["Anuncio B"] * 2,
+        dimension: valores,
+        "gender": ["todos"] * 5,
+        "spend": [60.0, 30.0, 10.0, 40.0, 40.0],
+        "leads": [3.0, 3.0, 0.0, 4.0, 1.0],
+        "reach": [100.0, 80.0, 20.0, 50.0, 50.0],
+        "impressions": [300.0, 160.0, 40.0, 100.0, 150.0],
+        "frequency": [3.0, 2.0, 2.0, 2.0, 3.0],
+    })
+
+
+def _por_ubicacion():
+    return _filas("placement", ["Feed", "Stories", "Reels", "Feed", "Stories"])
+
+
+def test_detectar_dimensiones():
+    filas = _por_ubicacion()
+    # gender es constante por anuncio: no es un desglose
+    assert detectar_dimensiones(filas) == ["placement"]
+    assert detectar_dimensiones(filas.drop_duplicates(COLUMNA_CLAVE)) == []
+    assert detectar_dimensiones(pd.DataFrame()) == []
+
+
+def test_colapsar_por_ubicacion_no_suma_alcance():
+    colapsado = colapsar(_por_ubicacion(), ["placement"])
+
+    assert colapsado[COLUMNA_CLAVE].tolist() == ["a", "b"]
+    assert "placement" not in colapsado.columns
+    assert colapsado["spend"].tolist() == [100.0, 80.0]
+    assert colapsado["impressions"].tolist() == [500.0, 250.0]
+    # Las audiencias de cada ubicación se solapan
+    assert colapsado["reach"].isna().all()
+    assert colapsado["frequency"].isna().all()
+
+
+def test_colapsar_por_edad_suma_alcance():
+    colapsado = colapsar(_filas("age", ["18-24", "25-34", "35-44", "18-24", "25-34"]), ["age"])
+
+    assert colapsado["reach"].tolist() == [200.0, 100.0]
+    assert colapsado["frequency"].tolist() == [2.5, 2.5]
+
+
+def test_cubo_totales_y_mejor_ubicacion():
+    filas = _por_ubicacion()
+    df = colapsar(filas, ["placement"])
+    cubo = construir_cubo({"dimensiones": ["placement"], "filas": filas}, df, PESOS)
+
+    totales = {r["placement"]: r for r in cubo["totales"]["placement"]}
+    assert [r["placement"] for r in cubo["totales"]["placement"]] == ["Feed", "Stories", "Reels"]
+    assert (totales["Feed"]["gasto"], totales["Feed"]["score"], totales["Feed"]["cpa"]) == (100.0, 7.0, 14.29)
+    assert (totales["Stories"]["gasto"], totales["Stories"]["score"], totales["Stories"]["cpa"]) == (70.0, 4.0, 17.5)
+    assert totales["Reels"]["cpa"] is None
+    assert totales["Feed"]["anuncios"] == 2
+
+    anuncios = {(r["ad_name"], r["placement"]): r["cpa"] for r in cubo["anuncios"]["placement"]}
+    assert anuncios[("Anuncio A", "Feed")] == 20.0
+    assert anuncios[("Anuncio B", "Stories")] == 40.0
+
+    # a: Feed 20, Stories 10, Reels sin conversiones; b: Feed 10, Stories 40
+    assert df["mejor_placement"].tolist() == ["Stories", "Feed"]
+    mejores = {r["ad_name"]: (r["placement"], r["cpa"]) for r in cubo["mejor_por_anuncio"]["placement"]}
+    assert mejores == {"Anuncio A": ("Stories", 10.0), "Anuncio B": ("Feed", 10.0)}
+
+
+def test_cubo_sin_conversiones_no_tiene_mejor():
+    filas = _por_ubicacion().assign(leads=0.0)
+    df = colapsar(filas, ["placement"])
+    cubo = construir_cubo({"dimensiones": ["placement"], "filas": filas}, df, PESOS)
+
+    assert df["mejor_placement"].isna().all()
+    assert cubo["mejor_por_anuncio"]["placement"] == []
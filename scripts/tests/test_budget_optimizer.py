@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from budget_optimizer import asignar_presupuesto, optimizar_presupuesto
+
+
+def test_asignacion_conserva_el_total_y_respeta_limites():
+    rng = np.random.default_rng(0)
+    rendimiento = rng.random(50)
+    minimo = rng.random(50) * 10
+    maximo = minimo + rng.random(50) * 30
+    presupuesto = minimo.sum() + 200
+
+    asignacion, sin_asignar = asignar_presupuesto(rendimiento, presupuesto, minimo, maximo)
+
+    assert asignacion.sum() == pytest.approx(presupuesto)
+    assert sin_asignar == pytest.approx(0)
+    assert (asignacion >= minimo - 1e-9).all()
+    assert (asignacion <= maximo + 1e-9).all()
+
+
+def test_asignacion_greedy_por_rendimiento():
+    rendimiento = np.array([0.1, 0.5, 0.3, 0.0])
+    asignacion, sin_asignar = asignar_presupuesto(rendimiento, 150, np.zeros(4), np.full(4, 100.0))
+
+    # Primero el de mayor rendimiento hasta su máximo, el resto al siguiente
+    np.testing.assert_allclose(asignacion, [0, 100, 50, 0])
+    assert sin_asignar == 0
+
+
+def test_asignacion_sin_capacidad_deja_sobrante():
+    rendimiento = np.array([0.2, 0.0])
+    asignacion, sin_asignar = asignar_presupuesto(rendimiento, 100, np.array([10.0, 10.0]), np.array([30.0, 50.0]))
+
+    np.testing.assert_allclose(asignacion, [30, 10])
+    assert sin_asignar == pytest.approx(60)
+
+
+def test_minimos_mayores_al_presupuesto_se_reducen():
+    asignacion, _ = asignar_presupuesto(np.array([1.0, 1.0]), 50, np.array([60.0, 40.0]), np.array([60.0, 40.0]))
+    np.testing.assert_allclose(asignacion, [30, 20])
+
+
+def test_anuncio_sin_gasto_7d_puede_recibir_presupuesto():
+    df = pd.DataFrame({
+        'ad_name': ['caro', 'barato_sin_7d'],
+        'cpa': [100.0, 10.0],
+        'spend': [3000.0, 300.0],
+        'gasto_7d': [700.0, 0.0],
+    })
+    detalle, _ = optimizar_presupuesto(df, min_ratio=0.0, max_ratio=2.0)
+
+    # Máximo del anuncio sin 7d: 2 × (300 · 7/30) = 140
+    np.testing.assert_allclose(detalle['gasto_optimo'], [560, 140])
+    np.testing.assert_allclose(detalle['gasto_actual'], [700, 0])
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from cuantiles import SketchCuantiles
+
+K = 200
+N = 200_000
+PROBABILIDADES = np.linspace(0.01, 0.99, 99)
+ERROR_RANGO = 1.7 / K
+
+
+def _error_rango(sketch, n=N):
+    """Error de rango máximo sobre 0..n-1 (el valor v tiene rango (v+1)/n)."""
+    return np.abs((sketch.cuantiles(PROBABILIDADES) + 1) / n - PROBABILIDADES).max()
+
+
+@pytest.fixture(scope="module")
+def datos():
+    return np.random.default_rng(1).permutation(N).astype(float)
+
+
+@pytest.mark.parametrize("semilla", range(3))
+def test_error_de_rango(datos, semilla):
+    sketch = SketchCuantiles(K, semilla=semilla)
+    for lote in np.array_split(datos, 37):
+        sketch.agregar(lote)
+
+    assert len(sketch) == N
+    assert _error_rango(sketch) <= ERROR_RANGO
+    assert sketch._tamano() <= 3 * K
+    assert sketch.cuantiles([0, 1]).tolist() == [0.0, N - 1.0]
+
+
+def test_fusionar_igual_a_una_pasada(datos):
+    una_pasada = SketchCuantiles(K, semilla=0).agregar(datos)
+    partes = [SketchCuantiles(K, semilla=i).agregar(lote) for i, lote in enumerate(np.array_split(datos, 8))]
+    fusionado = SketchCuantiles(K, semilla=0)
+    for parte in partes:
+        fusionado.fusionar(parte)
+
+    assert (len(fusionado), fusionado.minimo, fusionado.maximo) == (
+        len(una_pasada), una_pasada.minimo, una_pasada.maximo)
+    assert _error_rango(fusionado) <= ERROR_RANGO
+    diferencia = np.abs(fusionado.cuantiles(PROBABILIDADES) - una_pasada.cuantiles(PROBABILIDADES)) / N
+    assert diferencia.max() <= 2 * ERROR_RANGO
+    # fusionar no modifica al otro sketch
+    assert len(partes[1]) == len(np.array_split(datos, 8)[1])
+
+
+def test_fusionar_sin_compactar_es_exacto():
+    valores = np.arange(100, dtype=float)
+    una_pasada = SketchCuantiles(K).agregar(valores)
+    fusionado = SketchCuantiles(K).agregar(valores[:30]).fusionar(SketchCuantiles(K).agregar(valores[30:]))
+    np.testing.assert_array_equal(fusionado.cuantiles(PROBABILIDADES), una_pasada.cuantiles(PROBABILIDADES))
+
+
+def test_bytes_ida_y_vuelta(datos):
+    sketch = SketchCuantiles(K, semilla=3).agregar(datos[:50_000])
+    copia = SketchCuantiles.desde_bytes(sketch.a_bytes())
+
+    assert (copia.k, len(copia), copia.minimo, copia.maximo) == (sketch.k, len(sketch), sketch.minimo, sketch.maximo)
+    assert len(copia._niveles) == len(sketch._niveles)
+    for nivel, original in zip(copia._niveles, sketch._niveles):
+        np.testing.assert_array_equal(nivel, original)
+    np.testing.assert_array_equal(copia.cuantiles(PROBABILIDADES), sketch.cuantiles(PROBABILIDADES))
+
+    vacio = SketchCuantiles.desde_bytes(SketchCuantiles(K).a_bytes())
+    assert len(vacio) == 0
+    assert np.isnan(vacio.cuantil(0.5))
+
+
+def test_vacio_y_nan():
+    sketch = SketchCuantiles(K)
+    assert np.isnan(sketch.cuantiles(PROBABILIDADES)).all()
+
+    sketch.agregar([]).agregar([np.nan, np.inf, -np.inf])
+    assert len(sketch) == 0
+    assert np.isnan(sketch.cuantil(0.5))
+
+    sketch.agregar([np.nan, 1.0, 3.0, np.nan, 2.0])
+    assert len(sketch) == 3
+    assert sketch.cuantiles([0, 0.5, 1]).tolist() == [1.0, 2.0, 3.0]
+
+    assert len(SketchCuantiles(K).fusionar(SketchCuantiles(K))) == 0
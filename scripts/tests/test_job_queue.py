@@ -0,0 +1,67 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import job_queue
+from config import COLA
+
+
+@pytest.fixture
+def cola(tmp_path, monkeypatch):
+    monkeypatch.setitem(COLA, "BACKOFF_BASE", 0.0)
+    monkeypatch.setitem(COLA, "ESPERA_VACIA", 0.0)
+    ruta = str(tmp_path / "cola.sqlite3")
+    with closing(job_queue.conectar(ruta)) as conn:
+        job_queue.encolar(conn, "lote", ["CLIENTE"], {"json"}, max_intentos=3)
+    return ruta
+
+
+def _correr(ruta, monkeypatch, errores):
+    """Corre el worker con un pipeline que lanza los errores indicados en orden."""
+    pendientes = list(errores)
+
+    def ejecutar_trabajo(trabajo, motor=None):
+        if pendientes:
+            raise pendientes.pop(0)
+        return {"meta": {"cliente": trabajo["cliente"]}, "archivos": {}}
+
+    monkeypatch.setattr(job_queue, "ejecutar_trabajo", ejecutar_trabajo)
+    job_queue.trabajar("lote", ruta)
+    with closing(job_queue.conectar(ruta)) as conn:
+        return dict(conn.execute("SELECT * FROM trabajos").fetchone())
+
+
+@pytest.mark.parametrize("error", [
+    RuntimeError("No se encontraron datos válidos de 30 días"),
+    ValueError("Salidas desconocidas: docx"),
+    KeyError("spend"),
+])
+def test_error_permanente_no_se_reintenta(cola, monkeypatch, error):
+    trabajo = _correr(cola, monkeypatch, [error])
+    assert trabajo["estado"] == job_queue.FALLIDO
+    assert trabajo["intentos"] == 1
+    assert trabajo["error"].startswith(type(error).__name__)
+
+
+@pytest.mark.parametrize("error", [
+    PermissionError("archivo en uso"),
+    sqlite3.OperationalError("database is locked"),
+])
+def test_error_transitorio_se_reintenta(cola, monkeypatch, error):
+    trabajo = _correr(cola, monkeypatch, [error, error])
+    assert trabajo["estado"] == job_queue.OK
+    assert trabajo["intentos"] == 3
+
+
+def test_error_transitorio_agota_intentos(cola, monkeypatch):
+    trabajo = _correr(cola, monkeypatch, [OSError("disco")] * 3)
+    assert trabajo["estado"] == job_queue.FALLIDO
+    assert trabajo["intentos"] == 3
+
+
+def test_es_transitorio():
+    assert job_queue.es_transitorio(FileNotFoundError("x.xlsx"))
+    assert job_queue.es_transitorio(sqlite3.OperationalError("database is busy"))
+    assert not job_queue.es_transitorio(sqlite3.OperationalError("no such table: trabajos"))
+    assert not job_queue.es_transitorio(RuntimeError("No se encontraron datos válidos de 30 días"))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from numeric_parser import detectar_formato_numerico, parsear_columnas_numericas
+
+
+def _parsear(valores):
+    df = pd.DataFrame({"col": pd.Series(valores, dtype=object)})
+    convertidas, forzadas, formatos = parsear_columnas_numericas(df, ["col"])
+    return convertidas["col"].tolist(), forzadas.get("col"), formatos.get("col")
+
+
+@pytest.mark.parametrize("muestra, esperado", [
+    (["1.234,56", "12,5"], "es"),
+    (["1,234.56", "12.5"], "en"),
+    (["1.234.567", "12.345", "45.678"], "es"),
+    (["1,234,567", "12.5"], "en"),
+    (["1,5", "2,25"], "es"),
+    (["1.5", "2.25"], "en"),
+    (["12.345", "45.678"], "en"),
+    ([], "en"),
+])
+def test_detectar_formato_numerico(muestra, esperado):
+    assert detectar_formato_numerico(muestra) == esperado
+
+
+def test_enteros_argentinos_no_votan_en():
+    valores, forzadas, formato = _parsear(["12.345", "45.678", "1.234.567"])
+    assert formato == "es"
+    assert valores == [12345.0, 45678.0, 1234567.0]
+    assert forzadas is None
+
+
+def test_celda_no_ambigua_en_columna_del_otro_formato():
+    valores, forzadas, formato = _parsear(["1.5", "2.25", "1.234,5"])
+    assert formato == "en"
+    assert valores == [1.5, 2.25, 1234.5]
+    assert forzadas is None
+
+    valores, _, formato = _parsear(["1,5", "2,25", "1,234,567"])
+    assert formato == "es"
+    assert valores == [1.5, 2.25, 1234567.0]
+
+
+def test_basura_y_celdas_invalidas():
+    valores, forzadas, formato = _parsear(["$ 2.000,75", "15%", "abc", None, "-"])
+    assert formato == "es"
+    assert valores[:2] == [2000.75, 15.0]
+    assert np.isnan(valores[2:]).all()
+    assert forzadas.tolist() == [2]
@@ -0,0 +1,109 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("polars")
+
+from analyzer import analizar_por_objetivo, generar_rankings, generar_resumen  # noqa: E402
+from config import SCORE_NORMALIZACION  # noqa: E402
+from metrics import enriquecer_dataframe, obtener_pesos_conversiones  # noqa: E402
+from objective_classifier import clasificar_objetivos_dataframe  # noqa: E402
+from polars_backend import enriquecer_y_analizar, motivo_no_disponible  # noqa: E402
+
+ANALISIS = ["resumen", "rankings", "analisis_objetivo"]
+# Totales sumados en otro orden: pueden diferir en un centavo al redondear
+TOTALES = ("gasto_total", "score_total", "cpa_global", "cpa_promedio")
+
+
+def _igual(a, b, ruta=""):
+    if isinstance(a, dict):
+        assert isinstance(b, dict) and list(a) == list(b), ruta
+        for clave in a:
+            _igual(a[clave], b[clave], f"{ruta}.{clave}")
+    elif isinstance(a, list):
+        assert len(a) == len(b), ruta
+        for i, (x, y) in enumerate(zip(a, b)):
+            _igual(x, y, f"{ruta}[{i}]")
+    elif isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None or math.isnan(a):
+            assert a is b or (a is not None and b is not None and math.isnan(b)), ruta
+            return
+        tolerancia = 0.011 if ruta.endswith(TOTALES) else 1e-9
+        assert math.isclose(a, b, rel_tol=1e-9, abs_tol=tolerancia), (ruta, a, b)
+        assert type(a) is type(b), ruta
+    else:
+        assert a == b and type(a) is type(b), (ruta, a, b)
+
+
+def _comparar(df, df_7d, pesos, df_hist):
+    assert motivo_no_disponible(df, df_7d, df_hist) is None
+    esperado, mediana = enriquecer_dataframe(df.copy(), df_7d, pesos, df_hist)
+    obtenido, mediana_pl, precalculado = enriquecer_y_analizar(df.copy(), df_7d, pesos, df_hist, ANALISIS)
+
+    assert list(obtenido.columns) == list(esperado.columns)
+    for columna in esperado.columns:
+        x, y = esperado[columna], obtenido[columna]
+        assert x.dtype == y.dtype, columna
+        if pd.api.types.is_float_dtype(x):
+            np.testing.assert_allclose(y.to_numpy(), x.to_numpy(), rtol=1e-12, atol=1e-12, err_msg=columna)
+        else:
+            assert x.equals(y), columna
+
+    assert mediana_pl == mediana and type(mediana_pl) is type(mediana)
+    _igual(generar_resumen(esperado, mediana), precalculado["resumen"], "resumen")
+    _igual(generar_rankings(esperado), precalculado["rankings"], "rankings")
+    _igual(analizar_por_objetivo(esperado), precalculado["analisis_objetivo"], "analisis_objetivo")
+
+
+@pytest.fixture(params=[("max", True), ("percentil", True), ("max", False), ("percentil", False)],
+                ids=lambda p: f"{p[0]}-{'objetivo' if p[1] else 'cuenta'}")
+def normalizacion(request, monkeypatch):
+    metodo, por_objetivo = request.param
+    monkeypatch.setitem(SCORE_NORMALIZACION, "METODO", metodo)
+    monkeypatch.setitem(SCORE_NORMALIZACION, "POR_OBJETIVO", por_objetivo)
+
+
+@pytest.mark.parametrize("con_7d, con_hist", [(True, True), (False, True), (True, False), (False, False)],
+                         ids=["completo", "sin_7d", "sin_historico", "solo_30d"])
+def test_datos_de_muestra(datos_muestra, normalizacion, con_7d, con_hist):
+    for cliente, datos in datos_muestra.items():
+        df = clasificar_objetivos_dataframe(datos["30d"].copy())
+        _comparar(
+            df,
+            datos.get("7d") if con_7d else None,
+            obtener_pesos_conversiones(cliente),
+            datos.get("historico") if con_hist else None,
+        )
+
+
+def _sintetico(rng, n, n_claves, dias=False, periodo=False):
+    claves = rng.integers(0, n_claves, n) if periodo or n != n_claves else np.arange(n)
+    df = pd.DataFrame({"_ad_key": claves, "ad_name": [f"ad{c}" for c in claves]})
+    for columna in ("spend", "results", "msg_init", "msg_contacts", "ig_profile", "link_clicks", "leads",
+                    "purchases", "conversion_value", "interactions", "video_views", "thruplay",
+                    "ctr", "cpc", "cpl", "roas"):
+        valores = np.round(rng.exponential(50, n), 1) * (rng.random(n) < 0.6)
+        valores[rng.random(n) < 0.02] = np.nan
+        df[columna] = valores
+    df.loc[rng.random(n) < 0.2, "spend"] = 100.0  # empates en rankings y medianas
+    if dias:
+        df["dias_ventana"] = rng.integers(0, 8, n).astype(float)
+    if periodo:
+        df["periodo"] = rng.choice(["sep", "oct", "nov"], n)
+    return df
+
+
+@pytest.mark.parametrize("con_7d, con_hist", [(True, True), (False, False), (True, False)],
+                         ids=["completo", "solo_30d", "sin_historico"])
+def test_datos_sinteticos(normalizacion, con_7d, con_hist):
+    rng = np.random.default_rng(1)
+    n = 3000
+    df = _sintetico(rng, n, n, dias=True)
+    df["objetivo_detectado"] = rng.choice(
+        ["mensajes", "trafico", "leads", "ventas", "interaccion", "general", "otro"], n)
+    df_7d = _sintetico(rng, 1200, n, dias=True, periodo=True).drop(columns="periodo")
+    df_hist = _sintetico(rng, 4500, n, periodo=True)
+
+    _comparar(df, df_7d if con_7d else None, obtener_pesos_conversiones("X"), df_hist if con_hist else None)
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from config import UMBRALES
+from recommendations import analizar_no_candidatos, identificar_duplicar
+
+
+def test_no_candidatos_distingue_anuncios_con_el_mismo_nombre():
+    score_min = UMBRALES['DUPLICAR_SCORE_MIN']
+    df = pd.DataFrame({
+        'ad_name': ['Video 1', 'Video 1'],
+        '_ad_key': [0, 1],
+        'score': [score_min + 10, score_min / 2],
+        'cpa': [100.0, 100.0],
+        'spend': [1000.0, 500.0],
+        'actividad': ['ACTIVO', 'ACTIVO'],
+        'clasificacion': ['HEROE', 'ALERTA'],
+        'tendencia': ['ESTABLE', 'ESTABLE'],
+        'score_100': [100.0, 50.0],
+        'score_7d': [5.0, 1.0],
+    })
+
+    candidatos = identificar_duplicar(df, 100.0)
+    assert [c['_ad_key'] for c in candidatos] == [0]
+
+    no_candidatos = analizar_no_candidatos(df, 100.0)
+    assert len(no_candidatos) == 1
+    assert no_candidatos[0]['score'] == round(score_min / 2, 1)
@@ -0,0 +1,90 @@
+import json
+import os
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from file_discovery import listar_archivos_cliente
+import report_server
+from report_server import crear_servidor
+
+
+class AlmacenFalso:
+    """Registra los clientes pedidos en lugar de correr el pipeline."""
+
+    def __init__(self):
+        self.pedidos = []
+
+    def obtener(self, cliente):
+        self.pedidos.append(cliente)
+        return {"meta": {"cliente": cliente}}, "v1"
+
+
+@pytest.fixture
+def servidor():
+    servidor = crear_servidor("127.0.0.1", 0, AlmacenFalso())
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _get(servidor, ruta):
+    host, puerto = servidor.server_address[:2]
+    try:
+        with urlopen(f"http://{host}:{puerto}{ruta}") as respuesta:
+            return respuesta.status, json.load(respuesta)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.mark.parametrize("ruta", ["/api/clientes/.*", "/api/clientes/%5B", "/api/clientes/..%2F..%2Fx/resumen"])
+def test_cliente_inexistente_da_404(servidor, ruta):
+    estado, _ = _get(servidor, ruta)
+    assert estado == 404
+    assert servidor.almacen.pedidos == []
+
+
+def test_cliente_de_crudo(servidor):
+    estado, cuerpo = _get(servidor, "/api/clientes")
+    assert estado == 200
+    if not cuerpo["clientes"]:
+        pytest.skip("No hay datos de muestra en crudo/")
+
+    cliente = cuerpo["clientes"][0]
+    estado, cuerpo = _get(servidor, f"/api/clientes/{cliente.lower()}/resumen")
+    assert estado == 200
+    assert servidor.almacen.pedidos == [cliente]
+
+
+def test_listar_archivos_cliente_es_literal():
+    assert listar_archivos_cliente(".*") == []
+    assert listar_archivos_cliente("[") == []
+
+
+def test_version_incluye_huella_del_codigo(monkeypatch):
+    firma = (("crudo/A-30d.xlsx", 1, (10, 1)),)
+    hash_actual, mtime = report_server.huella_codigo()
+    assert len(hash_actual) == 16 and mtime > 0
+
+    version = report_server._version(firma)
+    monkeypatch.setitem(report_server._HUELLA, "hash", "otra-config")
+    assert report_server._version(firma) != version
+
+
+def test_informe_en_disco_anterior_al_codigo_se_regenera(tmp_path, monkeypatch):
+    ruta = tmp_path / "A-informe.json"
+    ruta.write_text('{"meta": {}}', encoding="utf-8")
+    os.utime(ruta, ns=(2_000, 2_000))
+    monkeypatch.setattr(report_server, "INFORMES_DIR", str(tmp_path))
+    almacen = report_server.AlmacenInformes()
+    report_server.huella_codigo()
+    firma = (("crudo/A-30d.xlsx", 1_000, (10, 1)),)
+
+    monkeypatch.setitem(report_server._HUELLA, "mtime", 1_500)
+    assert almacen._leer_de_disco("A", firma) == {"meta": {}}
+    monkeypatch.setitem(report_server._HUELLA, "mtime", 3_000)
+    assert almacen._leer_de_disco("A", firma) is None
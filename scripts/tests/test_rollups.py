@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from rollups import SIN_NOMBRE, calcular_rollups
+
+
+def _anuncios():
+    return pd.DataFrame({
+        "campaign_name": ["C1", "C1", "C1", "C2", "C2"],
+        "adset_name": ["S1", "S1", "S2", "S3", None],
+        "ad_name": ["a", "b", "c", "d", "e"],
+        "spend": [100.0, 50.0, 30.0, 200.0, 20.0],
+        "score": [10.0, 0.0, 3.0, 4.0, 0.0],
+        "cpa": [10.0, np.nan, 10.0, 50.0, np.nan],
+        "clasificacion": ["HEROE", "MUERTO", "SANO", "ALERTA", "MUERTO"],
+    })
+
+
+def _por_nombre(registros):
+    return {r["nombre"]: r for r in registros}
+
+
+def test_totales_y_cpa_por_campana():
+    rollups = calcular_rollups(_anuncios())
+    assert rollups["niveles"] == ["campanas", "conjuntos", "anuncios"]
+
+    campanas = rollups["campanas"]
+    assert [c["nombre"] for c in campanas] == ["C2", "C1"]  # por gasto
+    c1, c2 = _por_nombre(campanas)["C1"], _por_nombre(campanas)["C2"]
+    assert (c1["anuncios"], c1["gasto"], c1["score"]) == (3, 180.0, 13.0)
+    assert c1["cpa"] == round(180 / 13, 2)
+    assert (c2["anuncios"], c2["gasto"], c2["score"], c2["cpa"]) == (2, 220.0, 4.0, 55.0)
+
+    assert c1["clasificacion"] == {"heroes": 1, "sanos": 1, "alertas": 0, "muertos": 1}
+    assert c2["clasificacion"] == {"heroes": 0, "sanos": 0, "alertas": 1, "muertos": 1}
+
+
+def test_totales_por_conjunto():
+    conjuntos = _por_nombre(calcular_rollups(_anuncios())["conjuntos"])
+    assert set(conjuntos) == {"S1", "S2", "S3", SIN_NOMBRE}
+
+    s1 = conjuntos["S1"]
+    assert (s1["campana"], s1["anuncios"], s1["gasto"], s1["score"], s1["cpa"]) == ("C1", 2, 150.0, 10.0, 15.0)
+    assert s1["clasificacion"] == {"heroes": 1, "sanos": 0, "alertas": 0, "muertos": 1}
+
+    # Sin conversiones no hay CPA; el anuncio sin conjunto queda bajo su campaña
+    sin_nombre = conjuntos[SIN_NOMBRE]
+    assert (sin_nombre["campana"], sin_nombre["gasto"], sin_nombre["cpa"]) == ("C2", 20.0, None)
+
+
+def test_rankings_por_nivel():
+    rankings = calcular_rollups(_anuncios())["rankings"]
+
+    assert [r["nombre"] for r in rankings["campanas"]["impacto"]] == ["C1", "C2"]
+    assert [r["nombre"] for r in rankings["campanas"]["eficiencia"]] == ["C1", "C2"]
+    # El conjunto sin conversiones no entra en eficiencia
+    assert [r["nombre"] for r in rankings["conjuntos"]["eficiencia"]] == ["S2", "S1", "S3"]
+    assert [r["ad_name"] for r in rankings["anuncios"]["volumen"]][:2] == ["d", "a"]
+
+
+def test_sin_jerarquia():
+    assert calcular_rollups(pd.DataFrame({"ad_name": ["a"], "spend": [1.0]})) is None
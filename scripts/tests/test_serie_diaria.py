@@ -0,0 +1,41 @@
+import pandas as pd
+
+from analyzer import detectar_anomalias
+from serie_diaria import SerieDiaria
+
+
+def _diario():
+    """Un anuncio, cuatro días con el mismo público (alcance 100 por día)."""
+    dias = pd.date_range("2026-03-01", periods=4, freq="D").strftime("%Y-%m-%d")
+    return pd.DataFrame({
+        "ad_name": "Anuncio A",
+        "date_start": dias,
+        "date_end": dias,
+        "spend": [10.0, 10.0, 20.0, 0.0],
+        "impressions": [300.0, 300.0, 300.0, 0.0],
+        "reach": [100.0, 100.0, 100.0, 0.0],
+        "frequency": [3.0, 3.0, 3.0, 0.0],
+        "link_clicks": [3.0, 6.0, 3.0, 0.0],
+        "ctr": [1.0, 2.0, 1.0, 0.0],
+    })
+
+
+def test_ventana_suma_y_recalcula_derivadas():
+    df = SerieDiaria(_diario()).ultimos(4)
+
+    assert len(df) == 1
+    assert df.loc[0, "spend"] == 40.0
+    assert df.loc[0, "impressions"] == 900.0
+    assert df.loc[0, "ctr"] == 12 / 900 * 100
+    assert df.loc[0, "dias_ventana"] == 4
+
+
+def test_alcance_no_se_suma_entre_dias():
+    df = SerieDiaria(_diario()).ultimos(4)
+
+    # Sumar el alcance diario daría 300 personas y frecuencia 3: el público
+    # real puede ser de 100 con frecuencia 9
+    assert df["reach"].isna().all()
+    assert df["frequency"].isna().all()
+    df["score"] = 1.0
+    assert not [a for a in detectar_anomalias(df) if a["tipo"] == "FRECUENCIA_ALTA"]
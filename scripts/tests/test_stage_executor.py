@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from config import PARALELISMO
+from stage_executor import DF, EjecutorEtapas, abrir_frame, procesos_por_worker, publicar_frame
+
+
+def _tareas(mediana_cpa):
+    return {
+        "resumen": ("analyzer", "generar_resumen", (DF, mediana_cpa), {}),
+        "rankings": ("analyzer", "generar_rankings", (DF,), {}),
+        "anomalias": ("analyzer", "detectar_anomalias", (DF,), {}),
+        "analisis_objetivo": ("analyzer", "analizar_por_objetivo", (DF,), {}),
+        "jerarquia": ("rollups", "calcular_rollups", (DF,), {}),
+        "duplicar": ("recommendations", "identificar_duplicar", (DF, mediana_cpa), {}),
+        "pausar": ("recommendations", "identificar_pausar", (DF, mediana_cpa), {}),
+        "reasignacion": ("budget_optimizer", "resumen_reasignacion", (DF,), {}),
+        "sin_df": ("analyzer", "generar_resumen", (), {"df": DF, "mediana_cpa": mediana_cpa}),
+    }
+
+
+def test_paralelo_igual_a_serie(enriquecidos):
+    for cliente, (df, mediana_cpa) in enriquecidos.items():
+        tareas = _tareas(mediana_cpa)
+        with EjecutorEtapas(df.copy(), paralelo=False) as ejecutor:
+            en_serie = ejecutor.ejecutar(tareas)
+        with EjecutorEtapas(df.copy(), paralelo=True, max_workers=2) as ejecutor:
+            assert ejecutor.paralelo
+            en_paralelo = ejecutor.ejecutar(tareas)
+
+        assert list(en_paralelo) == list(en_serie), cliente
+        np.testing.assert_equal(en_paralelo, en_serie, err_msg=cliente)
+
+
+def test_publicar_y_abrir_frame():
+    df = pd.DataFrame({
+        "entero": np.arange(4, dtype=np.int64),
+        "real": [1.5, np.nan, 3.0, 4.25],
+        "bool": [True, False, True, False],
+        "fecha": pd.to_datetime(["2024-01-01", "2024-01-02", None, "2024-01-04"]),
+        "texto": ["a", None, "b", "a"],
+        "mixta": [1, "x", 2.5, np.nan],
+    }, index=[10, 20, 30, 40])
+
+    shm, descriptor = publicar_frame(df)
+    try:
+        abierto = abrir_frame(descriptor, shm)
+        pd.testing.assert_frame_equal(abierto, df, check_dtype=False)
+        del abierto
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_procesos_por_worker(monkeypatch):
+    monkeypatch.setitem(PARALELISMO, "MAX_WORKERS", 8)
+    assert procesos_por_worker(1) == 8
+    assert procesos_por_worker(3) == 2
+    assert procesos_por_worker(16) == 1
+
+
+def test_un_solo_proceso_no_paraleliza(monkeypatch):
+    monkeypatch.setitem(PARALELISMO, "MIN_FILAS", 0)
+    df = pd.DataFrame({"x": [1.0, 2.0]})
+    assert not EjecutorEtapas(df, max_workers=1).paralelo
+    assert EjecutorEtapas(df, max_workers=2).paralelo
+    assert EjecutorEtapas(df, paralelo=True, max_workers=1).paralelo
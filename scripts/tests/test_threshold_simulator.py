@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from config import UMBRALES
+from metrics import clasificar_anuncios, enriquecer_dataframe
+from threshold_simulator import generar_grilla, simular_umbrales
+
+CONTEOS = {"heroes": "HEROE", "sanos": "SANO", "alertas": "ALERTA", "muertos": "MUERTO"}
+
+
+def _conteos(df):
+    clasificacion = df["clasificacion"].value_counts()
+    return {col: int(clasificacion.get(etiqueta, 0)) for col, etiqueta in CONTEOS.items()}
+
+
+def test_umbrales_actuales_reproducen_clasificacion(enriquecidos):
+    for cliente, (df, mediana_cpa) in enriquecidos.items():
+        fila = simular_umbrales(df, [{}], mediana_cpa).iloc[0]
+        assert {col: int(fila[col]) for col in CONTEOS} == _conteos(df), cliente
+
+
+def test_sin_export_7d(datos_muestra):
+    for cliente, datos in datos_muestra.items():
+        df, mediana_cpa = enriquecer_dataframe(datos["30d"].copy())
+        fila = simular_umbrales(df, [{}], mediana_cpa).iloc[0]
+        assert {col: int(fila[col]) for col in CONTEOS} == _conteos(df), cliente
+
+
+def test_cada_escenario_equivale_a_reclasificar(enriquecidos, monkeypatch):
+    df, mediana_cpa = next(iter(enriquecidos.values()))
+    escenarios = generar_grilla({"SCORE_HEROE": [50, 90], "SCORE_SANO": [20, 60]})
+    tabla = simular_umbrales(df, escenarios, mediana_cpa)
+
+    for escenario, (_, fila) in zip(escenarios, tabla.iterrows()):
+        for umbral, valor in escenario.items():
+            monkeypatch.setitem(UMBRALES, umbral, valor)
+        esperado = _conteos(pd.DataFrame({"clasificacion": clasificar_anuncios(df)}))
+        assert {col: int(fila[col]) for col in CONTEOS} == esperado, escenario
+
+
+def test_umbral_desconocido():
+    with pytest.raises(ValueError, match="Umbrales desconocidos"):
+        simular_umbrales(pd.DataFrame(), [{"NO_EXISTE": 1}], mediana_cpa=0)
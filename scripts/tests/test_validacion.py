@@ -0,0 +1,111 @@
+import pandas as pd
+import pytest
+
+from validacion import COLUMNA_MOTIVOS, chequeos_columnas, chequeos_filas, resumen_calidad, validar_export
+
+
+def _export(**columnas):
+    base = {
+        "ad_name": ["a", "b", "c"],
+        "spend": [10.0, 20.0, 30.0],
+        "impressions": [1000.0, 2000.0, 3000.0],
+        "results": [5.0, 10.0, 15.0],
+        "ctr": [1.0, 2.0, 3.0],
+    }
+    base.update(columnas)
+    return pd.DataFrame(base)
+
+
+def _motivos(df):
+    _, cuarentena, _ = validar_export(df, "export.xlsx")
+    return {} if cuarentena is None else dict(zip(cuarentena["ad_name"], cuarentena[COLUMNA_MOTIVOS]))
+
+
+def test_filas_validas_pasan_sin_cambios():
+    df = _export()
+    validas, cuarentena, avisos = validar_export(df, "export.xlsx")
+
+    assert cuarentena is None
+    assert avisos == []
+    pd.testing.assert_frame_equal(validas, df)
+
+
+@pytest.mark.parametrize("columnas, motivo", [
+    ({"spend": [10.0, -1.0, 30.0]}, "gasto negativo"),
+    ({"results": [5.0, 2500.0, 15.0]}, "resultados > impresiones"),
+    ({"ctr": [1.0, -0.5, 3.0]}, "CTR fuera de rango"),
+    ({"ctr": [1.0, 150.0, 3.0]}, "CTR fuera de rango"),
+])
+def test_chequeo_por_fila(columnas, motivo):
+    df = _export(**columnas)
+    validas, cuarentena, _ = validar_export(df, "export.xlsx")
+
+    assert validas["ad_name"].tolist() == ["a", "c"]
+    assert cuarentena["ad_name"].tolist() == ["b"]
+    assert cuarentena[COLUMNA_MOTIVOS].tolist() == [motivo]
+    assert cuarentena["archivo"].tolist() == ["export.xlsx"]
+
+
+def test_celda_forzada_a_cero():
+    df = _export(spend=[10.0, 0.0, 30.0])
+    df.attrs["filas_forzadas"] = {"spend": [1]}
+
+    assert _motivos(df) == {"b": "spend no numérico"}
+
+
+def test_varios_motivos_en_una_fila():
+    df = _export(spend=[10.0, -1.0, 30.0], ctr=[1.0, 200.0, 3.0])
+
+    assert _motivos(df) == {"b": "gasto negativo; CTR fuera de rango"}
+
+
+def test_duplicados_con_entrega():
+    df = _export(ad_name=["a", "a", "c"], spend=[10.0, 10.0, 30.0],
+                 impressions=[1000.0, 1000.0, 3000.0], results=[5.0, 5.0, 15.0])
+
+    validas, cuarentena, _ = validar_export(df)
+    # Se queda la primera aparición
+    assert validas.index.tolist() == [0, 2]
+    assert cuarentena[COLUMNA_MOTIVOS].tolist() == ["fila duplicada"]
+
+
+def test_duplicados_sin_entrega_no_van_a_cuarentena():
+    df = _export(ad_name=["a", "a", "c"], spend=[0.0, 0.0, 30.0],
+                 impressions=[0.0, 0.0, 3000.0], results=[0.0, 0.0, 15.0])
+
+    assert not chequeos_filas(df)["fila duplicada"].any()
+    assert _motivos(df) == {}
+
+
+def test_columnas_creadas_no_se_chequean():
+    # asegurar_columnas creó results en 0: no hay "resultados > impresiones"
+    # ni aviso de columna en 0, solo el de columna faltante
+    df = _export(results=[0.0, 0.0, 0.0], impressions=[0.0, 0.0, 0.0])
+    df.attrs["columnas_creadas"] = ["results", "impressions"]
+
+    chequeos = chequeos_filas(df)
+    assert "resultados > impresiones" not in chequeos
+    assert chequeos_columnas(df) == [
+        "impressions: falta en el export (quedó en 0)",
+        "results: falta en el export (quedó en 0)",
+    ]
+    assert _motivos(df) == {}
+
+
+def test_aviso_columna_en_cero():
+    assert chequeos_columnas(_export(results=[0.0, 0.0, 0.0])) == ["results: toda la columna está en 0"]
+    # Sin gasto, un solo aviso para todo el export
+    sin_entrega = _export(spend=[0.0] * 3, impressions=[0.0] * 3, results=[0.0] * 3)
+    assert chequeos_columnas(sin_entrega) == ["spend: toda la columna está en 0 (export sin entrega)"]
+
+
+def test_resumen_calidad():
+    _, cuarentena, _ = validar_export(_export(spend=[-1.0, -2.0, 30.0], ctr=[1.0, 200.0, 3.0]), "x.xlsx")
+    resumen = resumen_calidad(cuarentena, {"x.xlsx": ["results: toda la columna está en 0"], "y.xlsx": []})
+
+    assert resumen == {
+        "filas_cuarentena": 2,
+        "motivos": {"gasto negativo": 2, "CTR fuera de rango": 1},
+        "avisos": {"x.xlsx": ["results: toda la columna está en 0"]},
+    }
+    assert resumen_calidad(None, {"x.xlsx": []}) is None
@@ -0,0 +1,97 @@
+import os
+import select
+
+import pytest
+
+import watcher
+from watcher import _es_temporal, clientes_listos, detectar_cambios, instantanea
+
+
+def _escribir(ruta, contenido=b"x"):
+    with open(ruta, "wb") as f:
+        f.write(contenido)
+
+
+@pytest.mark.parametrize("nombre, temporal", [
+    ("~$Cliente-30d.xlsx", True),
+    (".Cliente-30d.xlsx.part", True),
+    ("Cliente-30d.xlsx", False),
+    ("Cliente-~$7d.xlsx", False),
+])
+def test_es_temporal(nombre, temporal):
+    assert _es_temporal(os.path.join("crudo", nombre)) is temporal
+
+
+def test_instantanea_ignora_temporales(tmp_path):
+    _escribir(tmp_path / "Cliente-30d.xlsx")
+    _escribir(tmp_path / "~$Cliente-30d.xlsx")
+    _escribir(tmp_path / ".Cliente-7d.xlsx")
+    _escribir(tmp_path / "notas.txt")
+
+    assert [os.path.basename(r) for r in instantanea(str(tmp_path))] == ["Cliente-30d.xlsx"]
+
+
+def test_detectar_cambios():
+    anterior = {"a.xlsx": (1, 10), "b.xlsx": (1, 10), "c.xlsx": (1, 10)}
+    actual = {"a.xlsx": (1, 10), "b.xlsx": (2, 12), "d.xlsx": (1, 5)}
+
+    # b modificado, c borrado, d nuevo
+    assert detectar_cambios(anterior, actual) == {"b.xlsx", "c.xlsx", "d.xlsx"}
+    assert detectar_cambios(actual, actual) == set()
+
+
+def test_instantanea_detecta_modificacion(tmp_path):
+    ruta = tmp_path / "Cliente-30d.xlsx"
+    _escribir(ruta, b"uno")
+    anterior = instantanea(str(tmp_path))
+    _escribir(ruta, b"uno mas largo")
+    assert detectar_cambios(anterior, instantanea(str(tmp_path))) == {str(ruta)}
+
+
+def test_clientes_listos_respeta_debounce():
+    pendientes = {
+        "crudo/Alfa-30d.xlsx": 10.0,
+        "crudo/Alfa-7d.xlsx": 12.0,
+        "crudo/Beta-30d.xlsx": 10.0,
+        "crudo/x.xlsx": 0.0,  # sin cliente por nombre
+    }
+
+    assert clientes_listos(pendientes, 12.5, debounce=3) == {}
+    # Beta está quieto hace 3 s; Alfa sigue esperando a su 7d
+    assert clientes_listos(pendientes, 13.0, debounce=3) == {"BETA": ["crudo/Beta-30d.xlsx"]}
+    listos = clientes_listos(pendientes, 15.0, debounce=3)
+    assert sorted(listos) == ["ALFA", "BETA"]
+    assert sorted(listos["ALFA"]) == ["crudo/Alfa-30d.xlsx", "crudo/Alfa-7d.xlsx"]
+
+
+def test_vigilar_reprocesa_cliente_cambiado(tmp_path, monkeypatch):
+    _escribir(tmp_path / "Alfa-30d.xlsx")
+    _escribir(tmp_path / "Beta-30d.xlsx")
+    reprocesados = []
+    ciclo = iter(range(10))
+
+    def esperar_evento(fd, timeout):
+        if next(ciclo) == 0:
+            _escribir(tmp_path / "Alfa-7d.xlsx")
+            _escribir(tmp_path / "~$Beta-30d.xlsx")
+
+    monkeypatch.setattr(watcher, "precalentar", lambda *args: None)
+    monkeypatch.setattr(watcher, "esperar_evento", esperar_evento)
+    monkeypatch.setattr(watcher, "reprocesar_clientes", lambda clientes, *args: reprocesados.append(clientes))
+
+    watcher.vigilar(str(tmp_path), debounce=0, forzar_polling=True, ciclos=3)
+    assert reprocesados == [["ALFA"]]
+
+
+def test_inotify_avisa_cambios(tmp_path):
+    fd = watcher.abrir_inotify(str(tmp_path))
+    if fd is None:
+        pytest.skip("inotify no disponible")
+    try:
+        assert select.select([fd], [], [], 0)[0] == []
+        _escribir(tmp_path / "Alfa-30d.xlsx")
+        assert select.select([fd], [], [], 1)[0] == [fd]
+        watcher.esperar_evento(fd, 0)  # consume los eventos
+        assert select.select([fd], [], [], 0)[0] == []
+    finally:
+        os.close(fd)
@@ -0,0 +1,237 @@
+"""
+Simulador de umbrales V4 ("what-if").
+Evalúa muchos juegos de UMBRALES sobre un DataFrame ya enriquecido sin
+volver a leer archivos ni correr el pipeline completo.
+
+Cada escenario se evalúa de forma vectorizada (escenarios × anuncios).
+Eficiencia, tendencia y clasificación usan las reglas de metrics.py
+(reglas_eficiencia, reglas_tendencia, reglas_clasificacion) con los
+umbrales de cada escenario; duplicar y pausar siguen a
+identificar_duplicar e identificar_pausar.
+
+Uso:
+    python threshold_simulator.py TOLENTINOS \\
+        --grid DUPLICAR_CPA_RATIO_MAX=1.0,1.2,1.5 --grid SCORE_HEROE=80,90
+"""
+import argparse
+import itertools
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from config import UMBRALES, LIMPIOS_DIR
+from metrics import (
+    CLASIFICACIONES,
+    TENDENCIAS,
+    dias_ventanas,
+    reglas_clasificacion,
+    reglas_eficiencia,
+    reglas_tendencia,
+)
+
+# Códigos de las reglas de metrics.py
+HEROE, SANO, MUERTO, ALERTA = (CLASIFICACIONES.index(c) for c in ('HEROE', 'SANO', 'MUERTO', 'ALERTA'))
+TEND_SIN_DATOS, EN_CAIDA, CRITICO = (TENDENCIAS.index(t) for t in ('SIN_DATOS', 'EN_CAIDA', 'CRITICO'))
+
+
+def generar_grilla(valores_por_umbral):
+    """
+    Arma todas las combinaciones de valores de umbrales (producto cartesiano).
+
+    Args:
+        valores_por_umbral: dict {umbral: [valores]}
+
+    Returns:
+        list de dicts, uno por escenario
+    """
+    claves = list(valores_por_umbral)
+    return [
+        dict(zip(claves, combinacion))
+        for combinacion in itertools.product(*(valores_por_umbral[k] for k in claves))
+    ]
+
+
+def _tabla_escenarios(escenarios):
+    """Completa cada escenario con los UMBRALES por defecto."""
+    desconocidos = {k for esc in escenarios for k in esc} - set(UMBRALES)
+    if desconocidos:
+        raise ValueError(f"Umbrales desconocidos: {', '.join(sorted(desconocidos))}")
+
+    return pd.DataFrame([{**UMBRALES, **esc} for esc in escenarios], dtype=float)
+
+
+def _evaluar_bloque(d, p, mediana_cpa):
+    """
+    Evalúa un bloque de escenarios contra todos los anuncios.
+
+    Args:
+        d: dict de arrays 1D (uno por anuncio)
+        p: dict de arrays (escenarios, 1) con cada umbral
+        mediana_cpa: Mediana del CPA de la cuenta
+
+    Returns:
+        dict de arrays (escenarios,) con las métricas del bloque
+    """
+    score, spend, cpa = d['score'], d['spend'], d['cpa']
+    cpa_valido = d['cpa_valido']
+
+    # Eficiencia, tendencia y clasificación (reglas de metrics.py)
+    eficiencia = reglas_eficiencia(d['cpa_crudo'], mediana_cpa, p)
+    tendencia, _ = reglas_tendencia(score, d['score_7d'], d['dias_30d'], d['dias_7d'], p)
+    # Sin export 7d, enriquecer_dataframe deja la tendencia en SIN_DATOS
+    tendencia = np.where(d['sin_7d'], TEND_SIN_DATOS, tendencia)
+    clasificacion = np.broadcast_to(
+        reglas_clasificacion(d['score_100'], eficiencia, tendencia, d['activo'], d['inactivo'], score, spend, p),
+        (len(p['SCORE_HEROE']), len(score)),
+    )
+
+    # Candidatos a duplicar (identificar_duplicar, antes del corte top 5)
+    duplicar = (
+        (score[None, :] >= p['DUPLICAR_SCORE_MIN'])
+        & cpa_valido[None, :]
+        & (cpa[None, :] <= mediana_cpa * p['DUPLICAR_CPA_RATIO_MAX'])
+        & d['actividad_duplicable'][None, :]
+    )
+
+    # Acciones urgentes (identificar_pausar, mismas ramas excluyentes)
+    pausar_sin_conv = (score == 0)[None, :] & (spend[None, :] > p['PAUSAR_GASTO_MIN'])
+    pausar_muerto = (clasificacion == MUERTO) & (d['gasto_7d'] > 0)[None, :]
+    pausar = pausar_sin_conv | pausar_muerto
+
+    cpa_alto = cpa_valido[None, :] & (cpa[None, :] > mediana_cpa * p['PAUSAR_CPA_RATIO'])
+    en_caida = (tendencia == EN_CAIDA) | (tendencia == CRITICO)
+    revisar = ~pausar & cpa_alto & (en_caida | d['gastando'][None, :])
+
+    return {
+        'heroes': (clasificacion == HEROE).sum(axis=1),
+        'sanos': (clasificacion == SANO).sum(axis=1),
+        'alertas': (clasificacion == ALERTA).sum(axis=1),
+        'muertos': (clasificacion == MUERTO).sum(axis=1),
+        'duplicar': duplicar.sum(axis=1),
+        'pausar': pausar.sum(axis=1),
+        'revisar': revisar.sum(axis=1),
+        'gasto_duplicar': duplicar @ spend,
+        'gasto_pausar': pausar @ spend,
+        'gasto_pausar_7d': pausar @ d['gasto_7d'],
+        'gasto_revisar': revisar @ spend,
+    }
+
+
+def simular_umbrales(df, escenarios, mediana_cpa=None, bloque=256):
+    """
+    Evalúa una grilla de escenarios de umbrales sobre un DataFrame enriquecido.
+
+    Args:
+        df: DataFrame enriquecido (salida de enriquecer_dataframe o *-30d-clean.xlsx)
+        escenarios: list de dicts con umbrales a reemplazar (ver generar_grilla)
+        mediana_cpa: Mediana del CPA (si es None se recalcula desde df)
+        bloque: Cantidad de escenarios evaluados por bloque (acota memoria)
+
+    Returns:
+        DataFrame con una fila por escenario: umbrales usados, conteos por
+        clasificación, candidatos a duplicar/pausar/revisar y gasto afectado
+    """
+    from metrics import calcular_mediana_cpa
+
+    if mediana_cpa is None:
+        mediana_cpa = calcular_mediana_cpa(df)
+
+    tabla = _tabla_escenarios(escenarios)
+
+    def columna(nombre, default=0.0):
+        if nombre not in df.columns:
+            return np.full(len(df), default, dtype=float)
+        return pd.to_numeric(df[nombre], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+    score = np.nan_to_num(columna('score'))
+    score_7d = np.nan_to_num(columna('score_7d'))
+    cpa = columna('cpa', np.nan)
+    actividad = (
+        df['actividad'].astype(str).to_numpy() if 'actividad' in df.columns
+        else np.full(len(df), 'SIN_DATOS_7D')
+    )
+
+    dias_30d, dias_7d = dias_ventanas(df)
+
+    datos = {
+        'score': score,
+        'spend': np.nan_to_num(columna('spend')),
+        'cpa': np.nan_to_num(cpa),
+        'cpa_crudo': cpa,
+        'cpa_valido': ~np.isnan(cpa) & (cpa > 0),
+        'score_7d': score_7d,
+        'gasto_7d': np.nan_to_num(columna('gasto_7d')),
+        'score_100': columna('score_100'),
+        'dias_30d': dias_30d,
+        'dias_7d': dias_7d,
+        'sin_7d': actividad == 'SIN_DATOS_7D',
+        'activo': actividad == 'ACTIVO',
+        'inactivo': actividad == 'INACTIVO',
+        'gastando': actividad == 'GASTANDO',
+        'actividad_duplicable': np.isin(actividad, ['ACTIVO', 'GASTANDO', 'SIN_DATOS_7D']),
+    }
+
+    resultados = []
+    for inicio in range(0, len(tabla), bloque):
+        parte = tabla.iloc[inicio:inicio + bloque]
+        p = {k: parte[k].to_numpy()[:, None] for k in parte.columns}
+        resultados.append(pd.DataFrame(_evaluar_bloque(datos, p, mediana_cpa), index=parte.index))
+
+    if not resultados:
+        return tabla
+
+    return pd.concat([tabla, pd.concat(resultados)], axis=1)
+
+
+def _parsear_grilla(argumentos):
+    """Convierte ['UMBRAL=v1,v2', ...] en {UMBRAL: [v1, v2]}."""
+    grilla = {}
+    for arg in argumentos:
+        if '=' not in arg:
+            raise ValueError(f"Formato inválido '{arg}', usar UMBRAL=v1,v2,...")
+        nombre, valores = arg.split('=', 1)
+        grilla[nombre.strip()] = [float(v) for v in valores.split(',') if v.strip()]
+    return grilla
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulador what-if de UMBRALES")
+    parser.add_argument("cliente", help="Cliente (usa limpios/<CLIENTE>-30d-clean.xlsx)")
+    parser.add_argument("--grid", action="append", default=[],
+                        help="UMBRAL=v1,v2,... (repetible, se combinan todas)")
+    parser.add_argument("--entrada", help="Ruta alternativa al Excel enriquecido")
+    parser.add_argument("--csv", help="Guardar resultados en CSV")
+    args = parser.parse_args(argv)
+
+    ruta = args.entrada or os.path.join(LIMPIOS_DIR, f"{args.cliente}-30d-clean.xlsx")
+    if not os.path.exists(ruta):
+        print(f"[ERROR] No existe {ruta}. Ejecutar main.py primero.")
+        return 1
+
+    try:
+        escenarios = generar_grilla(_parsear_grilla(args.grid)) if args.grid else [{}]
+        df = pd.read_excel(ruta)
+        resultado = simular_umbrales(df, escenarios)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    print(f"Escenarios evaluados: {len(resultado)} | Anuncios: {len(df)}")
+    with pd.option_context('display.max_rows', 200, 'display.width', 200):
+        columnas = list(_parsear_grilla(args.grid)) + [
+            'heroes', 'sanos', 'alertas', 'muertos',
+            'duplicar', 'pausar', 'revisar', 'gasto_duplicar', 'gasto_pausar',
+        ]
+        print(resultado[columnas].to_string(index=False))
+
+    if args.csv:
+        resultado.to_csv(args.csv, index=False)
+        print(f"Resultados: {args.csv}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Validación de calidad de datos V4.
+asegurar_columnas crea en 0 las columnas que faltan y convertir_numericos
+deja en 0 las celdas ilegibles: un export corrupto se ve como anuncios sin
+resultados y termina en acciones PAUSAR falsas.
+
+Después de cargar cada export se corren chequeos por columna (unas pocas
+pasadas de arrays, sin recorrer filas):
+
+    Por fila (la fila va a cuarentena con sus motivos):
+        - gasto negativo
+        - resultados mayores que impresiones
+        - CTR fuera de rango (< 0 o > VALIDACION['CTR_MAXIMO'])
+        - celda no numérica convertida a 0
+        - fila duplicada (mismo anuncio y mismas métricas)
+
+    Por columna (aviso, no se descartan filas):
+        - columna esperada por el schema que falta o viene toda en 0
+"""
+import numpy as np
+import pandas as pd
+
+from config import DESGLOSES, VALIDACION
+
+COLUMNA_MOTIVOS = "motivos_cuarentena"
+
+
+def _numerica(df, columna):
+    return pd.to_numeric(df[columna], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+def _identidad(df):
+    """Columnas que identifican una fila del export (anuncio, día, desglose)."""
+    anuncio = ["ad_id"] if "ad_id" in df.columns else ["ad_name"]
+    anuncio += [c for c in ("adset_id", "adset_name") if c in df.columns and c not in anuncio]
+    extras = [c for c in ("date_start", *DESGLOSES["DIMENSIONES"]) if c in df.columns]
+    return anuncio + extras
+
+
+def chequeos_filas(df):
+    """
+    Máscaras de los chequeos por fila. Las columnas que el export no trae
+    (creadas por asegurar_columnas) no se chequean.
+
+    Returns:
+        dict {motivo: np.ndarray bool}
+    """
+    creadas = set(df.attrs.get("columnas_creadas", []))
+
+    def presente(columna):
+        return columna in df.columns and columna not in creadas
+
+    chequeos = {}
+
+    if presente("spend"):
+        chequeos["gasto negativo"] = _numerica(df, "spend") < 0
+
+    if presente("results") and presente("impressions"):
+        chequeos["resultados > impresiones"] = _numerica(df, "results") > _numerica(df, "impressions")
+
+    if presente("ctr"):
+        ctr = _numerica(df, "ctr")
+        chequeos["CTR fuera de rango"] = (ctr < 0) | (ctr > VALIDACION["CTR_MAXIMO"])
+
+    for columna, filas in df.attrs.get("filas_forzadas", {}).items():
+        chequeos[f"{columna} no numérico"] = df.index.isin(filas)
+
+    metricas = [c for c in ("spend", "impressions", "results") if presente(c)]
+    identidad = [c for c in _identidad(df) if c in df.columns]
+    if identidad and metricas:
+        # Filas sin entrega repetidas no duplican nada
+        con_entrega = np.nan_to_num(np.column_stack([_numerica(df, c) for c in metricas])).any(axis=1)
+        chequeos["fila duplicada"] = df.duplicated(identidad + metricas, keep="first").to_numpy() & con_entrega
+
+    return chequeos
+
+
+def chequeos_columnas(df):
+    """
+    Returns:
+        list de avisos sobre columnas esperadas que faltan o están en 0
+    """
+    creadas = set(df.attrs.get("columnas_creadas", []))
+    faltan = [c for c in VALIDACION["COLUMNAS_ESPERADAS"] if c in creadas or c not in df.columns]
+    avisos = [f"{columna}: falta en el export (quedó en 0)" for columna in faltan]
+
+    en_cero = [
+        c for c in VALIDACION["COLUMNAS_ESPERADAS"]
+        if c not in faltan and len(df) and not np.nan_to_num(_numerica(df, c)).any()
+    ]
+    if "spend" in en_cero:
+        # Un mes sin entrega: todas las métricas en 0 son un solo aviso
+        avisos.append("spend: toda la columna está en 0 (export sin entrega)")
+    else:
+        avisos.extend(f"{columna}: toda la columna está en 0" for columna in en_cero)
+    return avisos
+
+
+def validar_export(df, nombre=""):
+    """
+    Valida un export normalizado y separa las filas inválidas.
+
+    Args:
+        df: DataFrame de _normalizar_export (no se modifica)
+        nombre: Archivo u hoja, para la cuarentena y los avisos
+
+    Returns:
+        tuple (DataFrame válido, DataFrame en cuarentena con la columna
+        motivos_cuarentena o None, list de avisos de columnas)
+    """
+    avisos = chequeos_columnas(df)
+    chequeos = chequeos_filas(df)
+    if not chequeos:
+        return df, None, avisos
+
+    matriz = np.column_stack(list(chequeos.values()))
+    invalida = matriz.any(axis=1)
+    if not invalida.any():
+        return df, None, avisos
+
+    # Motivos: una concatenación vectorizada por chequeo sobre las filas inválidas
+    motivos = np.full(int(invalida.sum()), "", dtype=object)
+    for motivo, columna in zip(chequeos, matriz[invalida].T):
+        motivos = motivos + np.where(columna, motivo + "; ", "")
+
+    cuarentena = df.loc[invalida].copy()
+    cuarentena.insert(0, COLUMNA_MOTIVOS, [m[:-2] for m in motivos])
+    cuarentena.insert(0, "archivo", nombre)
+
+    return df.loc[~invalida].copy(), cuarentena, avisos
+
+
+def resumen_calidad(cuarentena, avisos):
+    """
+    Resumen para el informe.
+
+    Args:
+        cuarentena: DataFrame con todas las filas en cuarentena (o None)
+        avisos: dict {archivo: [avisos de columnas]}
+
+    Returns:
+        dict {"filas_cuarentena", "motivos", "avisos"} o None si no hubo
+        problemas
+    """
+    avisos = {archivo: lista for archivo, lista in avisos.items() if lista}
+    if cuarentena is None and not avisos:
+        return None
+
+    motivos = {}
+    if cuarentena is not None:
+        conteo = cuarentena[COLUMNA_MOTIVOS].str.split("; ").explode().value_counts()
+        motivos = {motivo: int(n) for motivo, n in conteo.items()}
+
+    return {
+        "filas_cuarentena": 0 if cuarentena is None else int(len(cuarentena)),
+        "motivos": motivos,
+        "avisos": avisos,
+    }
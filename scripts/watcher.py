@@ -0,0 +1,244 @@
+"""
+Modo watch V4.
+Vigila crudo/ y reprocesa solo los clientes cuyos exports cambiaron.
+
+    - Linux: espera eventos con inotify (vía ctypes, sin dependencias)
+    - Otros sistemas o si inotify falla: escaneo periódico (polling)
+
+Un archivo se da por completo cuando su tamaño y mtime no cambian durante
+WATCH['DEBOUNCE'] segundos (evita procesar exports a medio copiar). Los
+archivos se asignan a clientes con la misma regla de nombres que
+identificar_clientes.
+
+El proceso queda vivo entre eventos, así que el índice del schema, las
+fuentes del PDF y los frames ya parseados (cache de cargar_archivo) se
+reutilizan: al llegar un -7d nuevo solo se relee ese archivo.
+
+Uso:
+    python cli.py watch --outputs json,txt
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+from config import CRUDA_DIR, WATCH
+from file_discovery import cliente_de_archivo, firma_archivo, listar_archivos
+
+# Eventos de inotify que indican que un archivo del directorio cambió
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+MASCARA_INOTIFY = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def abrir_inotify(directorio):
+    """
+    Crea un descriptor de inotify que vigila directorio.
+
+    Returns:
+        int con el descriptor, o None si inotify no está disponible
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directorio), MASCARA_INOTIFY) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def esperar_evento(fd, timeout):
+    """
+    Bloquea hasta que haya eventos de inotify o venza el timeout.
+    Sin inotify (fd None) simplemente duerme el timeout.
+    """
+    if fd is None:
+        time.sleep(timeout)
+        return
+
+    listos, _, _ = select.select([fd], [], [], timeout)
+    if listos:
+        # Los eventos solo avisan; el detalle sale de comparar instantáneas
+        try:
+            while os.read(fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def _es_temporal(ruta):
+    """Archivos de bloqueo de Excel (~$...) u ocultos a medio copiar."""
+    nombre = os.path.basename(ruta)
+    return nombre.startswith("~$") or nombre.startswith(".")
+
+
+def instantanea(directorio=None):
+    """
+    Returns:
+        dict {ruta: firma_archivo} de los exports de crudo/ (y de sus zips)
+    """
+    estado = {}
+    for ruta in listar_archivos(directorio):
+        if _es_temporal(ruta):
+            continue
+        try:
+            estado[ruta] = firma_archivo(ruta)
+        except OSError:
+            continue  # borrado entre el listado y el stat
+    return estado
+
+
+def detectar_cambios(anterior, actual):
+    """Rutas nuevas, modificadas o borradas entre dos instantáneas."""
+    return {
+        ruta for ruta in anterior.keys() | actual.keys()
+        if anterior.get(ruta) != actual.get(ruta)
+    }
+
+
+def clientes_listos(pendientes, ahora, debounce):
+    """
+    Clientes cuyos archivos pendientes no cambian hace al menos debounce
+    segundos. Un cliente espera mientras cualquiera de sus archivos siga
+    escribiéndose.
+
+    Args:
+        pendientes: dict {ruta: momento del último cambio visto}
+
+    Returns:
+        dict {cliente: [rutas]}
+    """
+    por_cliente = {}
+    for ruta, momento in pendientes.items():
+        cliente = cliente_de_archivo(ruta)
+        if cliente:
+            por_cliente.setdefault(cliente, []).append((ruta, momento))
+
+    return {
+        cliente: [ruta for ruta, _ in archivos]
+        for cliente, archivos in por_cliente.items()
+        if ahora - max(momento for _, momento in archivos) >= debounce
+    }
+
+
+def precalentar(directorio=None, salidas=None, precargar=True):
+    """
+    Importa los módulos del pipeline, compila el schema, registra las
+    fuentes del PDF y (opcional) parsea los exports actuales al cache.
+    """
+    import main  # noqa: F401 - importa pandas y config una sola vez
+    from data_loader import cargar_archivo, compilar_schema_columnas
+
+    compilar_schema_columnas()
+
+    if salidas is None or "pdf" in salidas:
+        try:
+            from pdf_generator import register_fonts
+
+            register_fonts()
+        except Exception:
+            pass  # sin reportlab o sin fuentes: el PDF avisará al generarse
+
+    if precargar:
+        for ruta in instantanea(directorio):
+            cargar_archivo(ruta)
+
+
+def reprocesar_clientes(clientes, salidas=None, generar_pdf_flag=True):
+    """Corre el pipeline de cada cliente sin que un error detenga el watch."""
+    from main import procesar_cliente
+
+    resultados = {}
+    for cliente in clientes:
+        inicio = time.perf_counter()
+        try:
+            resultados[cliente] = procesar_cliente(cliente, generar_pdf_flag, salidas)
+            print(f"\n[WATCH] {cliente} listo en {time.perf_counter() - inicio:.1f}s")
+        except Exception as e:
+            resultados[cliente] = None
+            print(f"\n[WATCH] [ERROR] {cliente}: {e}")
+    return resultados
+
+
+def vigilar(directorio=None, salidas=None, generar_pdf_flag=True, intervalo=None,
+            debounce=None, forzar_polling=False, precargar=True, ciclos=None):
+    """
+    Bucle principal del modo watch.
+
+    Args:
+        directorio: Carpeta a vigilar (por defecto crudo/, de donde lee el pipeline)
+        salidas: Salidas a generar en cada reproceso (None = todas)
+        generar_pdf_flag: False para no generar PDF
+        intervalo: Segundos entre escaneos (WATCH['INTERVALO_POLLING'])
+        debounce: Segundos de quietud de un archivo (WATCH['DEBOUNCE'])
+        forzar_polling: Usar escaneo periódico aunque haya inotify
+        precargar: Parsear los exports actuales al arrancar
+        ciclos: Cantidad de iteraciones (None = hasta Ctrl+C)
+
+    Returns:
+        int: código de salida
+    """
+    directorio = directorio or CRUDA_DIR
+    intervalo = WATCH["INTERVALO_POLLING"] if intervalo is None else intervalo
+    debounce = WATCH["DEBOUNCE"] if debounce is None else debounce
+
+    from data_loader import limpiar_cache_archivos
+
+    precalentar(directorio, salidas, precargar)
+
+    fd = None if forzar_polling else abrir_inotify(directorio)
+    modo = "inotify" if fd is not None else f"polling cada {intervalo:g}s"
+    print(f"\n[WATCH] Vigilando {directorio} ({modo}, debounce {debounce:g}s). Ctrl+C para salir.")
+
+    anterior = instantanea(directorio)
+    pendientes = {}
+
+    try:
+        while ciclos is None or ciclos > 0:
+            if ciclos is not None:
+                ciclos -= 1
+
+            # Con archivos pendientes hay que despertar a tiempo para el debounce
+            espera = min(intervalo, debounce) if pendientes else intervalo
+            esperar_evento(fd, espera)
+
+            actual = instantanea(directorio)
+            ahora = time.monotonic()
+            for ruta in detectar_cambios(anterior, actual):
+                if cliente_de_archivo(ruta):
+                    pendientes[ruta] = ahora
+            anterior = actual
+
+            listos = clientes_listos(pendientes, ahora, debounce)
+            if not listos:
+                continue
+
+            for rutas in listos.values():
+                for ruta in rutas:
+                    pendientes.pop(ruta, None)
+                    if ruta not in actual:
+                        limpiar_cache_archivos([ruta])
+
+            print(f"\n[WATCH] Cambios en: {', '.join(sorted(listos))}")
+            reprocesar_clientes(sorted(listos), salidas, generar_pdf_flag)
+
+    except KeyboardInterrupt:
+        print("\n[WATCH] Detenido.")
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+    return 0